@@ -22,3 +22,8 @@ dhma = QAction(mw)
 dhma.setText("Dehashilate media")
 mw.form.menuTools.addAction(dhma)
 mw.connect(dhma, SIGNAL("triggered()"), dehashilator.test_and_dehashilate)
+
+dhua = QAction(mw)
+dhua.setText("Undo dehashilation")
+mw.form.menuTools.addAction(dhua)
+mw.connect(dhua, SIGNAL("triggered()"), dehashilator.rollback_dehashilation)
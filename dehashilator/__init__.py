@@ -15,11 +15,12 @@ useless without Anki 2.
 
 """
 
-from dehashilator import test_and_dehashilate
+from dehashilator import rollback_dehashilation, test_and_dehashilate
 from progress import progress
-from exists import exists_lc
+from exists import MediaNameIndex, exists_lc
 from romaji import roma, html, kana
 
 __version__ = '1.0.0b5'
-__all__ = ['test_and_dehashilate', 'progress', 'roma', 'html', 'kana',
-           'exists_lc', '__version__']
+__all__ = ['test_and_dehashilate', 'rollback_dehashilation', 'progress',
+           'roma', 'html', 'kana', 'exists_lc', 'MediaNameIndex',
+           '__version__']
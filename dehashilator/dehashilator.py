@@ -10,17 +10,18 @@ Rename files with Anki <1.2-ish MD5 names with names derived from the
 note content.
 """
 
+import json
 import os
 import re
 
-import romaji
+import kana_convert
 import kana_kanji
-from exists import exists_lc
+from exists import MediaNameIndex
 from progress import progress
 
 from aqt import mw
 from aqt.utils import showInfo, showText, askUser
-from anki.utils import stripHTML
+from anki.utils import ids2str, intTime, stripHTML
 from anki.lang import _
 
 name_source_fields = ['SequenceMarker', 'Reading', 'Expression', 'Kanji']
@@ -39,18 +40,17 @@ reading_for_katakana = False
 
 hash_name_pat = '(?:\[sound:|src *= *")([a-z0-9]{32})'\
     '(\.[a-zA-Z0-9]{1,5})(?:]|")'
+hash_name_re = re.compile(hash_name_pat)
 
+## Only notes that pass this test in SQLite are looked at in
+## Python. Every field that can match hash_name_pat contains one of
+## these strings.
+media_notes_sql = "select id, flds from notes " \
+    "where flds like '%[sound:%' or flds like '%src%'"
 
-def katakanaize(hiragana):
-    """
-    Return katakana
-
-    Transform a hiragana string to katakana through the circuitous
-    route of converting it to rōmaji, then to uppercase, than to
-    kana again.
-
-    """
-    return romaji.kana(romaji.roma(hiragana).upper())
+## Where we keep what we did, in the profile folder, so that it can be
+## undone.
+journal_name = 'dehashilator_journal.json'
 
 
 def mangle_reading(nbn):
@@ -65,7 +65,8 @@ def mangle_reading(nbn):
     # Now the tricky bit: decide when to use the split values.
     if kana and kanji and kanji != kana:
         if reading_for_katakana or \
-                katakanaize(kanji) != katakanaize(kana):
+                kana_convert.same_reading(kanji) != \
+                kana_convert.same_reading(kana):
             return kanji + u'_' + kana
         else:
             return kanji
@@ -125,26 +126,22 @@ def new_name_base(old_base, note):
     raise ValueError(_(u'No data for new name found'))
 
 
-def free_media_name(base, end):
+def free_media_name(base, end, name_index=None):
     """
     Return a useful media name.
 
     Return a name that can be used for the media file. That is one
     that based on the base name and end, but doesn't exist, nor does
     the it clash with another file different only in upper/lower case.
+    Pass in a MediaNameIndex of the media folder when looking for
+    more than one name. The name is reserved in that.
     """
-    mdir = mw.col.media.dir()
-    if not exists_lc(mdir, base + end):
-        return base + end
-    for i in range(1, 10000):
-        # Don't be silly. Give up after 9999 tries.
-        long_name = '{0}_{1}{2}'.format(base, i, end)
-        if not exists_lc(mdir, long_name):
-            return long_name
-    raise ValueError
+    if name_index is None:
+        name_index = MediaNameIndex(mw.col.media.dir())
+    return name_index.free_name(base, end)
 
 
-def new_media_name(old_base, old_end, note):
+def new_media_name(old_base, old_end, note, name_index=None):
     """
     Get new file name for a hashed file name.
 
@@ -167,111 +164,222 @@ def new_media_name(old_base, old_end, note):
     nbn = re.sub(r"[][<>:/\\&?\"\|]", "", nbn)
     if not nbn:
         raise ValueError
-    return free_media_name(nbn, old_end)
+    return free_media_name(nbn, old_end, name_index)
 
 
 def test_and_dehashilate():
-    if not test_names():
+    plan = plan_renames()
+    if not test_names(plan):
         showInfo('No hashes found in cards. Have a nice day.')
         return
-    if not askUser('Go ahead?\nThis cannot be undone!\nUse at your own risk!\n'
-                   'Backup your collection before continuing!'):
+    if not askUser('Go ahead?\nUse at your own risk!\n'
+                   'Backup your collection before continuing!\n'
+                   'You can undo the renaming with "Undo dehashilation".'):
         return
     if not askUser('Click on "No".\n'
                    'Clicking on "Yes" will probably mess up your collection.\n'
                    'You will have to fix it yourself!',
                    defaultno=True):
         return
-    dehashilate()
+    dehashilate(plan)
 
 
-def test_names():
-    """Go through the collection and show possible new names
+def media_notes():
+    """
+    Return the ids and fields of the notes that may use hashed names.
 
-    Search the cards for sounds or images with file names that look
-    like MD5 hashes, rename the files and change the notes.
+    Let SQLite drop the notes without sound or image, and only get
+    the id and the fields of the others, not the whole notes.
+    """
+    return mw.col.db.all(media_notes_sql)
+
+
+def rename_in_fields(flds, renames):
+    """Return the joined fields with the hashed names replaced."""
+    def new_reference(match):
+        old_name = match.group(1) + match.group(2)
+        try:
+            return match.group(0).replace(old_name, renames[old_name])
+        except KeyError:
+            return match.group(0)
+    return hash_name_re.sub(new_reference, flds)
+
+
+def plan_renames():
+    """
+    Work out what to rename, without changing anything.
+
+    Return the plan, a dict with the list of [old name, new name]
+    pairs under 'renames' and a list of [note id, old fields, new
+    fields] under 'notes'.
     """
-    test_string = u''
-    nids = mw.col.db.list("select id from notes")
-    for nid in progress(nids, "Dehashilating", "This is all wrong!"):
-        n = mw.col.getNote(nid)
-        for (name, value) in n.items():
-            rs = re.search(hash_name_pat, value)
-            if None == rs:
+    name_index = MediaNameIndex(mw.col.media.dir())
+    renames = {}
+    rename_list = []
+    note_list = []
+    for nid, flds in progress(
+            media_notes(), "Dehashilating", "Looking for hashed names"):
+        n = None
+        for match in hash_name_re.finditer(flds):
+            old_name = match.group(1) + match.group(2)
+            if old_name in renames:
                 continue
+            if n is None:
+                # Only now get the whole note.
+                n = mw.col.getNote(nid)
             try:
-                new_name_ = new_media_name(rs.group(1), rs.group(2), n)
+                new_name = new_media_name(
+                    match.group(1), match.group(2), n, name_index)
             except ValueError:
                 continue
-            test_string += u'{0}{1} → {2}\n'.format(
-                rs.group(1), rs.group(2),
-                new_name_)
+            renames[old_name] = new_name
+            rename_list.append([old_name, new_name])
+        new_flds = rename_in_fields(flds, renames)
+        if new_flds != flds:
+            note_list.append([nid, flds, new_flds])
+    return dict(renames=rename_list, notes=note_list)
+
+
+def test_names(plan=None):
+    """Go through the collection and show possible new names
+
+    Search the cards for sounds or images with file names that look
+    like MD5 hashes and show the names they would get.
+    """
+    if plan is None:
+        plan = plan_renames()
+    test_string = u''.join(
+        u'{0} → {1}\n'.format(old_name, new_name)
+        for old_name, new_name in plan['renames'])
     if (test_string):
         showText('These new names will be used:\n' + test_string)
     return test_string
 
 
-def dehashilate():
+def journal_path():
+    """Return the path of the file where we note what we renamed."""
+    return os.path.join(mw.pm.profileFolder(), journal_name)
+
+
+def write_journal(journal):
+    """Write the journal, replacing the old one only when done."""
+    path = journal_path()
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as journal_file:
+        json.dump(journal, journal_file)
+    if os.path.exists(path):
+        # Windows won’t rename over an existing file.
+        os.remove(path)
+    os.rename(temp_path, path)
+
+
+def read_journal():
+    """Return the journal, or None."""
+    try:
+        with open(journal_path(), 'r') as journal_file:
+            return json.load(journal_file)
+    except (IOError, ValueError):
+        return None
+
+
+def write_fields(note_updates):
+    """Write the fields of the notes in one go and commit."""
+    mod = intTime()
+    usn = mw.col.usn()
+    mw.col.db.executemany(
+        "update notes set flds=:flds, mod=:mod, usn=:usn where id=:nid",
+        [dict(nid=nid, flds=flds, mod=mod, usn=usn)
+         for nid, flds in note_updates])
+    # With the new mod and usn the notes are synced. Update the sort
+    # field and checksum, too.
+    mw.col.updateFieldCache([nid for nid, flds in note_updates])
+    mw.col.save()
+
+
+def dehashilate(plan=None):
     """Go through the collection and clean up MD5-ish names
 
     Search the cards for sounds or images with file names that
     look like MD5 hashes, rename the files and change the notes.
 
+    First write the plan to the journal, so that we can go back even
+    when something goes wrong in the middle. Then rename the files,
+    note in the journal which notes we will change, and change them
+    all in one transaction.
     """
+    if plan is None:
+        plan = plan_renames()
     mdir = mw.col.media.dir()
-    new_names_dict = {}
-    rename_exec_list = []
-    bad_mv_text = u''
     mw.checkpoint(_("Dehashilate"))
-    nids = mw.col.db.list("select id from notes")
-    for nid in progress(nids, "Dehashilating", "This is all wrong!"):
-        n = mw.col.getNote(nid)
-        for (name, value) in n.items():
-            for match in re.findall(hash_name_pat, value):
-                rs = re.search(hash_name_pat, value)
-                if None == rs:
-                    # Should be redundant with the for match ...:
-                    # loop. RAS 2012-06-23
-                    continue
-                old_name = '{0}{1}'.format(rs.group(1), rs.group(2))
-                try:
-                    new_name = new_names_dict[old_name]
-                except KeyError:
-                    try:
-                        new_name = new_media_name(rs.group(1), rs.group(2), n)
-                    except ValueError:
-                        continue
-                    do_rename = True
-                else:
-                    do_rename = False
-                if do_rename:
-                    src = os.path.join(mdir, old_name)
-                    dst = os.path.join(mdir, new_name)
-                    try:
-                        os.rename(src, dst)
-                    except OSError:
-                        # print u'Problem movivg {0} → {1}\n'.format(src, dst)
-                        bad_mv_text += u'{0} → {1}\n'.format(src, dst)
-                    else:
-                        new_names_dict[old_name] = new_name
-                    n[name] = value.replace(old_name, new_name)
-                    n.flush()
-                    rename_exec_list.append(dict(nid=nid,
-                                                 flds=n.joinedFields()))
-    mw.col.db.executemany("update notes set flds =:flds where id =:nid",
-                          rename_exec_list)
-    # This is a bit of voodo code. Without it the cards weren't
-    # synced. Maybe this helps. (Cribbed from anki.find, but don't
-    # keep extra list of nids.) RAS 2012-06-20
-    # And it doesn't work. RAS 2012-07-13
-
-    # """File
-    # "/home/roland/Anki-tests/addons/dehashilator/dehashilator.py",
-    # line 268, in dehashilate
-    # mw.col.updateFieldCache([re_dict[nids] for re_dict in
-    # rename_exec_list])
-    # TypeError: unhashable type: 'list'"""
-     # mw.col.updateFieldCache([re_dict[nids] for re_dict in rename_exec_list])
+    write_journal(dict(plan, state='planned'))
+    renamed = {}
+    bad_mv_text = u''
+    for old_name, new_name in plan['renames']:
+        src = os.path.join(mdir, old_name)
+        dst = os.path.join(mdir, new_name)
+        try:
+            os.rename(src, dst)
+        except OSError:
+            bad_mv_text += u'{0} → {1}\n'.format(src, dst)
+        else:
+            renamed[old_name] = new_name
+    note_list = []
+    for nid, flds, dummy_planned_flds in plan['notes']:
+        # Only point the notes to files we did rename.
+        new_flds = rename_in_fields(flds, renamed)
+        if new_flds != flds:
+            note_list.append([nid, flds, new_flds])
+    journal = dict(
+        renames=[[old_name, new_name] for old_name, new_name
+                 in plan['renames'] if old_name in renamed],
+        notes=note_list, state='renamed')
+    write_journal(journal)
+    write_fields([(nid, new_flds) for nid, flds, new_flds in note_list])
+    journal['state'] = 'applied'
+    write_journal(journal)
     mw.reset()
     if bad_mv_text:
         showText(_(u'These files weren’t renamed:\n') + bad_mv_text)
+
+
+def rollback_dehashilation():
+    """
+    Undo the last dehashilation.
+
+    Rename the files back, last first, and give the notes their old
+    fields back. Notes that were changed since are left alone.
+    """
+    journal = read_journal()
+    if not journal or journal.get('state') not in (
+            'planned', 'renamed', 'applied'):
+        showInfo('Nothing to undo.')
+        return
+    if not askUser('Undo the last dehashilation?'):
+        return
+    mw.checkpoint(_("Undo dehashilation"))
+    mdir = mw.col.media.dir()
+    bad_mv_text = u''
+    for old_name, new_name in reversed(journal['renames']):
+        src = os.path.join(mdir, new_name)
+        dst = os.path.join(mdir, old_name)
+        if os.path.exists(dst) or not os.path.exists(src):
+            # Not renamed in the first place, or already back.
+            continue
+        try:
+            os.rename(src, dst)
+        except OSError:
+            bad_mv_text += u'{0} → {1}\n'.format(src, dst)
+    # We may have stopped before, while or after writing the
+    # notes. Give those that have the fields we wrote their old ones
+    # back.
+    current_flds = dict(mw.col.db.all(
+        "select id, flds from notes where id in " + ids2str(
+            [nid for nid, flds, new_flds in journal['notes']])))
+    write_fields([
+        (nid, flds) for nid, flds, new_flds in journal['notes']
+        if current_flds.get(nid) == new_flds])
+    journal['state'] = 'rolled back'
+    write_journal(journal)
+    mw.reset()
+    if bad_mv_text:
+        showText(_(u'These files weren’t renamed back:\n') + bad_mv_text)
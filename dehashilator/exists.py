@@ -28,3 +28,43 @@ def exists_lc(path, name):
     # before the opening '[' to return a Boolean.
     return [fname for fname in os.listdir(path)
             if fname.lower() == name.lower()]
+
+
+class MediaNameIndex(object):
+    """
+    Names of the files in a folder, to find free names quickly.
+
+    The folder is listed once. Names are compared in lower case, like
+    exists_lc does. (On Windows and Mac OS X the file systems usually
+    don't care about case anyway.) Names handed out by free_name are
+    reserved right away, so that two files never get the same name,
+    even before they are renamed.
+    """
+
+    def __init__(self, path):
+        self.names = set(fname.lower() for fname in os.listdir(path))
+
+    def __contains__(self, name):
+        return name.lower() in self.names
+
+    def reserve(self, name):
+        """Mark the name as used."""
+        self.names.add(name.lower())
+
+    def free_name(self, base, end):
+        """
+        Return and reserve a name based on base and end.
+
+        Try base + end first, then base_1 + end and so on. Raise a
+        ValueError when even the 9999th try is taken.
+        """
+        name = base + end
+        i = 0
+        while name in self:
+            i += 1
+            if i >= 10000:
+                # Don't be silly. Give up after 9999 tries.
+                raise ValueError
+            name = '{0}_{1}{2}'.format(base, i, end)
+        self.reserve(name)
+        return name
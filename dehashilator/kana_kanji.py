@@ -12,29 +12,40 @@ if too_old:
 else:
     split_pat = u' ?(?P<kanji>[-+×÷%\.\w]+?)\[(?P<kana>.+?)\]'
 
+split_re = re.compile(split_pat, re.UNICODE)
 
-def no_sound(repl):
-    """Return text outside a [sound: ] field."""
-    def func(match):
+PLAIN, RUBY, SOUND = 'plain', 'ruby', 'sound'
+# The token kinds, as in the furikanji add-on. A token is a tuple
+# (kind, text, kanji, kana), where text is the original text.
+
+
+def tokenize(txt):
+    """Split the text into plain, ruby and [sound: ] tokens."""
+    tokens = []
+    pos = 0
+    for match in split_re.finditer(txt):
+        if match.start() > pos:
+            tokens.append((PLAIN, txt[pos:match.start()], None, None))
         if match.group('kana').startswith("sound:"):
-            # return without modification
-            return match.group(0)
+            # Keep without modification
+            tokens.append((SOUND, match.group(0), None, None))
         else:
-            if too_old:
-                return re.sub(split_pat, repl, match.group(0))
-            return re.sub(split_pat, repl, match.group(0), flags=re.UNICODE)
-    return func
+            tokens.append(
+                (RUBY, match.group(0), match.group('kanji'),
+                 match.group('kana')))
+        pos = match.end()
+    if pos < len(txt):
+        tokens.append((PLAIN, txt[pos:], None, None))
+    return tokens
 
 
 def kanji(txt, *args):
     """Return the kanji of a standard kakasi reading."""
-    if too_old:
-        return re.sub(split_pat, no_sound(r'\g<kanji>'), txt)
-    return re.sub(split_pat, no_sound(r'\g<kanji>'), txt, flags=re.UNICODE)
+    return u''.join([t_kanji if kind == RUBY else text
+                     for kind, text, t_kanji, t_kana in tokenize(txt)])
 
 
 def kana(txt, *args):
     """Return the kana of a standard kakasi reading."""
-    if too_old:
-        return re.sub(split_pat, no_sound(r'\g<kana>'), txt)
-    return re.sub(split_pat, no_sound(r'\g<kana>'), txt, flags=re.UNICODE)
+    return u''.join([t_kana if kind == RUBY else text
+                     for kind, text, t_kanji, t_kana in tokenize(txt)])
@@ -0,0 +1,196 @@
+#!/usr/bin/python
+# -*- mode: python ; coding: utf-8 -*-
+# Build the conversion tables for romaji.py
+#
+# The table building is from http://halley.cc/code/?python/romaji.py
+# Text, code, layout and artwork are Copyright © 1996-2008 Ed Halley.
+# Copying in whole or in part, with author attribution, is expressly
+# allowed.
+
+'''
+Write romaji_tables.py, the tables romaji.py converts with.
+
+The kana and their romaji are found from the Unicode names of the
+characters. Doing that takes a while, so it is done here, once, and
+not every time romaji is imported.
+
+    $  python  make_romaji_tables.py
+
+    $  python  make_romaji_tables.py  --check
+
+With --check, build the tables and compare them with the ones in
+romaji_tables.py, without writing anything. Exit with 1 when they
+differ.
+'''
+
+import os
+import re
+import sys
+import unicodedata
+
+try:
+    unichr
+except NameError:
+    unichr = chr
+
+tables_name = 'romaji_tables.py'
+
+_irregular = {'SMALL ': 'X',
+              'TU': 'TSU', 'TI': 'CHI', 'SI': 'SHI', 'HU': 'FU', 'ZI': 'JI',
+              'WU': None, 'YI': None, 'YE': None}  # no such 'wu'...
+_compounds = {'JA': 'JI/XA', 'JU': 'JI/XU', 'JO': 'JI/XO',
+              'CHA': 'CHI/XYA', 'CHU': 'CHI/XYU', 'CHO': 'CHI/XYO',
+              'SHA': 'SHI/XYA', 'SHU': 'SHI/XYU', 'SHO': 'SHI/XYO',
+              }  # ji+a, chi+yu, ...
+_chiisaiya = 'KGHBPMR'  # ki+ya, gi+ya, hi+ya, ...
+_punctuals = {'-': u'ー',
+              '~': u'〜',
+              '.': u'。',
+              ',': u'、',
+              ' ': '',
+              '?': u'？',
+              }
+
+
+def build_tables():
+    '''Return the tables as a dict, name: value.'''
+    roma = {}
+    kana = {}
+    compounds = dict(_compounds)
+    # arrange gyou (syllabary rows) information
+    gyou = {'A': ['A', 'I', 'U', 'E', 'O'],
+            'a': ['a', 'i', 'u', 'e', 'o'],
+            'N': ['N'], 'n': ['n'],
+            'VU': ['VU'], }
+    for g in 'KA,GA,SA,ZA,TA,DA,NA,HA,BA,PA,MA,YA,RA,WA'.split(','):
+        gyou[g] = []
+        gyou[g.lower()] = []
+        for a in gyou['A']:
+            syllable = g[:1] + a
+            if syllable in _irregular:
+                syllable = _irregular[syllable]
+            if not syllable:
+                continue
+            gyou[g].append(syllable)
+            gyou[g.lower()].append(syllable.lower())
+    # find the basic kana and chiisai kana from their unicode data names
+    regular = re.compile(r'(HIRAGANA|KATAKANA) (LETTER) (.+)')
+    chiisai = re.compile(r'(HIRAGANA|KATAKANA) (SMALL LETTER) (.+)')
+    for point in range(0x3040, 0x30FF):
+        char = unichr(point)
+        for pattern in [regular, chiisai]:
+            match = pattern.match(unicodedata.name(char, ''))
+            if match:
+                syllable = match.group(3)
+                for fix in _irregular:
+                    if not _irregular[fix]:
+                        continue
+                    syllable = syllable.replace(fix, _irregular[fix])
+                if match.group(1) == 'HIRAGANA':
+                    syllable = syllable.lower()
+                if not syllable in kana:
+                    kana[syllable] = char
+                roma[char] = syllable
+    # make simple formulaic compounds with chiisai ya, yu, yo
+    for consonant in _chiisaiya:
+        for ya in ['YA', 'YU', 'YO']:
+            extended = consonant + 'I/X' + ya
+            compounds[consonant + ya] = extended
+            compounds[(consonant + ya).lower()] = extended.lower()
+    # deal with n
+    for n in ('N', 'n'):
+        kana[n + "'"] = kana[n]
+    # split and form kana information for each compound
+    for syllable in compounds:
+        for lower in (False, True):
+            (rk, rx) = compounds[syllable].split('/')
+            if lower:
+                (rk, rx) = (rk.lower(), rx.lower())
+                syllable = syllable.lower()
+            (kk, kx) = (kana[rk], kana[rx])
+            kana[syllable] = kk + kx
+            roma[kk + kx] = syllable
+    # common kana punctuation
+    for mark in _punctuals:
+        kana[mark] = _punctuals[mark]
+        roma[_punctuals[mark]] = mark
+    # how long is the longest kana or romaji symbol?
+    longest = max([len(x) for x in roma] + [len(x) for x in kana])
+    return {'roma_table': roma, 'kana_table': kana, 'gyou_table': gyou,
+            'longest': longest}
+
+
+def _literal(value):
+    # a python literal for the value that reads the same in python 2
+    # and 3: plain ascii strings stay str, the others are unicode
+    # strings with \u escapes
+    if isinstance(value, dict):
+        return u'{%s}' % u', '.join(
+            [u'%s: %s' % (_literal(k), _literal(value[k]))
+             for k in sorted(value)])
+    if isinstance(value, list):
+        return u'[%s]' % u', '.join([_literal(v) for v in value])
+    if isinstance(value, int):
+        return u'%d' % value
+    escaped = u''
+    for c in value:
+        if c in u"'\\":
+            escaped += u'\\' + c
+        elif 32 <= ord(c) < 127:
+            escaped += c
+        else:
+            escaped += u'\\u%04x' % ord(c)
+    if all(ord(c) < 128 for c in value):
+        return u"'%s'" % escaped
+    return u"u'%s'" % escaped
+
+
+def module_source(tables):
+    '''Return the text of romaji_tables.py.'''
+    lines = [
+        u'# -*- mode: python ; coding: utf-8 -*-',
+        u'# Generated by make_romaji_tables.py. Do not edit.',
+        u'# Run  python make_romaji_tables.py  to update,',
+        u'# and  python make_romaji_tables.py --check  to check.',
+        u'',
+        u"'''Conversion tables for romaji.py.'''",
+        u'']
+    for name in sorted(tables):
+        value = tables[name]
+        if isinstance(value, dict):
+            # one entry per line
+            lines.append(u'%s = {' % name)
+            lines += [u'    %s: %s,' % (_literal(k), _literal(value[k]))
+                      for k in sorted(value)]
+            lines.append(u'}')
+        else:
+            lines.append(u'%s = %s' % (name, _literal(value)))
+    return u'\n'.join(lines) + u'\n'
+
+
+def tables_path():
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        tables_name)
+
+
+def __check__():
+    import romaji_tables
+    tables = build_tables()
+    differences = 0
+    for name in sorted(tables):
+        if tables[name] != getattr(romaji_tables, name, None):
+            differences += 1
+            print('%s differs' % name)
+    print('%d tables differ' % differences)
+    return differences
+
+
+def __write__():
+    with open(tables_path(), 'wb') as tables_file:
+        tables_file.write(module_source(build_tables()).encode('ascii'))
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['--check']:
+        sys.exit(__check__() and 1)
+    __write__()
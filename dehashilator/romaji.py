@@ -25,117 +25,62 @@ SYNOPSIS
     >> repr( kana('konbanha') )
        u'\u3053\u3093\u3070\u3093\u306f'
 
+    >> roma_list([u'\u3053\u3093', u'\u306b\u3061\u306f'])
+       ['kon', 'nichiha']
+
     As a convenience, the script works at the command line too.
 
     $  python  romaji.py  < hiragana.txt > romaji.txt
 
     $  python  romaji.py  --kana  < romaji.txt > hiragana.txt
 
+    $  python  romaji.py  --parity
+
+    $  python  romaji.py  --bench
+
+    The conversion tables are in romaji_tables.py. That file is
+    written by make_romaji_tables.py.
+
 AUTHOR
 
     Ed Halley (ed@halley.cc) 10 December 2007
 
 '''
 
-__all__ = ['roma', 'kana', 'gyou', 'tenten', 'maru']
+__all__ = ['roma', 'kana', 'roma_list', 'kana_list', 'gyou', 'tenten',
+           'maru']
 
 
 import random
-import  unicodedata
 import re
 
-_roma = {}
-_kana = {}
-_gyou = {}
+from romaji_tables import gyou_table as _gyou, kana_table as _kana, \
+    longest as _long, roma_table as _roma
+
+# The tables are built from the Unicode names of the kana by
+# make_romaji_tables.py.
+
 _dann = {}
-_long = 0
-
-_irregular = {'SMALL ': 'X',
-              'TU': 'TSU', 'TI': 'CHI', 'SI': 'SHI', 'HU': 'FU', 'ZI': 'JI',
-              'WU': None, 'YI': None, 'YE': None}  # no such 'wu'...
-_compounds = {'JA': 'JI/XA', 'JU': 'JI/XU', 'JO': 'JI/XO',
-              'CHA': 'CHI/XYA', 'CHU': 'CHI/XYU', 'CHO': 'CHI/XYO',
-              'SHA': 'SHI/XYA', 'SHU': 'SHI/XYU', 'SHO': 'SHI/XYO',
-              }  # ji+a, chi+yu, ...
-_chiisaiya = 'KGHBPMR'  # ki+ya, gi+ya, hi+ya, ...
-_punctuals = {'-': u'\u30fc',
-              '~': u'\u301c',
-              '.': u'\u3002',
-              ',': u'\u3001',
-              ' ': '',
-              '?': u'\uff1f',
-              }
+_roma_re = None
+_kana_re = None
 
 
 def _setup():
-    global _roma
-    global _kana
-    global _gyou
-    global _dann
-    global _long
-    if _roma:
+    # compile the symbol patterns on first use
+    global _roma_re
+    global _kana_re
+    if _roma_re:
         return
-    # arrange gyou (syllabary rows) information
-    _gyou = {'A': ['A', 'I', 'U', 'E', 'O'],
-             'a': ['a', 'i', 'u', 'e', 'o'],
-             'N': ['N'], 'n': ['n'],
-             'VU': ['VU'], }
-    gyou = 'KA,GA,SA,ZA,TA,DA,NA,HA,BA,PA,MA,YA,RA,WA'.split(',')
-    for g in gyou:
-        _gyou[g] = []
-        _gyou[g.lower()] = []
-        for a in _gyou['A']:
-            kana = g[:1] + a
-            if kana in _irregular:
-                kana = _irregular[kana]
-            if not kana:
-                continue
-            _gyou[g].append(kana)
-            _gyou[g.lower()].append(kana.lower())
-    #TODO: set up dann table (u,ku,gu,su,zu,tsu,du,nu,fu,...)
-    # find the basic kana and chiisai kana from their unicode data names
-    regular = re.compile(r'(HIRAGANA|KATAKANA) (LETTER) (.+)')
-    chiisai = re.compile(r'(HIRAGANA|KATAKANA) (SMALL LETTER) (.+)')
-    for point in range(0x3040, 0x30FF):
-        char = unichr(point)
-        for pattern in [regular, chiisai]:
-            match = pattern.match(unicodedata.name(char, ''))
-            if match:
-                syllable = match.group(3)
-                for fix in _irregular:
-                    if not _irregular[fix]:
-                        continue
-                    syllable = syllable.replace(fix, _irregular[fix])
-                if match.group(1) == 'HIRAGANA':
-                    syllable = syllable.lower()
-                if not syllable in _kana:
-                    _kana[syllable] = char
-                _roma[char] = syllable
-    # make simple formulaic compounds with chiisai ya, yu, yo
-    for consonant in _chiisaiya:
-        for ya in ['YA', 'YU', 'YO']:
-            extended = consonant + 'I/X' + ya
-            _compounds[consonant + ya] = extended
-            _compounds[(consonant + ya).lower()] = extended.lower()
-    # deal with n
-    for n in ('N', 'n'):
-        _kana[n + "'"] = _kana[n]
-    # split and form kana information for each compound
-    for syllable in _compounds:
-        for lower in (False, True):
-            (rk, rx) = _compounds[syllable].split('/')
-            if lower:
-                (rk, rx) = (rk.lower(), rx.lower())
-                syllable = syllable.lower()
-            (kk, kx) = (_kana[rk], _kana[rx])
-            _kana[syllable] = kk + kx
-            _roma[kk + kx] = syllable
-    # common kana punctuation
-    for mark in _punctuals:
-        _kana[mark] = _punctuals[mark]
-        _roma[_punctuals[mark]] = mark
-    # how long is the longest kana or romaji symbol?
-    _long = max([len(x) for x in _roma] + [len(x) for x in _kana])
+    _roma_re = _compile(_roma)
+    _kana_re = _compile(_kana)
+
+
+def _compile(parts):
+    # one alternation of all the symbols, longer ones first, so that
+    # at each position the longest known symbol matches; the empty
+    # string (from the ' ' punctual) is never looked up
+    symbols = sorted([s for s in parts if s], key=len, reverse=True)
+    return re.compile(u'|'.join([re.escape(s) for s in symbols]))
 
 
 def normalize(g):
@@ -229,7 +174,15 @@ def dann(d, family=None, kanaify=False, rare=False):
     return None
 
 
-def _convert(text, parts):
+def _convert(text, parts, pattern):
+    # replace each longest known symbol by its translated form in one
+    # pass; characters that start no symbol are passed through
+    return pattern.sub(lambda match: parts[match.group(0)], text)
+
+
+def _convert_by_slicing(text, parts):
+    # the original converter, kept to check _convert against
+    #
     # eat the incoming text from start to finish; each time the head
     # of the string matches a known symbol, output that symbol's
     # translated form; look for longer symbols before shorter ones
@@ -249,7 +202,26 @@ def _convert(text, parts):
     return result
 
 
-def roma(kana):
+_roma_fixes = [(re.compile(pattern), replacement) for pattern, replacement in [
+    (r'XTSU([KGTDBPR])', r'\1\1'),
+    (r'xtsu([kgtdbpr])', r'\1\1'),
+    (r'XTSUCH', r'CCH'),
+    (r'xtsuch', r'cch'),
+    (r'X(TSU|YA|YU|YO|A|I|U|E|O)', r'\1'),
+    (r'x(tsu|ya|yu|yo|a|i|u|e|o)', r'\1'),
+    (r"N'", r'N'),
+    (r"n'", r'n')]]
+
+_kana_fixes = [(re.compile(pattern), replacement) for pattern, replacement in [
+    (r'([KGTDBPRL])\1', r'XTSU\1'),
+    (r'([kgtdbprl])\1', r'xtsu\1'),
+    (r'([TC]CH)', r'XTSUCH'),
+    (r'([tc]ch)', r'xtsuch'),
+    (r"[nm]'?([^aiueo]|$)", r"n'\1"),
+    (r"[NM]'?([^AIUEO]|$)", r"N'\1")]]
+
+
+def roma(kana, convert=None):
     '''
     Convert from romaji to kana.
 
@@ -257,35 +229,44 @@ def roma(kana):
     Hiragana characters come out in lowercase; katakana in uppercase.
     Any unknown characters (kanji, letters, punctuation) are passed
     through unchanged.
+    The convert argument is only used to compare with other ways to
+    do the conversion, see __parity__().
     '''
-    kana = re.sub(r'L', r'R', kana)
-    kana = re.sub(r'l', r'r', kana)
-    roma = _convert(kana, _roma)
-    roma = re.sub(r'XTSU([KGTDBPR])', r'\1\1', roma)
-    roma = re.sub(r'xtsu([kgtdbpr])', r'\1\1', roma)
-    roma = re.sub(r'XTSUCH', r'CCH', roma)
-    roma = re.sub(r'xtsuch', r'cch', roma)
-    roma = re.sub(r'X(TSU|YA|YU|YO|A|I|U|E|O)', r'\1', roma)
-    roma = re.sub(r'x(tsu|ya|yu|yo|a|i|u|e|o)', r'\1', roma)
-    roma = re.sub(r"N'", r'N', roma)
-    roma = re.sub(r"n'", r'n', roma)
+    kana = kana.replace('L', 'R').replace('l', 'r')
+    if convert:
+        roma = convert(kana, _roma)
+    else:
+        _setup()
+        roma = _convert(kana, _roma, _roma_re)
+    for pattern, replacement in _roma_fixes:
+        roma = pattern.sub(replacement, roma)
     return roma
 
 
-def kana(roma):
+def kana(roma, convert=None):
     '''Converts a string with romaji into hiragana and katakana.
     Lowercase letters are converted to hiragana symbols wherever possible;
     uppercase letters become katakana.  The output is a unicode string.
     Any unknown characters (kanji, letters, punctuation) or unknown letter
     combinations are passed through unchanged.
+    See roma() for convert.
     '''
-    roma = re.sub(r'([KGTDBPRL])\1', r'XTSU\1', roma)
-    roma = re.sub(r'([kgtdbprl])\1', r'xtsu\1', roma)
-    roma = re.sub(r'([TC]CH)', r'XTSUCH', roma)
-    roma = re.sub(r'([tc]ch)', r'xtsuch', roma)
-    roma = re.sub(r"[nm]'?([^aiueo]|$)", r"n'\1", roma)
-    roma = re.sub(r"[NM]'?([^AIUEO]|$)", r"N'\1", roma)
-    return _convert(roma, _kana)
+    for pattern, replacement in _kana_fixes:
+        roma = pattern.sub(replacement, roma)
+    if convert:
+        return convert(roma, _kana)
+    _setup()
+    return _convert(roma, _kana, _kana_re)
+
+
+def roma_list(texts):
+    '''Converts each of the kana strings into romaji.'''
+    return [roma(text) for text in texts]
+
+
+def kana_list(texts):
+    '''Converts each of the romaji strings into kana.'''
+    return [kana(text) for text in texts]
 
 
 def html(text):
@@ -299,9 +280,6 @@ def html(text):
     return result
 
 
-_setup()
-
-
 def __test__():
     import testing
     from testing import __ok__
@@ -364,6 +342,44 @@ def __test__():
     testing.__report__()
 
 
+def __samples__():
+    # every table entry, and every pair of entries
+    samples = []
+    for parts in (_roma, _kana):
+        symbols = sorted(parts)
+        samples += symbols
+        samples += [a + b for a in symbols for b in symbols]
+    return samples
+
+
+def __parity__():
+    # compare the compiled converter with the old one
+    mismatches = 0
+    for text in __samples__():
+        for function in (roma, kana):
+            if function(text) != function(text, _convert_by_slicing):
+                mismatches += 1
+                print(repr((function.__name__, text)))
+    print('%d mismatches' % mismatches)
+    return mismatches
+
+
+def __bench__():
+    import timeit
+    samples = __samples__()
+    # the pairs, and longer strings, more like whole fields
+    long_samples = [u''.join(samples[i:i + 20])
+                    for i in range(0, len(samples), 20)]
+    for texts in (samples, long_samples):
+        for name, convert in [('compiled', None),
+                              ('slicing', _convert_by_slicing)]:
+            seconds = timeit.timeit(
+                lambda: [(roma(t, convert), kana(t, convert))
+                         for t in texts],
+                number=1)
+            print('%s: %.3f s for %d strings' % (name, seconds, len(texts)))
+
+
 def __pipe__(filter):
     import sys
     for line in sys.stdin.xreadlines():
@@ -381,6 +397,10 @@ if __name__ == '__main__':
     sys.argv.pop(0)
     if sys.argv and sys.argv[0] == '--test':
         __test__()
+    elif sys.argv and sys.argv[0] == '--parity':
+        sys.exit(__parity__() and 1)
+    elif sys.argv and sys.argv[0] == '--bench':
+        __bench__()
     elif sys.argv and sys.argv[0] == '--kana':
         __utf8__()
         __pipe__(kana)
@@ -0,0 +1,533 @@
+# -*- mode: python ; coding: utf-8 -*-
+# Generated by make_romaji_tables.py. Do not edit.
+# Run  python make_romaji_tables.py  to update,
+# and  python make_romaji_tables.py --check  to check.
+
+'''Conversion tables for romaji.py.'''
+
+gyou_table = {
+    'A': ['A', 'I', 'U', 'E', 'O'],
+    'BA': ['BA', 'BI', 'BU', 'BE', 'BO'],
+    'DA': ['DA', 'DI', 'DU', 'DE', 'DO'],
+    'GA': ['GA', 'GI', 'GU', 'GE', 'GO'],
+    'HA': ['HA', 'HI', 'FU', 'HE', 'HO'],
+    'KA': ['KA', 'KI', 'KU', 'KE', 'KO'],
+    'MA': ['MA', 'MI', 'MU', 'ME', 'MO'],
+    'N': ['N'],
+    'NA': ['NA', 'NI', 'NU', 'NE', 'NO'],
+    'PA': ['PA', 'PI', 'PU', 'PE', 'PO'],
+    'RA': ['RA', 'RI', 'RU', 'RE', 'RO'],
+    'SA': ['SA', 'SHI', 'SU', 'SE', 'SO'],
+    'TA': ['TA', 'CHI', 'TSU', 'TE', 'TO'],
+    'VU': ['VU'],
+    'WA': ['WA', 'WI', 'WE', 'WO'],
+    'YA': ['YA', 'YU', 'YO'],
+    'ZA': ['ZA', 'JI', 'ZU', 'ZE', 'ZO'],
+    'a': ['a', 'i', 'u', 'e', 'o'],
+    'ba': ['ba', 'bi', 'bu', 'be', 'bo'],
+    'da': ['da', 'di', 'du', 'de', 'do'],
+    'ga': ['ga', 'gi', 'gu', 'ge', 'go'],
+    'ha': ['ha', 'hi', 'fu', 'he', 'ho'],
+    'ka': ['ka', 'ki', 'ku', 'ke', 'ko'],
+    'ma': ['ma', 'mi', 'mu', 'me', 'mo'],
+    'n': ['n'],
+    'na': ['na', 'ni', 'nu', 'ne', 'no'],
+    'pa': ['pa', 'pi', 'pu', 'pe', 'po'],
+    'ra': ['ra', 'ri', 'ru', 're', 'ro'],
+    'sa': ['sa', 'shi', 'su', 'se', 'so'],
+    'ta': ['ta', 'chi', 'tsu', 'te', 'to'],
+    'wa': ['wa', 'wi', 'we', 'wo'],
+    'ya': ['ya', 'yu', 'yo'],
+    'za': ['za', 'ji', 'zu', 'ze', 'zo'],
+}
+kana_table = {
+    ' ': '',
+    ',': u'\u3001',
+    '-': u'\u30fc',
+    '.': u'\u3002',
+    '?': u'\uff1f',
+    'A': u'\u30a2',
+    'BA': u'\u30d0',
+    'BE': u'\u30d9',
+    'BI': u'\u30d3',
+    'BO': u'\u30dc',
+    'BU': u'\u30d6',
+    'BYA': u'\u30d3\u30e3',
+    'BYO': u'\u30d3\u30e7',
+    'BYU': u'\u30d3\u30e5',
+    'CHA': u'\u30c1\u30e3',
+    'CHI': u'\u30c1',
+    'CHO': u'\u30c1\u30e7',
+    'CHU': u'\u30c1\u30e5',
+    'DA': u'\u30c0',
+    'DE': u'\u30c7',
+    'DI': u'\u30c2',
+    'DO': u'\u30c9',
+    'DU': u'\u30c5',
+    'E': u'\u30a8',
+    'FU': u'\u30d5',
+    'GA': u'\u30ac',
+    'GE': u'\u30b2',
+    'GI': u'\u30ae',
+    'GO': u'\u30b4',
+    'GU': u'\u30b0',
+    'GYA': u'\u30ae\u30e3',
+    'GYO': u'\u30ae\u30e7',
+    'GYU': u'\u30ae\u30e5',
+    'HA': u'\u30cf',
+    'HE': u'\u30d8',
+    'HI': u'\u30d2',
+    'HO': u'\u30db',
+    'HYA': u'\u30d2\u30e3',
+    'HYO': u'\u30d2\u30e7',
+    'HYU': u'\u30d2\u30e5',
+    'I': u'\u30a4',
+    'JA': u'\u30b8\u30a1',
+    'JI': u'\u30b8',
+    'JO': u'\u30b8\u30a9',
+    'JU': u'\u30b8\u30a5',
+    'KA': u'\u30ab',
+    'KE': u'\u30b1',
+    'KI': u'\u30ad',
+    'KO': u'\u30b3',
+    'KU': u'\u30af',
+    'KYA': u'\u30ad\u30e3',
+    'KYO': u'\u30ad\u30e7',
+    'KYU': u'\u30ad\u30e5',
+    'MA': u'\u30de',
+    'ME': u'\u30e1',
+    'MI': u'\u30df',
+    'MO': u'\u30e2',
+    'MU': u'\u30e0',
+    'MYA': u'\u30df\u30e3',
+    'MYO': u'\u30df\u30e7',
+    'MYU': u'\u30df\u30e5',
+    'N': u'\u30f3',
+    'N\'': u'\u30f3',
+    'NA': u'\u30ca',
+    'NE': u'\u30cd',
+    'NI': u'\u30cb',
+    'NO': u'\u30ce',
+    'NU': u'\u30cc',
+    'O': u'\u30aa',
+    'PA': u'\u30d1',
+    'PE': u'\u30da',
+    'PI': u'\u30d4',
+    'PO': u'\u30dd',
+    'PU': u'\u30d7',
+    'PYA': u'\u30d4\u30e3',
+    'PYO': u'\u30d4\u30e7',
+    'PYU': u'\u30d4\u30e5',
+    'RA': u'\u30e9',
+    'RE': u'\u30ec',
+    'RI': u'\u30ea',
+    'RO': u'\u30ed',
+    'RU': u'\u30eb',
+    'RYA': u'\u30ea\u30e3',
+    'RYO': u'\u30ea\u30e7',
+    'RYU': u'\u30ea\u30e5',
+    'SA': u'\u30b5',
+    'SE': u'\u30bb',
+    'SHA': u'\u30b7\u30e3',
+    'SHI': u'\u30b7',
+    'SHO': u'\u30b7\u30e7',
+    'SHU': u'\u30b7\u30e5',
+    'SO': u'\u30bd',
+    'SU': u'\u30b9',
+    'TA': u'\u30bf',
+    'TE': u'\u30c6',
+    'TO': u'\u30c8',
+    'TSU': u'\u30c4',
+    'U': u'\u30a6',
+    'VA': u'\u30f7',
+    'VE': u'\u30f9',
+    'VI': u'\u30f8',
+    'VO': u'\u30fa',
+    'VU': u'\u30f4',
+    'WA': u'\u30ef',
+    'WE': u'\u30f1',
+    'WI': u'\u30f0',
+    'WO': u'\u30f2',
+    'XA': u'\u30a1',
+    'XE': u'\u30a7',
+    'XI': u'\u30a3',
+    'XKA': u'\u30f5',
+    'XKE': u'\u30f6',
+    'XO': u'\u30a9',
+    'XTSU': u'\u30c3',
+    'XU': u'\u30a5',
+    'XWA': u'\u30ee',
+    'XYA': u'\u30e3',
+    'XYO': u'\u30e7',
+    'XYU': u'\u30e5',
+    'YA': u'\u30e4',
+    'YO': u'\u30e8',
+    'YU': u'\u30e6',
+    'ZA': u'\u30b6',
+    'ZE': u'\u30bc',
+    'ZO': u'\u30be',
+    'ZU': u'\u30ba',
+    'a': u'\u3042',
+    'ba': u'\u3070',
+    'be': u'\u3079',
+    'bi': u'\u3073',
+    'bo': u'\u307c',
+    'bu': u'\u3076',
+    'bya': u'\u3073\u3083',
+    'byo': u'\u3073\u3087',
+    'byu': u'\u3073\u3085',
+    'cha': u'\u3061\u3083',
+    'chi': u'\u3061',
+    'cho': u'\u3061\u3087',
+    'chu': u'\u3061\u3085',
+    'da': u'\u3060',
+    'de': u'\u3067',
+    'di': u'\u3062',
+    'do': u'\u3069',
+    'du': u'\u3065',
+    'e': u'\u3048',
+    'fu': u'\u3075',
+    'ga': u'\u304c',
+    'ge': u'\u3052',
+    'gi': u'\u304e',
+    'go': u'\u3054',
+    'gu': u'\u3050',
+    'gya': u'\u304e\u3083',
+    'gyo': u'\u304e\u3087',
+    'gyu': u'\u304e\u3085',
+    'ha': u'\u306f',
+    'he': u'\u3078',
+    'hi': u'\u3072',
+    'ho': u'\u307b',
+    'hya': u'\u3072\u3083',
+    'hyo': u'\u3072\u3087',
+    'hyu': u'\u3072\u3085',
+    'i': u'\u3044',
+    'ja': u'\u3058\u3041',
+    'ji': u'\u3058',
+    'jo': u'\u3058\u3049',
+    'ju': u'\u3058\u3045',
+    'ka': u'\u304b',
+    'ke': u'\u3051',
+    'ki': u'\u304d',
+    'ko': u'\u3053',
+    'ku': u'\u304f',
+    'kya': u'\u304d\u3083',
+    'kyo': u'\u304d\u3087',
+    'kyu': u'\u304d\u3085',
+    'ma': u'\u307e',
+    'me': u'\u3081',
+    'mi': u'\u307f',
+    'mo': u'\u3082',
+    'mu': u'\u3080',
+    'mya': u'\u307f\u3083',
+    'myo': u'\u307f\u3087',
+    'myu': u'\u307f\u3085',
+    'n': u'\u3093',
+    'n\'': u'\u3093',
+    'na': u'\u306a',
+    'ne': u'\u306d',
+    'ni': u'\u306b',
+    'no': u'\u306e',
+    'nu': u'\u306c',
+    'o': u'\u304a',
+    'pa': u'\u3071',
+    'pe': u'\u307a',
+    'pi': u'\u3074',
+    'po': u'\u307d',
+    'pu': u'\u3077',
+    'pya': u'\u3074\u3083',
+    'pyo': u'\u3074\u3087',
+    'pyu': u'\u3074\u3085',
+    'ra': u'\u3089',
+    're': u'\u308c',
+    'ri': u'\u308a',
+    'ro': u'\u308d',
+    'ru': u'\u308b',
+    'rya': u'\u308a\u3083',
+    'ryo': u'\u308a\u3087',
+    'ryu': u'\u308a\u3085',
+    'sa': u'\u3055',
+    'se': u'\u305b',
+    'sha': u'\u3057\u3083',
+    'shi': u'\u3057',
+    'sho': u'\u3057\u3087',
+    'shu': u'\u3057\u3085',
+    'so': u'\u305d',
+    'su': u'\u3059',
+    'ta': u'\u305f',
+    'te': u'\u3066',
+    'to': u'\u3068',
+    'tsu': u'\u3064',
+    'u': u'\u3046',
+    'vu': u'\u3094',
+    'wa': u'\u308f',
+    'we': u'\u3091',
+    'wi': u'\u3090',
+    'wo': u'\u3092',
+    'xa': u'\u3041',
+    'xe': u'\u3047',
+    'xi': u'\u3043',
+    'xka': u'\u3095',
+    'xke': u'\u3096',
+    'xo': u'\u3049',
+    'xtsu': u'\u3063',
+    'xu': u'\u3045',
+    'xwa': u'\u308e',
+    'xya': u'\u3083',
+    'xyo': u'\u3087',
+    'xyu': u'\u3085',
+    'ya': u'\u3084',
+    'yo': u'\u3088',
+    'yu': u'\u3086',
+    'za': u'\u3056',
+    'ze': u'\u305c',
+    'zo': u'\u305e',
+    'zu': u'\u305a',
+    '~': u'\u301c',
+}
+longest = 4
+roma_table = {
+    '': ' ',
+    u'\u3001': ',',
+    u'\u3002': '.',
+    u'\u301c': '~',
+    u'\u3041': 'xa',
+    u'\u3042': 'a',
+    u'\u3043': 'xi',
+    u'\u3044': 'i',
+    u'\u3045': 'xu',
+    u'\u3046': 'u',
+    u'\u3047': 'xe',
+    u'\u3048': 'e',
+    u'\u3049': 'xo',
+    u'\u304a': 'o',
+    u'\u304b': 'ka',
+    u'\u304c': 'ga',
+    u'\u304d': 'ki',
+    u'\u304d\u3083': 'kya',
+    u'\u304d\u3085': 'kyu',
+    u'\u304d\u3087': 'kyo',
+    u'\u304e': 'gi',
+    u'\u304e\u3083': 'gya',
+    u'\u304e\u3085': 'gyu',
+    u'\u304e\u3087': 'gyo',
+    u'\u304f': 'ku',
+    u'\u3050': 'gu',
+    u'\u3051': 'ke',
+    u'\u3052': 'ge',
+    u'\u3053': 'ko',
+    u'\u3054': 'go',
+    u'\u3055': 'sa',
+    u'\u3056': 'za',
+    u'\u3057': 'shi',
+    u'\u3057\u3083': 'sha',
+    u'\u3057\u3085': 'shu',
+    u'\u3057\u3087': 'sho',
+    u'\u3058': 'ji',
+    u'\u3058\u3041': 'ja',
+    u'\u3058\u3045': 'ju',
+    u'\u3058\u3049': 'jo',
+    u'\u3059': 'su',
+    u'\u305a': 'zu',
+    u'\u305b': 'se',
+    u'\u305c': 'ze',
+    u'\u305d': 'so',
+    u'\u305e': 'zo',
+    u'\u305f': 'ta',
+    u'\u3060': 'da',
+    u'\u3061': 'chi',
+    u'\u3061\u3083': 'cha',
+    u'\u3061\u3085': 'chu',
+    u'\u3061\u3087': 'cho',
+    u'\u3062': 'di',
+    u'\u3063': 'xtsu',
+    u'\u3064': 'tsu',
+    u'\u3065': 'du',
+    u'\u3066': 'te',
+    u'\u3067': 'de',
+    u'\u3068': 'to',
+    u'\u3069': 'do',
+    u'\u306a': 'na',
+    u'\u306b': 'ni',
+    u'\u306c': 'nu',
+    u'\u306d': 'ne',
+    u'\u306e': 'no',
+    u'\u306f': 'ha',
+    u'\u3070': 'ba',
+    u'\u3071': 'pa',
+    u'\u3072': 'hi',
+    u'\u3072\u3083': 'hya',
+    u'\u3072\u3085': 'hyu',
+    u'\u3072\u3087': 'hyo',
+    u'\u3073': 'bi',
+    u'\u3073\u3083': 'bya',
+    u'\u3073\u3085': 'byu',
+    u'\u3073\u3087': 'byo',
+    u'\u3074': 'pi',
+    u'\u3074\u3083': 'pya',
+    u'\u3074\u3085': 'pyu',
+    u'\u3074\u3087': 'pyo',
+    u'\u3075': 'fu',
+    u'\u3076': 'bu',
+    u'\u3077': 'pu',
+    u'\u3078': 'he',
+    u'\u3079': 'be',
+    u'\u307a': 'pe',
+    u'\u307b': 'ho',
+    u'\u307c': 'bo',
+    u'\u307d': 'po',
+    u'\u307e': 'ma',
+    u'\u307f': 'mi',
+    u'\u307f\u3083': 'mya',
+    u'\u307f\u3085': 'myu',
+    u'\u307f\u3087': 'myo',
+    u'\u3080': 'mu',
+    u'\u3081': 'me',
+    u'\u3082': 'mo',
+    u'\u3083': 'xya',
+    u'\u3084': 'ya',
+    u'\u3085': 'xyu',
+    u'\u3086': 'yu',
+    u'\u3087': 'xyo',
+    u'\u3088': 'yo',
+    u'\u3089': 'ra',
+    u'\u308a': 'ri',
+    u'\u308a\u3083': 'rya',
+    u'\u308a\u3085': 'ryu',
+    u'\u308a\u3087': 'ryo',
+    u'\u308b': 'ru',
+    u'\u308c': 're',
+    u'\u308d': 'ro',
+    u'\u308e': 'xwa',
+    u'\u308f': 'wa',
+    u'\u3090': 'wi',
+    u'\u3091': 'we',
+    u'\u3092': 'wo',
+    u'\u3093': 'n',
+    u'\u3094': 'vu',
+    u'\u3095': 'xka',
+    u'\u3096': 'xke',
+    u'\u30a1': 'XA',
+    u'\u30a2': 'A',
+    u'\u30a3': 'XI',
+    u'\u30a4': 'I',
+    u'\u30a5': 'XU',
+    u'\u30a6': 'U',
+    u'\u30a7': 'XE',
+    u'\u30a8': 'E',
+    u'\u30a9': 'XO',
+    u'\u30aa': 'O',
+    u'\u30ab': 'KA',
+    u'\u30ac': 'GA',
+    u'\u30ad': 'KI',
+    u'\u30ad\u30e3': 'KYA',
+    u'\u30ad\u30e5': 'KYU',
+    u'\u30ad\u30e7': 'KYO',
+    u'\u30ae': 'GI',
+    u'\u30ae\u30e3': 'GYA',
+    u'\u30ae\u30e5': 'GYU',
+    u'\u30ae\u30e7': 'GYO',
+    u'\u30af': 'KU',
+    u'\u30b0': 'GU',
+    u'\u30b1': 'KE',
+    u'\u30b2': 'GE',
+    u'\u30b3': 'KO',
+    u'\u30b4': 'GO',
+    u'\u30b5': 'SA',
+    u'\u30b6': 'ZA',
+    u'\u30b7': 'SHI',
+    u'\u30b7\u30e3': 'SHA',
+    u'\u30b7\u30e5': 'SHU',
+    u'\u30b7\u30e7': 'SHO',
+    u'\u30b8': 'JI',
+    u'\u30b8\u30a1': 'JA',
+    u'\u30b8\u30a5': 'JU',
+    u'\u30b8\u30a9': 'JO',
+    u'\u30b9': 'SU',
+    u'\u30ba': 'ZU',
+    u'\u30bb': 'SE',
+    u'\u30bc': 'ZE',
+    u'\u30bd': 'SO',
+    u'\u30be': 'ZO',
+    u'\u30bf': 'TA',
+    u'\u30c0': 'DA',
+    u'\u30c1': 'CHI',
+    u'\u30c1\u30e3': 'CHA',
+    u'\u30c1\u30e5': 'CHU',
+    u'\u30c1\u30e7': 'CHO',
+    u'\u30c2': 'DI',
+    u'\u30c3': 'XTSU',
+    u'\u30c4': 'TSU',
+    u'\u30c5': 'DU',
+    u'\u30c6': 'TE',
+    u'\u30c7': 'DE',
+    u'\u30c8': 'TO',
+    u'\u30c9': 'DO',
+    u'\u30ca': 'NA',
+    u'\u30cb': 'NI',
+    u'\u30cc': 'NU',
+    u'\u30cd': 'NE',
+    u'\u30ce': 'NO',
+    u'\u30cf': 'HA',
+    u'\u30d0': 'BA',
+    u'\u30d1': 'PA',
+    u'\u30d2': 'HI',
+    u'\u30d2\u30e3': 'HYA',
+    u'\u30d2\u30e5': 'HYU',
+    u'\u30d2\u30e7': 'HYO',
+    u'\u30d3': 'BI',
+    u'\u30d3\u30e3': 'BYA',
+    u'\u30d3\u30e5': 'BYU',
+    u'\u30d3\u30e7': 'BYO',
+    u'\u30d4': 'PI',
+    u'\u30d4\u30e3': 'PYA',
+    u'\u30d4\u30e5': 'PYU',
+    u'\u30d4\u30e7': 'PYO',
+    u'\u30d5': 'FU',
+    u'\u30d6': 'BU',
+    u'\u30d7': 'PU',
+    u'\u30d8': 'HE',
+    u'\u30d9': 'BE',
+    u'\u30da': 'PE',
+    u'\u30db': 'HO',
+    u'\u30dc': 'BO',
+    u'\u30dd': 'PO',
+    u'\u30de': 'MA',
+    u'\u30df': 'MI',
+    u'\u30df\u30e3': 'MYA',
+    u'\u30df\u30e5': 'MYU',
+    u'\u30df\u30e7': 'MYO',
+    u'\u30e0': 'MU',
+    u'\u30e1': 'ME',
+    u'\u30e2': 'MO',
+    u'\u30e3': 'XYA',
+    u'\u30e4': 'YA',
+    u'\u30e5': 'XYU',
+    u'\u30e6': 'YU',
+    u'\u30e7': 'XYO',
+    u'\u30e8': 'YO',
+    u'\u30e9': 'RA',
+    u'\u30ea': 'RI',
+    u'\u30ea\u30e3': 'RYA',
+    u'\u30ea\u30e5': 'RYU',
+    u'\u30ea\u30e7': 'RYO',
+    u'\u30eb': 'RU',
+    u'\u30ec': 'RE',
+    u'\u30ed': 'RO',
+    u'\u30ee': 'XWA',
+    u'\u30ef': 'WA',
+    u'\u30f0': 'WI',
+    u'\u30f1': 'WE',
+    u'\u30f2': 'WO',
+    u'\u30f3': 'N',
+    u'\u30f4': 'VU',
+    u'\u30f5': 'XKA',
+    u'\u30f6': 'XKE',
+    u'\u30f7': 'VA',
+    u'\u30f8': 'VI',
+    u'\u30f9': 'VE',
+    u'\u30fa': 'VO',
+    u'\u30fc': '-',
+    u'\uff1f': '?',
+}
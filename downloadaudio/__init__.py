@@ -24,4 +24,5 @@ __version__ = "5.0.0"
 
 import conflanguage
 import download
+import download_on_add
 import model
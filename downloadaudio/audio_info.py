@@ -0,0 +1,261 @@
+# -*- mode: python ; coding: utf-8 -*-
+#
+# Copyright © 2017 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+u"""
+Get duration, bit rate &c. of audio files without decoding them.
+
+Only the headers are read: for mp3 the first frame header and the
+Xing/Info or VBRI header, for ogg the identification header and the
+granule position of the last page, for wav the fmt and data chunks.
+"""
+
+from collections import namedtuple
+import os
+import struct
+
+
+AudioInfo = namedtuple(
+    'AudioInfo', ['duration', 'bitrate', 'sample_rate', 'channels'])
+# Duration in seconds, bit rate in bits per second.
+
+head_size = 16 * 1024
+tail_size = 64 * 1024
+# How much we read at the beginning and at the end of a file.
+
+mp3_bitrates = {
+    # (MPEG 1?, layer): kbit/s for bit rate index 0–14
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352,
+                384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256,
+                320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224,
+                256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192,
+                 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144,
+                 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144,
+                 160)}
+
+mp3_sample_rates = {
+    # Version bits: sample rates for sample rate index 0–2
+    3: (44100, 48000, 32000),  # MPEG 1
+    2: (22050, 24000, 16000),  # MPEG 2
+    0: (11025, 12000, 8000)}  # MPEG 2.5
+
+Mp3Frame = namedtuple(
+    'Mp3Frame', ['mpeg1', 'layer', 'bitrate', 'sample_rate', 'channels',
+                 'samples', 'length'])
+
+
+def audio_info(file_path, extension):
+    u"""
+    Return an AudioInfo for the file, or None.
+
+    The extension (with or without dot) tells us how to look at the
+    file. None means that we don’t know the format or couldn’t make
+    sense of the file.
+    """
+    info_function = info_functions.get(extension.lstrip('.').lower())
+    if not info_function:
+        return None
+    try:
+        with open(file_path, 'rb') as audio_file:
+            return info_function(audio_file, os.path.getsize(file_path))
+    except (IOError, OSError, struct.error, IndexError, ZeroDivisionError):
+        return None
+
+
+def read_tail(audio_file, file_size):
+    u"""Return the last tail_size bytes of the file."""
+    audio_file.seek(max(0, file_size - tail_size))
+    return audio_file.read()
+
+
+def parse_mp3_frame_header(data, pos):
+    u"""Return an Mp3Frame for the header at pos, or None."""
+    if pos + 4 > len(data) or data[pos] != 0xff \
+            or data[pos + 1] & 0xe0 != 0xe0:
+        return None
+    version_bits = (data[pos + 1] >> 3) & 3
+    layer = 4 - ((data[pos + 1] >> 1) & 3)
+    bitrate_index = data[pos + 2] >> 4
+    sample_rate_index = (data[pos + 2] >> 2) & 3
+    if version_bits == 1 or layer == 4 or bitrate_index in (0, 15) \
+            or sample_rate_index == 3:
+        # Reserved values or free format. Not a (usable) frame.
+        return None
+    mpeg1 = version_bits == 3
+    bitrate = mp3_bitrates[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = mp3_sample_rates[version_bits][sample_rate_index]
+    padding = (data[pos + 2] >> 1) & 1
+    channels = 1 if data[pos + 3] >> 6 == 3 else 2
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if mpeg1 or layer == 2 else 576
+        length = samples // 8 * bitrate // sample_rate + padding
+    return Mp3Frame(
+        mpeg1, layer, bitrate, sample_rate, channels, samples, length)
+
+
+def find_mp3_frame(data, pos):
+    u"""
+    Return the position and Mp3Frame of the first frame.
+
+    To avoid false syncs in junk data, a frame only counts when the
+    next frame follows directly, or when it ends the data we have.
+    """
+    while True:
+        pos = data.find(b'\xff', pos)
+        if pos < 0:
+            return None, None
+        frame = parse_mp3_frame_header(data, pos)
+        if frame:
+            next_pos = pos + frame.length
+            if next_pos + 4 > len(data) \
+                    or parse_mp3_frame_header(data, next_pos):
+                return pos, frame
+        pos += 1
+
+
+def mp3_info(audio_file, file_size):
+    u"""Return the AudioInfo of an mp3 file."""
+    data = audio_file.read(head_size)
+    data_offset = 0
+    if data[:3] == b'ID3':
+        # Skip the ID3v2 tag. Its size is stored as a “syncsafe”
+        # integer, seven bits per byte.
+        tag_size = 0
+        for byte in data[6:10]:
+            tag_size = (tag_size << 7) | (byte & 0x7f)
+        data_offset = 10 + tag_size + (10 if data[5] & 0x10 else 0)
+        audio_file.seek(data_offset)
+        data = audio_file.read(head_size)
+    pos, frame = find_mp3_frame(data, 0)
+    if frame is None:
+        return None
+    audio_size = file_size - data_offset - pos
+    audio_file.seek(max(0, file_size - 128))
+    if audio_file.read(3) == b'TAG':
+        audio_size -= 128
+    frame_count, byte_count = vbr_header_counts(data, pos, frame)
+    if frame_count:
+        duration = float(frame_count * frame.samples) / frame.sample_rate
+        bitrate = int((byte_count or audio_size) * 8 / duration)
+    else:
+        duration = audio_size * 8.0 / frame.bitrate
+        bitrate = frame.bitrate
+    return AudioInfo(duration, bitrate, frame.sample_rate, frame.channels)
+
+
+def vbr_header_counts(data, pos, frame):
+    u"""
+    Return the frame and byte counts from a Xing/Info or VBRI header.
+
+    Return (None, None) when the first frame doesn’t have one of those.
+    """
+    if frame.mpeg1:
+        side_info_size = 17 if frame.channels == 1 else 32
+    else:
+        side_info_size = 9 if frame.channels == 1 else 17
+    xing_pos = pos + 4 + side_info_size
+    if data[xing_pos:xing_pos + 4] in (b'Xing', b'Info'):
+        flags, = struct.unpack('>I', data[xing_pos + 4:xing_pos + 8])
+        field_pos = xing_pos + 8
+        frame_count = byte_count = None
+        if flags & 1:
+            frame_count, = struct.unpack(
+                '>I', data[field_pos:field_pos + 4])
+            field_pos += 4
+        if flags & 2:
+            byte_count, = struct.unpack('>I', data[field_pos:field_pos + 4])
+        return frame_count, byte_count
+    vbri_pos = pos + 4 + 32
+    if data[vbri_pos:vbri_pos + 4] == b'VBRI':
+        byte_count, frame_count = struct.unpack(
+            '>II', data[vbri_pos + 10:vbri_pos + 18])
+        return frame_count, byte_count
+    return None, None
+
+
+def ogg_info(audio_file, file_size):
+    u"""Return the AudioInfo of an ogg vorbis or opus file."""
+    data = audio_file.read(head_size)
+    if data[:4] != b'OggS':
+        return None
+    serial, = struct.unpack('<I', data[14:18])
+    segment_count = data[26]
+    packet = data[27 + segment_count:]
+    if packet[:7] == b'\x01vorbis':
+        channels = packet[11]
+        sample_rate, = struct.unpack('<I', packet[12:16])
+        granule_rate = sample_rate
+        pre_skip = 0
+    elif packet[:8] == b'OpusHead':
+        channels = packet[9]
+        pre_skip, sample_rate = struct.unpack('<HI', packet[10:16])
+        granule_rate = 48000
+        # Opus always counts 48 kHz samples.
+    else:
+        return None
+    last_granule = last_ogg_granule(read_tail(audio_file, file_size), serial)
+    if last_granule is None:
+        return None
+    duration = max(0.0, float(last_granule - pre_skip) / granule_rate)
+    bitrate = int(file_size * 8 / duration) if duration else 0
+    return AudioInfo(duration, bitrate, sample_rate, channels)
+
+
+def last_ogg_granule(data, serial):
+    u"""Return the granule position of the last page of the stream."""
+    pos = len(data)
+    while True:
+        pos = data.rfind(b'OggS', 0, pos)
+        if pos < 0:
+            return None
+        if pos + 18 > len(data):
+            continue
+        granule, page_serial = struct.unpack('<qI', data[pos + 6:pos + 18])
+        if page_serial == serial and granule >= 0:
+            return granule
+
+
+def wav_info(audio_file, file_size):
+    u"""Return the AudioInfo of a wav file."""
+    header = audio_file.read(12)
+    if header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+        return None
+    channels = sample_rate = byte_rate = None
+    while True:
+        chunk_header = audio_file.read(8)
+        if len(chunk_header) < 8:
+            return None
+        chunk_id = chunk_header[:4]
+        chunk_size, = struct.unpack('<I', chunk_header[4:])
+        # Chunks are padded to an even size.
+        skip_size = chunk_size + (chunk_size & 1)
+        if chunk_id == b'fmt ':
+            fmt = audio_file.read(chunk_size)
+            channels, sample_rate, byte_rate = struct.unpack(
+                '<HII', fmt[2:12])
+            skip_size -= len(fmt)
+        elif chunk_id == b'data':
+            if not byte_rate:
+                return None
+            # Files written while streaming can claim a too large
+            # data size.
+            data_size = min(chunk_size, file_size - audio_file.tell())
+            return AudioInfo(
+                float(data_size) / byte_rate, byte_rate * 8, sample_rate,
+                channels)
+        audio_file.seek(skip_size, os.SEEK_CUR)
+
+
+info_functions = {'mp3': mp3_info, 'ogg': ogg_info, 'opus': ogg_info,
+                  'wav': wav_info}
@@ -0,0 +1,57 @@
+# -*- mode: python ; coding: utf-8 -*-
+#
+# Copyright © 2017 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+u"""
+Run download jobs one after the other in a background thread.
+
+Only one job runs at a time, with a short pause after each, so the
+background downloads don’t hammer the sites and leave the foreground
+downloads room. Don’t touch the collection or the GUI in a job.
+"""
+
+import queue
+import threading
+import time
+
+
+job_delay = 1.0
+# Seconds to wait after each background job.
+
+jobs = queue.Queue()
+worker = None
+
+
+def run_in_background(function, *args):
+    u"""Queue function(*args) to be run in the background thread."""
+    global worker
+    if worker is None or not worker.is_alive():
+        worker = threading.Thread(target=work, name='downloadaudio')
+        worker.daemon = True
+        worker.start()
+    jobs.put((function, args))
+
+
+def work():
+    u"""Run the queued jobs. Never returns."""
+    while True:
+        function, args = jobs.get()
+        try:
+            function(*args)
+        except Exception:
+            # Same as for the normal downloads: whatever went wrong,
+            # just go on with the next one.
+            pass
+        time.sleep(job_delay)
+
+
+def clear_jobs():
+    u"""Forget all jobs that haven’t started yet."""
+    while True:
+        try:
+            jobs.get_nowait()
+        except queue.Empty:
+            return
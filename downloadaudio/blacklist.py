@@ -12,6 +12,7 @@ Maintain a blacklist of undesired files.
 
 import hashlib
 import os
+import threading
 
 # As in the main Anki code.
 try:
@@ -22,10 +23,18 @@ except ImportError:
 
 from aqt import mw
 
+from fingerprint import FingerprintIndex
+
 blacklist_hashes = None
 bl_file_path = os.path.join(
     mw.pm.addonFolder(), 'downloadaudio', 'blacklist.json')
 
+blacklist_fingerprints = None
+bl_fingerprints_file_path = os.path.join(
+    mw.pm.addonFolder(), 'downloadaudio', 'blacklist_fingerprints.json')
+fingerprints_lock = threading.Lock()
+# The fingerprints are checked by background downloads, too.
+
 
 def get_hash(file_name):
     """
@@ -66,3 +75,32 @@ def save_hashes():
     blacklist_file = open(bl_file_path, 'w')
     json.dump(blacklist_hashes, blacklist_file, indent=1)
     blacklist_file.close()
+
+
+def is_black_fingerprint(fingerprint):
+    u"""Return whether the clip sounds like a blacklisted one."""
+    with fingerprints_lock:
+        if blacklist_fingerprints is None:
+            load_fingerprints()
+        return blacklist_fingerprints.find(fingerprint) is not None
+
+
+def add_black_fingerprint(fingerprint):
+    u"""Add a fingerprint to the blacklist."""
+    with fingerprints_lock:
+        if blacklist_fingerprints is None:
+            load_fingerprints()
+        blacklist_fingerprints.add(fingerprint)
+        with open(bl_fingerprints_file_path, 'w') as fingerprints_file:
+            json.dump(blacklist_fingerprints.to_lists(), fingerprints_file)
+
+
+def load_fingerprints():
+    u"""Load the blacklisted fingerprints from disk."""
+    global blacklist_fingerprints
+    try:
+        with open(bl_fingerprints_file_path, 'r') as fingerprints_file:
+            fingerprint_lists = json.load(fingerprints_file)
+    except (IOError, ValueError):
+        fingerprint_lists = []
+    blacklist_fingerprints = FingerprintIndex.from_lists(fingerprint_lists)
@@ -0,0 +1,73 @@
+# -*- mode: python ; coding: utf-8 -*-
+#
+# Copyright © 2017 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+u"""
+Put the downloads for many notes on their notes in one go.
+
+For batch downloads and downloads for new notes. The media folder is
+listed once for the free names, the files are renamed rather than
+copied where possible, and the changed notes are written with one
+statement per chunk instead of one flush per note.
+"""
+
+from aqt import mw
+from anki.utils import intTime, joinFields
+
+from download_entry import Action
+from mediafile_utils import MediaNameIndex
+from sweep import record_media_files
+
+
+chunk_size = 200
+# Write the notes after this many.
+
+
+def write_notes(notes):
+    u"""Write the fields of the notes to the collection."""
+    if not notes:
+        return
+    mod = intTime()
+    usn = mw.col.usn()
+    for note in notes:
+        note.mod = mod
+        note.usn = usn
+    mw.col.db.executemany(
+        "update notes set flds=?, mod=?, usn=? where id=?",
+        [(joinFields(note.fields), mod, usn, note.id) for note in notes])
+    # The sort field and the checksum.
+    mw.col.updateFieldCache([note.id for note in notes])
+
+
+class BulkDispatcher(object):
+    u"""Collect the downloads for many notes and dispatch them together."""
+
+    def __init__(self):
+        self.name_index = MediaNameIndex()
+        self.pending = []
+        # List of (note, entries) tuples.
+
+    def add(self, note, entries):
+        u"""Queue the entries of a note. Write when we have enough."""
+        self.pending.append((note, entries))
+        if len(self.pending) >= chunk_size:
+            self.flush()
+
+    def flush(self):
+        u"""Move the queued files and write the changed notes."""
+        pending, self.pending = self.pending, []
+        changed_notes = []
+        media_names = []
+        for note, entries in pending:
+            for entry in entries:
+                media_name = entry.dispatch(note, self.name_index)
+                if media_name:
+                    media_names.append(media_name)
+            if any(entry.action == Action.Add for entry in entries):
+                changed_notes.append(note)
+        write_notes(changed_notes)
+        record_media_files(media_names)
+        return len(changed_notes)
@@ -40,11 +40,18 @@ from aqt import mw
 from aqt.utils import tooltip
 from anki.hooks import addHook
 
-from downloaders import downloaders
+from bulk_dispatch import BulkDispatcher
 from download_entry import Action
 from get_fields import get_note_fields, get_side_fields
-from language import language_code_from_card, language_code_from_editor
+from language import LanguageResolver, language_code_from_card, \
+    language_code_from_editor
+from media_optimizer import shrink_audio_dialog
+from prefetch import fetch_entries
+from pronunciation_archive import export_archive_dialog, \
+    import_archive_dialog, store_entries
 from review_gui import review_entries
+from sweep import record_media_files, remove_unused_downloads
+from temp_files import remove_temp_files
 from update_gui import update_data
 
 import batch_download_gui
@@ -65,19 +72,28 @@ def do_batch_download(note_ids, browser):
     mw = browser.mw
     mw.checkpoint("batch edit")
     mw.progress.start()
-    browser.model.beginReset()
     downloaded_count = 0
-    for note_id in note_ids:
-        note = mw.col.getNote(note_id)
-        retrieved_entries = download_for_note(ask_user=False,
-                                              note=note,
-                                              no_manual_review=True)
-        if any(entry.action == Action.Add for entry in retrieved_entries):
-            downloaded_count += 1
-            print("Finished %d out of %d" % (downloaded_count, len(note_ids)))
-    browser.model.endReset()
-    mw.requireReset()
-    mw.progress.finish()
+    resolver = LanguageResolver(note_ids)
+    # The notes are written in chunks, so we don’t have to keep the
+    # browser table in reset mode while we wait for the network.
+    dispatcher = BulkDispatcher()
+    try:
+        for note_id in note_ids:
+            note = mw.col.getNote(note_id)
+            retrieved_entries = download_for_note(
+                ask_user=False, note=note, no_manual_review=True,
+                language_code=resolver.language_code(note),
+                dispatcher=dispatcher)
+            if any(entry.action == Action.Add
+                   for entry in retrieved_entries):
+                downloaded_count += 1
+                print("Finished %d out of %d" % (
+                    downloaded_count, len(note_ids)))
+    finally:
+        dispatcher.flush()
+        browser.model.reset()
+        mw.requireReset()
+        mw.progress.finish()
     mw.reset()
     tooltip("<b>Updated</b> {0} notes.".format(downloaded_count),
             parent=browser)
@@ -87,57 +103,65 @@ def do_download(note,
                 field_data_list,
                 language,
                 hide_text=False,
-                no_manual_review=False):
+                no_manual_review=False,
+                dispatcher=None):
     """
     Download audio data.
 
     Go through the list of words and list of sites and download each
-    word from each site. Then call a function that asks the user what
-    to do.
+    word from each site, or use the files we got in the background.
+    Then call a function that asks the user what to do.
+
+    With a BulkDispatcher, just hand the entries over to that. It
+    moves the files and writes the note later, together with others.
     """
     retrieved_entries = []
     for field_data in field_data_list:
         if field_data.empty:
             continue
-        for dloader in downloaders:
-            # Use a public variable to set the language.
-            dloader.language = language
-            try:
-                # Make it easer inside the downloader. If anything
-                # goes wrong, don't catch, or raise whatever you want.
-                dloader.download_files(field_data)
-            except Exception:
-                #  # Uncomment this raise while testing a new
-                #  # downloaders.  Also use the “For testing”
-                #  # downloaders list with your downloader in
-                #  # downloaders.__init__
-                # raise
-                continue
-            retrieved_entries += dloader.downloads_list
-
-    # Significantly changed the logic. Put all entries in one
-    # list, do stuff with that list of DownloadEntries.
-    for entry in retrieved_entries:
-        # Do the processing before the reviewing now.
-        entry.process()
-
+        # Significantly changed the logic. Put all entries in one
+        # list, do stuff with that list of DownloadEntries. The
+        # entries come already processed, maybe from the prefetch,
+        # unless we pick them automatically. Then nobody sees
+        # blacklisted clips, so drop those that sound like them.
+        retrieved_entries += fetch_entries(
+            field_data, language, process_entries=not no_manual_review,
+            check_sound_alikes=no_manual_review)
+
+    handed_over = False
     try:
-        retrieved_entries = review_entries(note,
-                                           retrieved_entries,
-                                           hide_text,
-                                           no_manual_review)
-        # Now just the dialog, which sets the fields in the entries
-    except ValueError as ve:
-        tooltip(str(ve))
-    except RuntimeError as rte:
-        if 'cancel' in str(rte):
-            for entry in retrieved_entries:
-                entry.action = Action.Delete
-        else:
-            raise
+        try:
+            retrieved_entries = review_entries(note,
+                                               retrieved_entries,
+                                               hide_text,
+                                               no_manual_review)
+            # Now just the dialog, which sets the fields in the entries
+        except ValueError as ve:
+            tooltip(str(ve))
+        except RuntimeError as rte:
+            if 'cancel' in str(rte):
+                for entry in retrieved_entries:
+                    entry.action = Action.Delete
+            else:
+                raise
 
-    for entry in retrieved_entries:
-        entry.dispatch(note)
+        store_entries(retrieved_entries, language)
+        if dispatcher:
+            dispatcher.add(note, retrieved_entries)
+            handed_over = True
+        else:
+            media_names = [
+                entry.dispatch(note) for entry in retrieved_entries]
+            record_media_files(name for name in media_names if name)
+    finally:
+        # Whatever went wrong, don’t leave files in the temp folder.
+        # (The files that were moved to the media folder are gone
+        # from there already.)
+        if not handed_over:
+            remove_temp_files(
+                entry.file_path for entry in retrieved_entries)
+    if dispatcher:
+        return retrieved_entries
 
     if any(entry.action == Action.Add for entry in retrieved_entries):
         note.flush()
@@ -180,13 +204,16 @@ def download_for_side():
 def download_for_note(ask_user=False,
                       note=None,
                       editor=None,
-                      no_manual_review=False):
+                      no_manual_review=False,
+                      language_code=None,
+                      dispatcher=None):
     """
     Download audio for all fields.
 
     Download audio for all fields of the note passed in or the current
     note. When ask_user is true, show a dialog that lets the user
-    modify these texts.
+    modify these texts. When no language_code is passed in, get it
+    from the card or the editor. See do_download for the dispatcher.
     """
     if not note:
         try:
@@ -194,8 +221,9 @@ def download_for_note(ask_user=False,
             note = card.note()
         except AttributeError:
             return
-        language_code = language_code_from_card(card)
-    else:
+        if not language_code:
+            language_code = language_code_from_card(card)
+    elif not language_code:
         language_code = language_code_from_editor(note, editor)
     field_data = get_note_fields(note)
     if not field_data:
@@ -214,7 +242,9 @@ def download_for_note(ask_user=False,
             else:
                 # Don't know how to handle this after all
                 raise
-    return do_download(note, field_data, language_code, hide_text=False, no_manual_review=no_manual_review)
+    return do_download(note, field_data, language_code, hide_text=False,
+                       no_manual_review=no_manual_review,
+                       dispatcher=dispatcher)
 
 
 def download_manual():
@@ -301,10 +331,48 @@ mw.manual_download_action.setToolTip(
 mw.manual_download_action.setShortcut(DOWNLOAD_MANUAL_SHORTCUT)
 mw.manual_download_action.triggered.connect(download_manual)
 
+mw.export_archive_action = QAction(mw)
+mw.export_archive_action.setText(u"Export pronunciation archive…")
+mw.export_archive_action.setToolTip(
+    "Save the archive of downloaded pronunciations in a zip file.")
+mw.export_archive_action.triggered.connect(export_archive_dialog)
+
+mw.import_archive_action = QAction(mw)
+mw.import_archive_action.setText(u"Import pronunciation archive…")
+mw.import_archive_action.setToolTip(
+    "Add pronunciations from an exported archive.")
+mw.import_archive_action.triggered.connect(import_archive_dialog)
+
+mw.sweep_media_action = QAction(mw)
+mw.sweep_media_action.setText(u"Remove unused downloaded audio…")
+mw.sweep_media_action.setToolTip(
+    "Delete downloaded audio files that are not used on any note.")
+mw.sweep_media_action.triggered.connect(remove_unused_downloads)
+
+mw.shrink_audio_action = QAction(mw)
+mw.shrink_audio_action.setText(u"Shrink audio files…")
+mw.shrink_audio_action.setToolTip(
+    "Re-encode the audio files of the collection to make them smaller.")
+mw.shrink_audio_action.triggered.connect(
+    lambda: shrink_audio_dialog(dry_run=False))
+
+mw.estimate_shrink_action = QAction(mw)
+mw.estimate_shrink_action.setText(u"Estimate audio shrinking…")
+mw.estimate_shrink_action.setToolTip(
+    "Show how much shrinking the audio files would save, "
+    "without changing anything.")
+mw.estimate_shrink_action.triggered.connect(
+    lambda: shrink_audio_dialog(dry_run=True))
+
 
 mw.edit_media_submenu.addAction(mw.note_download_action)
 mw.edit_media_submenu.addAction(mw.side_download_action)
 mw.edit_media_submenu.addAction(mw.manual_download_action)
+mw.edit_media_submenu.addAction(mw.export_archive_action)
+mw.edit_media_submenu.addAction(mw.import_archive_action)
+mw.edit_media_submenu.addAction(mw.sweep_media_action)
+mw.edit_media_submenu.addAction(mw.estimate_shrink_action)
+mw.edit_media_submenu.addAction(mw.shrink_audio_action)
 
 # Todo: switch off at start and on when we get to reviewing.
 # # And start with the acitons off.
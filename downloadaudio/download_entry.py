@@ -8,7 +8,9 @@
 
 import os
 
-from blacklist import add_black_hash
+from audio_info import audio_info
+from blacklist import add_black_fingerprint, add_black_hash
+from fingerprint import audio_fingerprint
 from processors import processor
 from mediafile_utils import unmunge_to_mediafile
 
@@ -35,11 +37,37 @@ class DownloadEntry(object):
         self.icon = icon
         # The downloader’s favicon
         self.action = Action.Add
+        self.processed = False
+        # Whether process() has been called. When we pick a file
+        # without asking, only the one we use is processed.
+        self._audio_info = None
+        self._audio_info_path = None
+        self._fingerprint = None
+        self._fingerprint_path = None
 
     @property
     def display_word(self):
         return self.word
 
+    @property
+    def audio_info(self):
+        u"""Duration &c. of the file, read from the headers, or None."""
+        if self._audio_info_path != self.file_path:
+            # The processor replaces the file. Look again then.
+            self._audio_info = audio_info(
+                self.file_path, self.file_extension)
+            self._audio_info_path = self.file_path
+        return self._audio_info
+
+    @property
+    def fingerprint(self):
+        u"""The acoustic fingerprint of the file, or None."""
+        if self._fingerprint_path != self.file_path:
+            self._fingerprint = audio_fingerprint(
+                self.file_path, self.file_extension)
+            self._fingerprint_path = self.file_path
+        return self._fingerprint
+
     @property
     def base_name(self):
         return self.word
@@ -59,6 +87,12 @@ class DownloadEntry(object):
         (i.e. normalize, remove silence, convert to preferred format)
         and update self.
         """
+        self.processed = True
+        info = self.audio_info
+        if info and not info.duration:
+            # Nothing to hear. Don’t bother decoding it.
+            self.action = Action.Delete
+            return
         if processor:
             try:
                 new_fp, new_sffx = processor.process(self)
@@ -69,7 +103,7 @@ class DownloadEntry(object):
                 self.file_extension = new_sffx
 
 
-    def dispatch(self, note):
+    def dispatch(self, note, name_index=None):
         u"""Do what should be done with the downloaded file
 
         Depending on self.action, do that action.
@@ -78,15 +112,25 @@ class DownloadEntry(object):
           on the note or just want to keep it.
         * Add it to the note if that’s what we want.
         * Delete it if we want just delete or blacklist it.
-        * Blacklist the hash if that’s what we want."""
+        * Blacklist the hash if that’s what we want.
+
+        Return the name of the media file, or None when the file
+        didn’t go to the media folder. Pass in a MediaNameIndex when
+        dispatching many files."""
+        media_fn = None
         if self.action == Action.Add or self.action == Action.Keep:
-            media_fn = unmunge_to_mediafile(self)
+            media_fn = unmunge_to_mediafile(self, name_index)
             if self.action == Action.Add:
                 note[self.audio_field_name] = '[sound:' + media_fn + ']'
+        if self.action == Action.Blacklist:
+            # Before the file is gone.
+            if self.entry_hash:
+                add_black_hash(self.entry_hash)
+            if self.fingerprint is not None:
+                add_black_fingerprint(self.fingerprint)
         if self.action == Action.Delete or self.action == Action.Blacklist:
             os.remove(self.file_path)
-        if self.action == Action.Blacklist:
-            add_black_hash(self.entry_hash)
+        return media_fn
 
 
 class JpodDownloadEntry(DownloadEntry):
@@ -117,5 +161,22 @@ class JpodDownloadEntry(DownloadEntry):
         return self.hash_
 
 
+class ArchivedDownloadEntry(DownloadEntry):
+    u"""Data about a file copied from the pronunciation archive"""
+    def __init__(self, field_data, file_path, extras, icon,
+                 base_name, display_word):
+        DownloadEntry.__init__(self, field_data, file_path, extras, icon)
+        self.archived_base_name = base_name
+        self.archived_display_word = display_word
+
+    @property
+    def base_name(self):
+        return self.archived_base_name
+
+    @property
+    def display_word(self):
+        return self.archived_display_word
+
+
 class Action(object):
     Add, Keep, Delete, Blacklist = range(0, 4)
@@ -0,0 +1,127 @@
+# -*- mode: python ; coding: utf-8 -*-
+#
+# Copyright © 2017 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+u"""
+Download audio for new notes in the background.
+
+When a note is added in the Add dialog, queue a download for its
+empty audio fields. The files are downloaded and picked without
+asking, like for the batch download. The notes are then updated
+together every few seconds, so adding notes stays fast.
+"""
+
+import threading
+
+from aqt import mw
+from anki.hooks import addHook
+
+from background import run_in_background
+from bulk_dispatch import BulkDispatcher
+from download_entry import Action
+from get_fields import get_note_fields
+from language import LanguageResolver
+from prefetch import delete_entry_files, fetch_entries
+from pronunciation_archive import store_entries
+from review_gui import auto_select_entry
+
+
+download_on_add = False
+# Set this to True to download audio for every note added through the
+# Add dialog.
+
+write_interval = 3000
+# Milliseconds between two looks for finished downloads.
+
+finished_downloads = []
+# List of (note id, language, entries) tuples, ready to be put on the
+# notes.
+finished_lock = threading.Lock()
+write_timer = None
+
+
+def queue_note_download(note):
+    u"""Queue the download for the empty audio fields of a new note."""
+    global write_timer
+    if not download_on_add:
+        return
+    field_data_list = [
+        fd for fd in get_note_fields(note)
+        if not fd.empty and not note[fd.audio_field_name]]
+    if not field_data_list:
+        return
+    language = LanguageResolver([note.id]).language_code(note)
+    run_in_background(
+        download_note_entries, note.id, field_data_list, language)
+    if write_timer is None:
+        write_timer = mw.progress.timer(
+            write_interval, write_finished_downloads, True)
+
+
+def download_note_entries(note_id, field_data_list, language):
+    u"""Download and pick the files for a note. Runs in the background."""
+    retrieved_entries = []
+    for field_data in field_data_list:
+        retrieved_entries += fetch_entries(
+            field_data, language, process_entries=False, background=True,
+            check_sound_alikes=True)
+    if not retrieved_entries:
+        return
+    retrieved_entries = auto_select_entry(None, retrieved_entries)
+    with finished_lock:
+        finished_downloads.append((note_id, language, retrieved_entries))
+
+
+def take_finished_downloads():
+    u"""Return and forget the list of finished downloads."""
+    with finished_lock:
+        finished = finished_downloads[:]
+        del finished_downloads[:]
+    return finished
+
+
+def write_finished_downloads():
+    u"""Put the finished downloads on their notes, all in one go."""
+    finished = take_finished_downloads()
+    if not finished:
+        return
+    dispatcher = BulkDispatcher()
+    for note_id, language, retrieved_entries in finished:
+        try:
+            note = mw.col.getNote(note_id)
+        except TypeError:
+            # The note has been deleted in the meantime.
+            delete_entry_files(retrieved_entries)
+            continue
+        try:
+            for entry in retrieved_entries:
+                if entry.action == Action.Add \
+                        and note[entry.audio_field_name]:
+                    # The user has filled the field in the meantime.
+                    entry.action = Action.Delete
+        except KeyError:
+            # The note type has changed in the meantime.
+            delete_entry_files(retrieved_entries)
+            continue
+        store_entries(retrieved_entries, language)
+        dispatcher.add(note, retrieved_entries)
+    dispatcher.flush()
+    mw.requireReset()
+
+
+def stop_writing():
+    u"""Stop the timer and drop the unwritten downloads."""
+    global write_timer
+    if write_timer is not None:
+        write_timer.stop()
+        write_timer = None
+    for dummy_note_id, dummy_language, retrieved_entries in \
+            take_finished_downloads():
+        delete_entry_files(retrieved_entries)
+
+
+addHook("AddCards.noteAdded", queue_note_download)
+addHook("unloadProfile", stop_writing)
@@ -29,12 +29,14 @@ from collins_italian import CollinsItalianDownloader
 from collins_spanish import CollinsSpanishDownloader
 from den_danske_ordbog import DenDanskeOrdbogDownloader
 from duden import DudenDownloader
+from espeak import EspeakDownloader
 from forvo import ForvoDownloader
 from google_tts import GooglettsDownloader
 from howjsay import HowJSayDownloader
 from islex import IslexDownloader
 from japanesepod import JapanesepodDownloader
 from leo import LeoDownloader
+from local_archive import LocalArchiveDownloader
 from lexin import LexinDownloader
 from macmillan_american import MacmillanAmericanDownloader
 from macmillan_british import MacmillanBritishDownloader
@@ -44,6 +46,7 @@ from wiktionary import WiktionaryDownloader
 
 
 downloaders = [
+    LocalArchiveDownloader(),
     JapanesepodDownloader(),
     WiktionaryDownloader(),
     LeoDownloader(),
@@ -62,13 +65,19 @@ downloaders = [
     CollinsSpanishDownloader(),
     ForvoDownloader(),
     BeolingusDownloader(),
+    EspeakDownloader(),
 ]
 # For each word field, these downloader sites are tried in the order
 # they appear here. Lines starting with a “#” are not tried. Change
 # the order, or which lines get the “#”, to taste
+# The local archive has the files we already used once. When it has
+# something, the sites are not asked. Keep it first.
+# The eSpeak “downloader” works offline, when eSpeak NG is
+# installed. It is only asked when no site before it found anything.
+# Keep it last.
 
 
-# # For testing. See also the “Uncomment this …” bit in ..download
+# # For testing. See also the “Uncomment this …” bit in ..retrieve
 # downloaders = [
 #     DictNNDownloader(),
 # ]
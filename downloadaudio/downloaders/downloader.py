@@ -12,9 +12,10 @@ Class to download a files from a speaking dictionary or TTS service.
 '''
 
 
-import tempfile
 from bs4 import BeautifulSoup as soup
 
+from temp_files import temp_file_name
+
 # Make this work without PyQt
 with_pyqt = True
 try:
@@ -77,6 +78,12 @@ class AudioDownloader(object):
         # The sites’s favicon.
         self.file_extension = u'.mp3'
         # Most sites have mp3 files.
+        self.skip_rest_on_hit = False
+        # When this is True and we found something, don’t ask the
+        # downloaders further down the list.
+        self.fallback_only = False
+        # When this is True, only ask this downloader when the ones
+        # before it in the list found nothing.
 
     def download_files(self, field_data):
         """Downloader functon
@@ -204,13 +211,19 @@ class AudioDownloader(object):
 
         Wrapper helper function aronud self.get_data_from_url().
         """
-        data = self.get_data_from_url(url_in)
         # We put the data into RAM first so that we don’t have to
         # clean up the temp file when the get does not work. (Bad
         # get_data raises all kinds of exceptions that fly through
         # here.)
-        tfile = tempfile.NamedTemporaryFile(
-            delete=False, prefix=u'anki_audio_', suffix=self.file_extension)
-        tfile.write(data)
-        tfile.close()
-        return tfile.name
+        return self.get_tempfile_from_data(self.get_data_from_url(url_in))
+
+    def get_tempfile_from_data(self, data):
+        """
+        Put raw data into a tempfile
+
+        Return the name of the new file.
+        """
+        file_name = temp_file_name(self.file_extension)
+        with open(file_name, 'wb') as tfile:
+            tfile.write(data)
+        return file_name
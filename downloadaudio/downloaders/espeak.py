@@ -0,0 +1,185 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright © 2017 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+
+"""
+Make pronunciations with a local eSpeak NG.
+
+This works without network, and fast. The voice is even more robotic
+than Google’s, so the files are not kept by default.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import shutil
+import subprocess
+import threading
+import wave
+
+from download_entry import Action, DownloadEntry
+from downloader import AudioDownloader
+
+
+espeak_program = 'espeak-ng'
+"""
+Program to call when the eSpeak library can’t be loaded.
+
+Starting a program for each text is much slower than using the
+library, but still much faster than most downloads.
+"""
+
+# Values from espeak-ng/speak_lib.h
+AUDIO_OUTPUT_SYNCHRONOUS = 2
+POS_CHARACTER = 1
+espeakCHARS_UTF8 = 1
+EE_OK = 0
+
+synth_callback_type = ctypes.CFUNCTYPE(
+    ctypes.c_int, ctypes.POINTER(ctypes.c_short), ctypes.c_int,
+    ctypes.c_void_p)
+
+engine = None
+engine_lock = threading.Lock()
+# There is only one eSpeak library in the process, and it is not
+# thread safe. So there is only one engine, shared by the foreground
+# and background downloaders. Hold the lock while loading or using it.
+
+
+def get_engine():
+    u"""Return the eSpeak engine. Load the library on first use."""
+    global engine
+    with engine_lock:
+        if engine is None:
+            engine = EspeakEngine()
+        return engine
+
+
+class EspeakEngine(object):
+    u"""
+    The eSpeak NG library, loaded once and kept for the whole session.
+
+    The synthesized samples are collected from the callback and
+    returned as raw 16 bit mono data. Don’t make one of these
+    directly, use get_engine().
+    """
+    def __init__(self):
+        self.samples = []
+        self.sample_rate = 0
+        self.lib = None
+        lib_name = ctypes.util.find_library('espeak-ng')
+        if not lib_name:
+            return
+        try:
+            lib = ctypes.CDLL(lib_name)
+        except OSError:
+            return
+        lib.espeak_Initialize.argtypes = [
+            ctypes.c_int, ctypes.c_int, ctypes.c_char_p, ctypes.c_int]
+        lib.espeak_SetVoiceByName.argtypes = [ctypes.c_char_p]
+        lib.espeak_Synth.argtypes = [
+            ctypes.c_void_p, ctypes.c_size_t, ctypes.c_uint, ctypes.c_int,
+            ctypes.c_uint, ctypes.c_uint, ctypes.POINTER(ctypes.c_uint),
+            ctypes.c_void_p]
+        self.sample_rate = lib.espeak_Initialize(
+            AUDIO_OUTPUT_SYNCHRONOUS, 0, None, 0)
+        if self.sample_rate <= 0:
+            return
+        # Keep a reference to the callback, or it is garbage collected.
+        self.callback = synth_callback_type(self.collect_samples)
+        lib.espeak_SetSynthCallback(self.callback)
+        self.lib = lib
+
+    def collect_samples(self, wav, num_samples, dummy_events):
+        u"""Store the samples eSpeak hands us."""
+        if wav and num_samples > 0:
+            self.samples.append(ctypes.string_at(wav, num_samples * 2))
+        return 0  # Go on.
+
+    def synthesize(self, text, voice):
+        u"""Return the raw samples for the text, spoken with voice."""
+        with engine_lock:
+            if EE_OK != self.lib.espeak_SetVoiceByName(
+                    voice.encode('utf-8')):
+                raise ValueError('No eSpeak voice for ' + voice)
+            self.samples = []
+            data = text.encode('utf-8') + b'\0'
+            if EE_OK != self.lib.espeak_Synth(
+                    data, len(data), 0, POS_CHARACTER, 0, espeakCHARS_UTF8,
+                    None, None):
+                raise ValueError('eSpeak could not speak the text')
+            samples = b''.join(self.samples)
+            self.samples = []
+        if not samples:
+            raise ValueError('eSpeak produced no sound')
+        return samples
+
+
+class EspeakDownloader(AudioDownloader):
+    u"""Make pronunciations with eSpeak NG on this computer."""
+    def __init__(self):
+        AudioDownloader.__init__(self)
+        self.file_extension = u'.wav'
+        self.engine = None
+        # The shared engine. Get it only when we first need it.
+        self.fallback_only = True
+        # A robot voice. Only use it when no site had a recording.
+        self.have_program = None
+
+    def download_files(self, field_data):
+        """
+        Get text from eSpeak.
+        """
+        self.downloads_list = []
+        if field_data.split:
+            return
+        if not field_data.word:
+            return
+        if self.engine is None:
+            self.engine = get_engine()
+            self.have_program = shutil.which(espeak_program) is not None
+        if self.engine.lib:
+            word_path = self.get_tempfile_from_samples(
+                self.engine.synthesize(field_data.word, self.language))
+        elif self.have_program:
+            word_path = self.get_tempfile_from_program(field_data.word)
+        else:
+            # No eSpeak NG on this computer.
+            return
+        entry = DownloadEntry(
+            field_data, word_path, dict(Source='eSpeak NG'), None)
+        entry.file_extension = self.file_extension
+        entry.action = Action.Delete
+        # Like Google TTS, a robot voice. Default to not keeping them.
+        self.downloads_list.append(entry)
+
+    def get_tempfile_from_samples(self, samples):
+        u"""Write raw samples to a wav tempfile and return its name."""
+        word_path = self.get_tempfile_from_data(b'')
+        wav_file = wave.open(word_path, 'wb')
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(self.engine.sample_rate)
+        wav_file.writeframes(samples)
+        wav_file.close()
+        return word_path
+
+    def get_tempfile_from_program(self, text):
+        u"""Let the espeak program write a wav tempfile."""
+        word_path = self.get_tempfile_from_data(b'')
+        try:
+            subprocess.check_call(
+                [espeak_program, '-v', self.language, '-w', word_path, text],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except (OSError, subprocess.CalledProcessError):
+            # Either no espeak or no voice for this language.
+            os.remove(word_path)
+            raise
+        if not os.path.getsize(word_path):
+            os.remove(word_path)
+            raise ValueError('eSpeak produced no sound')
+        return word_path
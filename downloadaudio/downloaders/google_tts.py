@@ -11,6 +11,11 @@
 Download pronunciations from GoogleTTS
 """
 
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import re
+import threading
+
 from anki.template import furigana
 
 from download_entry import Action, DownloadEntry
@@ -27,6 +32,59 @@ Using this for Chinese would lead to double downloads for most users,
 so skip this by default.
 """
 
+max_chunk_length = 100
+"""
+Longest text we send in one request.
+
+Google TTS refuses longer texts. Longer texts are split, preferably
+at the end of a sentence, and the pieces are downloaded separately.
+"""
+
+chunk_threads = 4
+"""Number of pieces of a long text downloaded at the same time."""
+
+chunk_cache_size = 200
+"""Number of downloaded pieces we remember."""
+
+# Each piece is some text up to and including the separators, or up
+# to the end. Try them in this order.
+split_patterns = [
+    re.compile(u'.+?(?:[.!?。！？]+\\s*|$)', flags=re.DOTALL),
+    re.compile(u'.+?(?:[,;:、，；：]+\\s*|$)', flags=re.DOTALL),
+    re.compile(u'.+?(?:\\s+|$)', flags=re.DOTALL)]
+
+
+def split_text(text, max_length=max_chunk_length, level=0):
+    u"""
+    Split text into chunks of at most max_length characters.
+
+    Split at the end of sentences where possible, at punctuation
+    inside sentences or at spaces where necessary, and in the middle
+    of words only as a last resort.
+    """
+    text = text.strip()
+    if len(text) <= max_length:
+        return [text] if text else []
+    if level >= len(split_patterns):
+        return [text[i:i + max_length]
+                for i in range(0, len(text), max_length)]
+    chunks = []
+    current = u''
+    for piece in split_patterns[level].findall(text):
+        if len(current) + len(piece.rstrip()) <= max_length:
+            current += piece
+            continue
+        if current.strip():
+            chunks.append(current.strip())
+        current = u''
+        if len(piece.rstrip()) > max_length:
+            chunks += split_text(piece, max_length, level + 1)
+        else:
+            current = piece
+    if current.strip():
+        chunks.append(current.strip())
+    return chunks
+
 
 class GooglettsDownloader(AudioDownloader):
     u"""Class to get pronunciations from Google’s TTS service."""
@@ -34,6 +92,9 @@ class GooglettsDownloader(AudioDownloader):
         AudioDownloader.__init__(self)
         self.icon_url = 'http://translate.google.com/'
         self.url = 'http://translate.google.com/translate_tts?'
+        self.chunk_cache = OrderedDict()
+        # (language, text) -> mp3 data, least recently used first.
+        self.chunk_cache_lock = threading.Lock()
 
     def download_files(self, field_data):
         """
@@ -51,7 +112,20 @@ class GooglettsDownloader(AudioDownloader):
         self.maybe_get_icon()
         if not field_data.word:
             raise ValueError('Nothing to download')
-        word_path = self.get_tempfile_from_url(self.build_url(word))
+        chunks = split_text(word)
+        if not chunks:
+            # Only white space. Nothing to say.
+            return
+        if len(chunks) == 1:
+            data = self.get_chunk_data(chunks[0])
+        else:
+            with ThreadPoolExecutor(max_workers=chunk_threads) as pool:
+                # map() keeps the order of the chunks.
+                data = b''.join(pool.map(self.get_chunk_data, chunks))
+        # Google sends plain MPEG frames, so the pieces can simply be
+        # concatenated. The processor, when we have one, makes a clean
+        # file out of that.
+        word_path = self.get_tempfile_from_data(data)
         entry = DownloadEntry(
             field_data, word_path, dict(Source='GoogleTTS'), self.site_icon)
         entry.action = Action.Delete
@@ -59,6 +133,24 @@ class GooglettsDownloader(AudioDownloader):
         # bad. Default to not keeping them.
         self.downloads_list.append(entry)
 
+    def get_chunk_data(self, chunk):
+        u"""Return the audio data for one chunk, cached."""
+        key = (self.language, chunk)
+        with self.chunk_cache_lock:
+            try:
+                data = self.chunk_cache.pop(key)
+            except KeyError:
+                pass
+            else:
+                self.chunk_cache[key] = data
+                return data
+        data = self.get_data_from_url(self.build_url(chunk))
+        with self.chunk_cache_lock:
+            self.chunk_cache[key] = data
+            while len(self.chunk_cache) > chunk_cache_size:
+                self.chunk_cache.popitem(last=False)
+        return data
+
     def build_url(self, source):
         u"""Return a string that can be used as the url."""
         qdict = dict(
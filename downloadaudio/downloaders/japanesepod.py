@@ -20,22 +20,11 @@ import re
 from blacklist import get_hash
 from download_entry import JpodDownloadEntry
 from downloader import AudioDownloader
+from kana_convert import equals_kana
 
 import urllib
 
 
-def equals_kana(kana1, kana2):
-    u"""Check whether two kana strings represent the same sound
-
-    Compare two strings, converting katakana to hiragana first. That
-    means that for example equals_kana(u'キ', u'き') is True.
-    """
-    # dict translating katakana to corresponding hiragana codepoints
-    katakana_to_hiragana = dict((i, i - 0x60) for i in range(0x30A1, 0x30F7))
-    return kana1.translate(katakana_to_hiragana) == \
-        kana2.translate(katakana_to_hiragana)
-
-
 class JapanesepodDownloader(AudioDownloader):
     """Download audio from Japanesepod"""
     def __init__(self):
@@ -0,0 +1,44 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright © 2017 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+
+"""
+Get pronunciations from the local pronunciation archive.
+"""
+
+from download_entry import ArchivedDownloadEntry
+from downloader import AudioDownloader
+from pronunciation_archive import archive_extras_key, find_entries
+
+
+class LocalArchiveDownloader(AudioDownloader):
+    """Get audio we have already downloaded once from the local archive"""
+    def __init__(self):
+        AudioDownloader.__init__(self)
+        self.skip_rest_on_hit = True
+        # Why ask the sites again when we have what we need?
+
+    def download_files(self, field_data):
+        """Copy the archived files for the text to tempfiles."""
+        self.downloads_list = []
+        if not field_data.word:
+            return
+        for path, extension, base_name, display_word, extras in \
+                find_entries(field_data.word, self.language):
+            # Work on a copy, the rest of the add-on moves or deletes
+            # the files.
+            self.file_extension = extension
+            with open(path, 'rb') as archived_file:
+                word_path = self.get_tempfile_from_data(archived_file.read())
+            extras[archive_extras_key] = u'yes'
+            entry = ArchivedDownloadEntry(
+                field_data, word_path, extras, None, base_name, display_word)
+            entry.file_extension = extension
+            # We archive the files we use, after processing. Doing
+            # it again would just encode them once more.
+            entry.processed = True
+            self.downloads_list.append(entry)
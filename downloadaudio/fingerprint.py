@@ -0,0 +1,191 @@
+# -*- mode: python ; coding: utf-8 -*-
+#
+# Copyright © 2017 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+u"""
+Acoustic fingerprints, to find clips that sound the same.
+
+A fingerprint is a list of 16 bit sub-fingerprints, one for every 16
+ms. Each bit tells whether the energy difference between two
+neighbouring frequency bands grows or shrinks from one frame to the
+next. That survives re-encoding, a different bit rate or volume and
+trimming of the silence. Two clips are near duplicates when, at the
+best alignment, only a few bits differ.
+
+The FingerprintIndex finds that alignment quickly: it keeps lists of
+where each sub-fingerprint value appears. Clips that sound the same
+share many exact values at a constant offset.
+
+This needs NumPy and pydub. Without them, fingerprinting is None and
+nothing here is used.
+"""
+
+from collections import Counter, defaultdict
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from processors import processor
+
+if processor:
+    from audio_processor import load_segment
+
+fingerprinting = numpy is not None and processor is not None
+
+sample_rate = 8000
+frame_size = 512
+hop_size = 128
+# 64 ms frames every 16 ms, at a sample rate that keeps the speech.
+band_count = 17
+low_frequency = 150
+high_frequency = 3800
+# 17 bands give 16 differences, that is 16 bits per frame.
+silence_level = 1e-4
+# Frames at the beginning and the end with less energy than this
+# fraction of the loudest frame are ignored.
+min_frames = 8
+# Don’t fingerprint clips shorter than this.
+
+max_bit_error_rate = 0.3
+# Clips with fewer differing bits than this are near duplicates.
+min_overlap = 0.7
+# At the best alignment, the clips have to overlap this much of the
+# longer one.
+max_checks = 5
+# Compare the bits of at most this many alignments per lookup.
+
+_band_matrix = None
+_bit_counts = None
+
+
+def band_matrix():
+    u"""Return the matrix that sums the FFT bins into the bands."""
+    global _band_matrix
+    if _band_matrix is None:
+        frequencies = numpy.fft.rfftfreq(frame_size, 1.0 / sample_rate)
+        edges = numpy.geomspace(low_frequency, high_frequency, band_count + 1)
+        bands = numpy.searchsorted(edges, frequencies, side='right') - 1
+        _band_matrix = numpy.zeros((len(frequencies), band_count))
+        in_range = (bands >= 0) & (bands < band_count)
+        _band_matrix[numpy.nonzero(in_range)[0], bands[in_range]] = 1.0
+    return _band_matrix
+
+
+def bit_counts(values):
+    u"""Return the number of set bits of each of the 16 bit values."""
+    global _bit_counts
+    if _bit_counts is None:
+        _bit_counts = numpy.array(
+            [bin(i).count('1') for i in range(1 << (band_count - 1))],
+            dtype=numpy.uint8)
+    return _bit_counts[values]
+
+
+def pcm_fingerprint(samples):
+    u"""
+    Return the fingerprint of mono samples at sample_rate.
+
+    Return a NumPy array of sub-fingerprints, or None for clips that
+    are too short or silent.
+    """
+    samples = numpy.asarray(samples, dtype=numpy.float32)
+    frame_count = 1 + (len(samples) - frame_size) // hop_size
+    if frame_count < min_frames:
+        return None
+    frame_index = numpy.arange(frame_size)[None, :] \
+        + hop_size * numpy.arange(frame_count)[:, None]
+    frames = samples[frame_index] * numpy.hanning(frame_size)
+    spectrum = numpy.abs(numpy.fft.rfft(frames, axis=1)) ** 2
+    energies = spectrum.dot(band_matrix())
+    loudness = energies.sum(axis=1)
+    loud = numpy.nonzero(loudness > loudness.max() * silence_level)[0]
+    if len(loud) < min_frames:
+        return None
+    energies = energies[loud[0]:loud[-1] + 1]
+    band_differences = energies[:, :-1] - energies[:, 1:]
+    bits = (band_differences[1:] - band_differences[:-1]) > 0
+    weights = 1 << numpy.arange(band_count - 1, dtype=numpy.uint32)
+    return bits.dot(weights).astype(numpy.uint32)
+
+
+def audio_fingerprint(file_path, extension):
+    u"""Return the fingerprint of an audio file, or None."""
+    if not fingerprinting:
+        return None
+    try:
+        segment = load_segment(file_path, extension)
+    except Exception:
+        return None
+    segment = segment.set_channels(1).set_frame_rate(sample_rate)
+    return pcm_fingerprint(segment.get_array_of_samples())
+
+
+def bit_error_rate(fingerprint, other, shift):
+    u"""
+    Return the fraction of differing bits.
+
+    Compare fingerprint[i] with other[i + shift]. When the two don’t
+    overlap enough with that shift, return 1.0.
+    """
+    start = max(0, -shift)
+    other_start = start + shift
+    length = min(len(fingerprint) - start, len(other) - other_start)
+    if length < min_overlap * max(len(fingerprint), len(other)):
+        return 1.0
+    differences = numpy.bitwise_xor(
+        fingerprint[start:start + length],
+        other[other_start:other_start + length])
+    return bit_counts(differences).sum() / float(
+        length * (band_count - 1))
+
+
+class FingerprintIndex(object):
+    u"""A collection of fingerprints that finds near duplicates."""
+
+    def __init__(self, fingerprints=()):
+        self.fingerprints = []
+        self.postings = defaultdict(list)
+        # Sub-fingerprint value: list of (fingerprint number, position)
+        for fingerprint in fingerprints:
+            self.add(fingerprint)
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    def add(self, fingerprint):
+        u"""Add a fingerprint. Return its number."""
+        fingerprint_id = len(self.fingerprints)
+        self.fingerprints.append(fingerprint)
+        for position, value in enumerate(fingerprint.tolist()):
+            self.postings[value].append((fingerprint_id, position))
+        return fingerprint_id
+
+    def find(self, fingerprint):
+        u"""Return the number of a near duplicate, or None."""
+        votes = Counter()
+        for position, value in enumerate(fingerprint.tolist()):
+            for fingerprint_id, other_position in self.postings.get(
+                    value, ()):
+                votes[fingerprint_id, other_position - position] += 1
+        for (fingerprint_id, shift), dummy_count in votes.most_common(
+                max_checks):
+            if bit_error_rate(
+                    fingerprint, self.fingerprints[fingerprint_id],
+                    shift) <= max_bit_error_rate:
+                return fingerprint_id
+        return None
+
+    def to_lists(self):
+        u"""Return the fingerprints as lists of ints, for json."""
+        return [fingerprint.tolist() for fingerprint in self.fingerprints]
+
+    @classmethod
+    def from_lists(cls, lists):
+        u"""Return an index of the fingerprints from to_lists()."""
+        return cls(numpy.array(values, dtype=numpy.uint32)
+                   for values in lists)
@@ -0,0 +1,106 @@
+# -*- mode: python ; coding: utf-8 -*-
+# © 2017 Roland Sieker <ospalh@gmail.com>
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+"""
+Convert between hiragana and katakana, directly.
+
+Hiragana and katakana sit at the same places in their Unicode blocks,
+0x60 apart, so the conversion is a simple translate(). Characters
+that aren't kana are passed through unchanged.
+
+    >> katakana(u'かな')
+       u'カナ'
+
+There are also functions to make small kana big, to write out the long
+vowel mark, and to compare readings.
+
+The same file is used in the dehashilator and the downloadaudio
+add-ons. Keep the two copies the same.
+"""
+
+__all__ = ['hiragana', 'katakana', 'big_kana', 'expand_long_vowels',
+           'same_reading', 'equals_kana']
+
+_first_hiragana = 0x3041  # ぁ
+_last_hiragana = 0x3096  # ゖ
+_offset = 0x60
+
+_to_katakana = dict(
+    (point, point + _offset)
+    for point in range(_first_hiragana, _last_hiragana + 1))
+_to_katakana[0x309d] = 0x30fd  # ゝ → ヽ
+_to_katakana[0x309e] = 0x30fe  # ゞ → ヾ
+_to_hiragana = dict((v, k) for k, v in _to_katakana.items())
+
+_small = u'ぁぃぅぇぉっゃゅょゎゕゖァィゥェォッャュョヮヵヶ'
+_big = u'あいうえおつやゆよわかけアイウエオツヤユヨワカケ'
+_to_big = dict((ord(s), ord(b)) for s, b in zip(_small, _big))
+
+_long_vowel_mark = u'ー'
+_vowel_rows = [
+    (u'あ', u'あぁかがさざただなはばぱまやゃらわゎゕ'),
+    (u'い', u'いぃきぎしじちぢにひびぴみりゐ'),
+    (u'う', u'うぅくぐすずつづっぬふぶぷむゆゅるゔ'),
+    (u'え', u'えぇけげせぜてでねへべぺめれゑゖ'),
+    (u'お', u'おぉこごそぞとどのほぼぽもよょろを')]
+_vowels = {}
+for _vowel, _row in _vowel_rows:
+    for _kana in _row:
+        _vowels[_kana] = _vowel
+        _vowels[_kana.translate(_to_katakana)] = \
+            _vowel.translate(_to_katakana)
+
+
+def hiragana(text):
+    """Return the text with katakana converted to hiragana."""
+    return text.translate(_to_hiragana)
+
+
+def katakana(text):
+    """Return the text with hiragana converted to katakana."""
+    return text.translate(_to_katakana)
+
+
+def big_kana(text):
+    """Return the text with small kana (ゃ, ッ, ...) made big."""
+    return text.translate(_to_big)
+
+
+def expand_long_vowels(text):
+    """
+    Return the text with the long vowel mark written out.
+
+    Replace each ー after a kana with the vowel of that kana, in the
+    same script. So カード becomes カアド and らーめん becomes らあめん.
+    """
+    if _long_vowel_mark not in text:
+        return text
+    result = []
+    previous = u''
+    for char in text:
+        if char == _long_vowel_mark and previous in _vowels:
+            char = _vowels[previous]
+        result.append(char)
+        previous = char
+    return u''.join(result)
+
+
+def same_reading(text):
+    """
+    Return a form of the reading to compare with others.
+
+    Convert to hiragana and write out long vowels, so that a katakana
+    word and its hiragana reading have the same form.
+    """
+    return expand_long_vowels(hiragana(text))
+
+
+def equals_kana(kana1, kana2):
+    """
+    Check whether two kana strings represent the same sound.
+
+    Compare two strings, converting katakana to hiragana first. That
+    means that for example equals_kana(u'キ', u'き') is True.
+    """
+    return hiragana(kana1) == hiragana(kana2)
@@ -9,10 +9,11 @@
 Return a language code.
 """
 
-from collections import Counter
+from collections import Counter, defaultdict
 import re
 
 from aqt import mw
+from anki.utils import ids2str
 from aqt.addcards import AddCards
 from aqt.browser import Browser
 from aqt.editcurrent import EditCurrent
@@ -30,6 +31,8 @@ old_al_code_code = 'addon_foreign_language'
 # after all.)
 fl_code_code = 'addon_audio_download_language'
 
+lang_tag_re = re.compile(r'^lang_([a-z]{2,3})$', flags=re.IGNORECASE)
+
 
 def elect_language(note):
     u"""
@@ -63,13 +66,69 @@ def language_code_from_tags(note):
     u"""Get the language set by the user for individual notes."""
     for tag in note.tags:
         try:
-            return re.search('^lang_([a-z]{2,3})$', tag,
-                             flags=re.IGNORECASE).group(1).lower()
+            return lang_tag_re.search(tag).group(1).lower()
         except AttributeError:
             continue
     raise ValueError('No language tag found')
 
 
+def deck_language_map():
+    u"""
+    Return a dict mapping deck ids to download language codes.
+
+    Look at every deck configuration once and at every deck once.
+    Decks without a language set, and filtered decks, which have no
+    configuration of their own, are left out.
+    """
+    conf_languages = {}
+    for conf in mw.col.decks.allConf():
+        try:
+            conf_languages[conf['id']] = conf[fl_code_code]
+        except KeyError:
+            continue
+    deck_languages = {}
+    for deck in mw.col.decks.all():
+        try:
+            deck_languages[deck['id']] = conf_languages[deck['conf']]
+        except KeyError:
+            continue
+    return deck_languages
+
+
+class LanguageResolver(object):
+    u"""
+    Return language codes for many notes quickly.
+
+    Build the deck to language map once and get the decks of all the
+    cards of the notes we look at with one query. Then look up the
+    language of every note in a dict. This is meant for batch
+    downloads, where there is no editor or card to ask.
+    """
+    def __init__(self, note_ids):
+        self.deck_languages = deck_language_map()
+        self.note_languages = {}
+        votes = defaultdict(Counter)
+        # For cards in filtered decks, use the deck they came from.
+        for nid, did in mw.col.db.execute(
+                "select nid, (case when odid then odid else did end) "
+                "from cards where nid in " + ids2str(note_ids)):
+            try:
+                votes[nid].update((self.deck_languages[did], ))
+            except KeyError:
+                continue
+        for nid, note_votes in votes.items():
+            # Same tie breaking (that is, none) as in elect_language.
+            self.note_languages[nid] = note_votes.most_common(1)[0][0]
+
+    def language_code(self, note):
+        u"""Return the language code for the note."""
+        try:
+            return language_code_from_tags(note)
+        except ValueError:
+            pass
+        return self.note_languages.get(note.id, default_audio_language_code)
+
+
 def language_code_from_editor(note, card_edit):
     u"""
     Return a language code
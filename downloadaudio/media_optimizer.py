@@ -0,0 +1,197 @@
+# -*- mode: python ; coding: utf-8 -*-
+#
+# Copyright © 2017 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+u"""
+Make the audio files in the collection smaller.
+
+Re-encode all the audio files used in [sound:] tags with the settings
+from the audio processor: silence trimmed, mono, low bit rate. The
+files are converted in parallel to temp files first. Only when the
+user agrees are the new files moved to the media folder. A file that
+keeps its extension is replaced, the old version goes to the trash.
+For the others, the notes are changed, and the old files are left for
+Check Media. There is also a dry run that just tells how much would be
+saved.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, \
+    as_completed
+import os
+import sys
+
+from send2trash import send2trash
+
+from aqt import mw
+from aqt.utils import askUser, tooltip
+from anki.utils import intTime
+
+from mediafile_utils import MediaNameIndex, move_file
+from processors import processor
+from shrink_worker import shrink_file
+from sweep import recorded_media_files, sound_re, write_recorded_media_files
+from temp_files import remove_temp_files
+
+
+shrink_workers = 4
+# Decoding and trimming the silence is Python work, so it is done in
+# this many processes. The packaged Anki can’t start Python worker
+# processes, there we use as many threads. That mostly helps with the
+# ffmpeg part.
+
+minimum_saving = 0.2
+# Only replace files when the new version is at least this much
+# (20%) smaller. Files that are already small are left alone.
+
+audio_extensions = ('.mp3', '.ogg', '.wav', '.flac', '.m4a', '.spx', '.opus')
+
+
+def size_string(byte_count):
+    u"""Return the byte count in megabytes, for the user."""
+    return u'{0:.1f} MB'.format(byte_count / 1048576.0)
+
+
+def referenced_audio_files():
+    u"""Return the sorted names of the audio files the notes use."""
+    names = set()
+    for fields in mw.col.db.list(
+            "select flds from notes where flds like '%[sound:%'"):
+        names.update(sound_re.findall(fields))
+    media_dir = mw.col.media.dir()
+    return sorted(
+        name for name in names
+        if os.path.splitext(name)[1].lower() in audio_extensions
+        and os.path.isfile(os.path.join(media_dir, name)))
+
+
+def shrink_files(names):
+    u"""Shrink the files in parallel. Return the list of the results."""
+    media_dir = mw.col.media.dir()
+    shrunk = []
+    mw.progress.start(
+        max=len(names), label=u'Shrinking audio files…', immediate=True)
+    try:
+        if getattr(sys, 'frozen', False):
+            # Worker processes would start another Anki.
+            executor_class = ThreadPoolExecutor
+        else:
+            executor_class = ProcessPoolExecutor
+        with executor_class(max_workers=shrink_workers) as pool:
+            futures = [
+                pool.submit(shrink_file, media_dir, name, minimum_saving)
+                for name in names]
+            for done_count, future in enumerate(as_completed(futures), 1):
+                mw.progress.update(value=done_count)
+                result = future.result()
+                if result:
+                    shrunk.append(result)
+    finally:
+        mw.progress.finish()
+    return shrunk
+
+
+def rewrite_sound_references(new_names):
+    u"""
+    Point the [sound:] tags to the new files.
+
+    Change all notes that use one of the keys of the new_names dict in
+    one go. Return the number of changed notes.
+    """
+    def new_reference(match):
+        name = match.group(1)
+        return u'[sound:{0}]'.format(new_names.get(name, name))
+
+    mod = intTime()
+    usn = mw.col.usn()
+    updates = []
+    for note_id, fields in mw.col.db.all(
+            "select id, flds from notes where flds like '%[sound:%'"):
+        new_fields = sound_re.sub(new_reference, fields)
+        if new_fields != fields:
+            updates.append((new_fields, mod, usn, note_id))
+    mw.col.db.executemany(
+        "update notes set flds=?, mod=?, usn=? where id=?", updates)
+    mw.col.updateFieldCache([update[3] for update in updates])
+    return len(updates)
+
+
+def replace_files(shrunk):
+    u"""
+    Move the shrunk files to the media folder and use them.
+
+    A file with the same extension as the original takes its place.
+    The original goes to the trash. Nothing else needs to change,
+    also not card templates or fields that use the file in other
+    ways. A file with a new extension gets a new name and the notes
+    are changed. Its original stays in the media folder, where Check
+    Media finds it as unused. Return the number of changed notes.
+    """
+    mw.checkpoint(u'Shrink audio')
+    media_dir = mw.col.media.dir()
+    name_index = MediaNameIndex(media_dir)
+    new_names = {}
+    for name, temp_path, extension, dummy_old, dummy_new in shrunk:
+        old_base, old_extension = os.path.splitext(name)
+        if old_extension.lower() == extension.lower():
+            media_path = os.path.join(media_dir, name)
+            try:
+                send2trash(media_path)
+            except Exception:
+                # Keep the old file, then.
+                os.unlink(temp_path)
+                continue
+            move_file(temp_path, media_path)
+            continue
+        media_path, new_name = name_index.free_name(old_base, extension)
+        move_file(temp_path, media_path)
+        new_names[name] = new_name
+    note_count = rewrite_sound_references(new_names)
+    recorded = recorded_media_files()
+    if recorded:
+        write_recorded_media_files(
+            new_names.get(name, name) for name in recorded)
+    return note_count
+
+
+def drop_shrunk_files(shrunk):
+    u"""Remove the temp files of the shrink results."""
+    remove_temp_files(result[1] for result in shrunk)
+
+
+def shrink_audio_dialog(dry_run=False):
+    u"""
+    Shrink the audio files of the collection.
+
+    With dry_run, just report how much we would save. Otherwise ask
+    the user before anything is changed.
+    """
+    if not processor:
+        tooltip(u'Shrinking audio files needs pydub.')
+        return
+    names = referenced_audio_files()
+    if not names:
+        tooltip(u'No audio files found.')
+        return
+    shrunk = shrink_files(names)
+    saved = sum(result[3] - result[4] for result in shrunk)
+    if dry_run or not shrunk:
+        drop_shrunk_files(shrunk)
+        tooltip(
+            u'Shrinking {0} of {1} audio files would save {2}.'.format(
+                len(shrunk), len(names), size_string(saved)))
+        return
+    if not askUser(
+            u'Replace {0} of {1} audio files with smaller versions? This '
+            u'saves {2}. The old versions go to the trash, or, when the '
+            u'file type changes, stay until you use Check Media. This '
+            u'can’t be undone.'.format(
+                len(shrunk), len(names), size_string(saved))):
+        drop_shrunk_files(shrunk)
+        return
+    note_count = replace_files(shrunk)
+    mw.requireReset()
+    tooltip(u'Replaced {0} files on {1} notes, saved {2}.'.format(
+        len(shrunk), note_count, size_string(saved)))
@@ -18,7 +18,62 @@ import shutil
 import unicodedata
 
 from aqt import mw
-from anki.utils import isMac, stripHTML
+from anki.utils import stripHTML
+
+
+def clean_base_name(base):
+    u"""Return base without HTML and characters not allowed in names."""
+    base = stripHTML(base)
+    # Strip the ‘invalidFilenameChars’ by hand.
+    base = re.sub(r'[\\/:\*?\'"<>\|\[\]]', '', base)
+    # Looks like the normalization issue has finally been
+    # solved. Always use NFC versions of file names now.
+    return unicodedata.normalize('NFC', base)
+
+
+def name_key(name):
+    u"""Return what has to be unique about a file name.
+
+    That is the name pulled to lower case and Unicode normalized.
+    """
+    # The point is that like this syncing from Linux to Macs/Windows
+    # and from Linux/Windows to Macs should work savely. And the Mac
+    # file systems don’t care about case either, and list names in
+    # NFD.
+    return unicodedata.normalize('NFC', name.lower())
+
+
+class MediaNameIndex(object):
+    u"""
+    The names in the media folder, to find free names quickly.
+
+    The folder is listed once. Names handed out are reserved, so that
+    many files can get their names before any of them is moved.
+    """
+
+    def __init__(self, media_dir=None):
+        self.media_dir = media_dir or mw.col.media.dir()
+        self.keys = set(name_key(name) for name in os.listdir(self.media_dir))
+
+    def __contains__(self, name):
+        return name_key(name) in self.keys
+
+    def free_name(self, base, end):
+        u"""Return and reserve a free path and name, see free_media_name."""
+        base = clean_base_name(base)
+        for i in range(0, 10000):
+            # Don't be silly. Give up after 9999 tries (by falling out
+            # of this loop).
+            if i:
+                name = u'{0}_{1}{2}'.format(base, i, end)
+            else:
+                name = base + end
+            if name not in self:
+                self.keys.add(name_key(name))
+                return os.path.join(self.media_dir, name), name
+        # The only way we can have arrived here is by unsuccessfully
+        # trying the 10000 names.
+        raise ValueError('Could not find free name.')
 
 
 def free_media_name(base, end):
@@ -30,57 +85,49 @@ def free_media_name(base, end):
     different only in upper/lower case.
     If no name can be found, a ValueError is raised.
     """
-    base = stripHTML(base)
-    # Strip the ‘invalidFilenameChars’ by hand.
-    base = re.sub(r'[\\/:\*?\'"<>\|\[\]]', '', base)
-    base = unicodedata.normalize('NFC', base)
-    # Looks like the normalization issue has finally been
-    # solved. Always use NFC versions of file names now.
-    mdir = mw.col.media.dir()
-    if not exists_lc(mdir, base + end):
-        return os.path.join(mdir, base + end), base + end
-    for i in range(1, 10000):
-        # Don't be silly. Give up after 9999 tries (by falling out of
-        # this loop).
-        long_name = u'{0}_{1}{2}'.format(base, i, end)
-        if not exists_lc(mdir, long_name):
-            return os.path.join(mdir, long_name), long_name
-    # The only way we can have arrived here is by unsuccessfully
-    # trying the 10000 names.
-    raise ValueError('Could not find free name.')
+    return MediaNameIndex().free_name(base, end)
 
 
 def exists_lc(path, name):
     u"""Test if file name clashes with name of extant file.
 
-    On Mac OS X we, simply check if the file exists.
-    On other systems, we check if the name would clashes with an
-    existing file’s name. That is, we check for files that have the same
-    name when both are pulled to lower case and Unicode normalized.
+    That is, we check for files that have the same name when both are
+    pulled to lower case and Unicode normalized.
     """
-    # The point is that like this syncing from Linux to Macs/Windows
-    # and from Linux/Windows to Macs should work savely. Not much to
-    # do on Macs, then.
-    if isMac:
-        return os.path.exists(os.path.join(path, name))
-    ln_name = unicodedata.normalize('NFC', name.lower())
-    for fname in os.listdir(path):
-        if unicodedata.normalize('NFC', fname.lower()) == ln_name:
-            return True
-    # After the loop, none found.
-    return False
-
-
-def unmunge_to_mediafile(dl_entry):
+    return name in MediaNameIndex(path)
+
+
+def move_file(source, destination):
+    u"""
+    Move the file.
+
+    Just rename it when it stays on the same file system. Otherwise
+    copy it over. Never replace an existing file. Raise a
+    FileExistsError instead.
+    """
+    if os.path.lexists(destination):
+        raise FileExistsError(destination)
+    try:
+        same_device = os.stat(source).st_dev \
+            == os.stat(os.path.dirname(destination)).st_dev
+    except OSError:
+        same_device = False
+    if same_device:
+        os.rename(source, destination)
+    else:
+        shutil.move(source, destination)
+
+
+def unmunge_to_mediafile(dl_entry, name_index=None):
     u"""
     Move the data to the media folder.
 
     Determine a free media name and move the data there from the
-    tempfile.
+    tempfile. Pass in a MediaNameIndex when moving many files.
     """
-    media_path, media_file_name = free_media_name(
+    if name_index is None:
+        name_index = MediaNameIndex()
+    media_path, media_file_name = name_index.free_name(
         dl_entry.base_name, dl_entry.file_extension)
-    print(media_path)
-    print(media_file_name)
-    shutil.move(dl_entry.file_path, media_path)
+    move_file(dl_entry.file_path, media_path)
     return media_file_name
@@ -0,0 +1,237 @@
+# -*- mode: python ; coding: utf-8 -*-
+#
+# Copyright © 2017 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+u"""
+Download audio for the next few review cards in the background.
+
+When a question is shown, look at the cards the scheduler will show
+next. For their empty audio fields, download and process the files in
+the background and keep the results for a while. When the user then
+asks for a download, the files are already there.
+"""
+
+from collections import OrderedDict
+import os
+import threading
+import time
+
+from aqt import mw
+from anki.hooks import addHook
+
+from background import clear_jobs, run_in_background
+from get_fields import get_note_fields
+from language import language_code_from_card
+from retrieve import retrieve_entries
+
+
+prefetch_count = 0
+# Number of review cards to download audio for ahead of time,
+# including the one currently shown. 0 switches prefetching off. Try
+# 3 or so.
+
+prefetch_max_age = 15 * 60
+# Seconds after which unused prefetched files are deleted.
+
+prefetch_cache_size = 30
+# Maximum number of fields we keep prefetched files for.
+
+
+def field_key(field_data, language):
+    u"""Return a key that identifies what we download for a field."""
+    return (language, field_data.split, field_data.word_field_name,
+            field_data.audio_field_name, field_data.word)
+
+
+def delete_entry_files(entries):
+    u"""Delete the downloaded files of the entries."""
+    for entry in entries:
+        try:
+            os.remove(entry.file_path)
+        except OSError:
+            pass
+
+
+class PrefetchCache(object):
+    u"""
+    A bounded store of prefetched DownloadEntries.
+
+    Keep lists of DownloadEntries by field key, for at most
+    prefetch_max_age seconds. Entries that are dropped have their
+    files deleted. Entries that are taken belong to the caller.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.items = OrderedDict()
+        # key -> (time stored, list of entries), oldest first.
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.items
+
+    def put(self, key, entries):
+        u"""Store the entries, dropping the oldest ones when full."""
+        dropped = []
+        with self.lock:
+            if key in self.items:
+                dropped.append(self.items.pop(key)[1])
+            self.items[key] = (time.time(), entries)
+            while len(self.items) > prefetch_cache_size:
+                dropped.append(self.items.popitem(last=False)[1][1])
+        for old_entries in dropped:
+            delete_entry_files(old_entries)
+
+    def take(self, key):
+        u"""Remove and return the entries for key, or None."""
+        with self.lock:
+            try:
+                stored, entries = self.items.pop(key)
+            except KeyError:
+                return None
+        if time.time() - stored > prefetch_max_age:
+            delete_entry_files(entries)
+            return None
+        return entries
+
+    def expire(self):
+        u"""Drop all entries older than prefetch_max_age."""
+        dropped = []
+        now = time.time()
+        with self.lock:
+            for key, (stored, entries) in list(self.items.items()):
+                if now - stored > prefetch_max_age:
+                    del self.items[key]
+                    dropped.append(entries)
+        for old_entries in dropped:
+            delete_entry_files(old_entries)
+
+    def clear(self):
+        u"""Drop all entries."""
+        with self.lock:
+            dropped = [entries for stored, entries in self.items.values()]
+            self.items.clear()
+        for old_entries in dropped:
+            delete_entry_files(old_entries)
+
+
+cache = PrefetchCache()
+keys_lock = threading.Lock()
+queued_keys = set()
+# Keys of the fields queued for prefetching.
+running_keys = {}
+# Key: threading.Event for the prefetches running right now. The
+# event is set when the prefetch is done.
+
+
+def fetch_entries(field_data, language, process_entries=True,
+                  background=False, check_sound_alikes=False):
+    u"""
+    Return the entries for one field.
+
+    Use the prefetched entries when we have them, otherwise download
+    them now. See retrieve_entries for process_entries, background
+    and check_sound_alikes. Prefetched entries are always checked.
+    """
+    key = field_key(field_data, language)
+    with keys_lock:
+        # No need to prefetch what we download now.
+        queued_keys.discard(key)
+        done = running_keys.get(key)
+    if done is not None:
+        # This very field is being prefetched. Wait for it rather
+        # than download it twice.
+        done.wait()
+    entries = cache.take(key)
+    if entries is None:
+        entries = retrieve_entries(
+            field_data, language, process_entries=process_entries,
+            background=background, check_sound_alikes=check_sound_alikes)
+    return entries
+
+
+def prefetch_field(field_data, language, key):
+    u"""Download the entries for one field and store them. """
+    with keys_lock:
+        if key not in queued_keys:
+            # Already downloaded for the user, or cleared.
+            return
+        queued_keys.discard(key)
+        done = running_keys[key] = threading.Event()
+    try:
+        if key not in cache:
+            # Nobody waits for this. The entries may be picked
+            # without review later.
+            cache.put(key, retrieve_entries(
+                field_data, language, background=True,
+                check_sound_alikes=True))
+    finally:
+        with keys_lock:
+            del running_keys[key]
+        done.set()
+
+
+def upcoming_card_ids(count):
+    u"""
+    Return the ids of the cards we will probably see next.
+
+    Start with the current card. Then look at the queues of the
+    scheduler. There is no official way to do that, so look at the
+    internal lists and hope for the best.
+    """
+    card_ids = []
+    try:
+        card_ids.append(mw.reviewer.card.id)
+    except AttributeError:
+        pass
+    for queue_name in ['_lrnQueue', '_revQueue', '_newQueue']:
+        for item in getattr(mw.col.sched, queue_name, []):
+            try:
+                # The learn queue contains (due, id) pairs.
+                card_id = item[1]
+            except TypeError:
+                card_id = item
+            if card_id not in card_ids:
+                card_ids.append(card_id)
+            if len(card_ids) >= count:
+                return card_ids
+    return card_ids
+
+
+def prefetch_upcoming():
+    u"""Queue background downloads for the next few cards."""
+    if prefetch_count < 1:
+        return
+    cache.expire()
+    for card_id in upcoming_card_ids(prefetch_count):
+        try:
+            card = mw.col.getCard(card_id)
+            note = card.note()
+        except (AssertionError, TypeError):
+            # Card deleted in the meantime.
+            continue
+        language = language_code_from_card(card)
+        for field_data in get_note_fields(note):
+            if field_data.empty or note[field_data.audio_field_name]:
+                continue
+            key = field_key(field_data, language)
+            with keys_lock:
+                if key in queued_keys or key in running_keys \
+                        or key in cache:
+                    continue
+                queued_keys.add(key)
+            run_in_background(prefetch_field, field_data, language, key)
+
+
+def clear_prefetched():
+    u"""Stop prefetching and delete all prefetched files."""
+    clear_jobs()
+    with keys_lock:
+        queued_keys.clear()
+    cache.clear()
+
+
+addHook("showQuestion", prefetch_upcoming)
+addHook("unloadProfile", clear_prefetched)
@@ -13,7 +13,8 @@ Process an audio file.
 from pydub import AudioSegment
 from pydub.silence import detect_nonsilent
 import os
-import tempfile
+
+from temp_files import temp_file_name
 
 load_functions = {
     'mp3': AudioSegment.from_mp3, 'ogg': AudioSegment.from_ogg,
@@ -30,6 +31,45 @@ rapid_fade_length = 20
 # Rapid fade in and at the beginning or end. Mostly to avoid the click
 # of a DC offset.
 
+shrink_format = 'mp3'
+# Format for the media size optimizer. 'ogg' with shrink_codec
+# 'libopus' gives even smaller files, but not every Anki client can
+# play those.
+shrink_codec = None
+shrink_bitrate = '48k'
+shrink_channels = 1
+# Mono is plenty for pronunciations.
+
+
+def load_segment(file_path, extension):
+    u"""Load the audio file, with the format given by the extension."""
+    input_format = extension.lstrip('.').lower()
+    try:
+        loader = load_functions[input_format]
+    except KeyError:
+        loader = lambda file: AudioSegment.from_file(
+            file=file, format=input_format)
+    return loader(file_path)  # This
+    # sometimes raised a pydub.exceptions.CouldntDecodeError
+
+
+def trim_silence(segment):
+    u"""Remove silence at the beginning and end, and fade in and out."""
+    loud_pos = detect_nonsilent(
+        segment, min_silence_len=minimum_silence_length,
+        silence_thresh=silence_threshold)
+    fade_in_length = rapid_fade_length
+    fade_out_length = rapid_fade_length
+    if len(loud_pos) == 1:
+        loud_p = loud_pos[0]
+        if loud_p[0] > silence_fade_length:
+            fade_in_length = silence_fade_length
+        if loud_p[1] < len(segment) - silence_fade_length:
+            fade_out_length = silence_fade_length
+        if loud_p[0] > 0 or loud_p[1] < len(segment):
+            segment = segment[loud_p[0] : loud_p[1]]
+    return segment.fade_in(fade_in_length).fade_out(fade_out_length)
+
 
 class AudioProcessor(object):
     u"""Class to do audio processing."""
@@ -51,38 +91,32 @@ class AudioProcessor(object):
 
         print("In the processor")
 
-        input_format = dl_entry.file_extension.lstrip('.')
-        try:
-            loader = load_functions[input_format]
-        except KeyError:
-            loader = lambda file: AudioSegment.from_file(
-                file=file, format=input_format)
-
-        segment = loader(dl_entry.file_path) # This
-        # sometimes raised a pydub.exceptions.CouldntDecodeError
-
-        # segment = segment.normalize()  # First normalize
-        # # Try to remove silence
-        # loud_pos = detect_nonsilent(
-        #     segment, min_silence_len=minimum_silence_length,
-        #     silence_thresh=silence_threshold)
-        # fade_in_length = rapid_fade_length
-        # fade_out_length = rapid_fade_length
-        # if len(loud_pos) == 1:
-        #     loud_p = loud_pos[0]
-        #     if loud_p[0] > silence_fade_length:
-        #         fade_in_length = silence_fade_length
-        #     if loud_p[1] < len(segment) - silence_fade_length:
-        #         fade_out_length = silence_fade_length
-        #     if loud_p[0] > 0 or loud_p[1] < len(segment):
-        #         segment = segment[loud_p[0] : loud_p[1]]
-        # segment = segment.fade_in(fade_in_length).fade_out(fade_out_length)
+        segment = load_segment(dl_entry.file_path, dl_entry.file_extension)
+
+        # segment = trim_silence(segment.normalize())
 
         # Now write
-        tof = tempfile.NamedTemporaryFile(
-            delete=False, suffix=output_suffix, prefix=u'anki_audio_')
-        temp_out_file_name = tof.name
-        tof.close()
+        temp_out_file_name = temp_file_name(output_suffix)
         segment.export(temp_out_file_name, output_format)
         os.unlink(dl_entry.file_path)  # Get rid of unprocessed version
         return temp_out_file_name, output_suffix
+
+    def shrink(self, file_path, extension):
+        u"""Make a small version of an audio file.
+
+        Trim the silence from the file, mix it down to mono and
+        re-encode it with a low bit rate. Return the name of the new
+        temp file and its extension. The original file is left alone.
+        """
+        segment = load_segment(file_path, extension)
+        segment = trim_silence(segment).set_channels(shrink_channels)
+        shrink_suffix = '.' + shrink_format
+        temp_out_file_name = temp_file_name(shrink_suffix)
+        try:
+            segment.export(
+                temp_out_file_name, shrink_format, codec=shrink_codec,
+                bitrate=shrink_bitrate)
+        except Exception:
+            os.unlink(temp_out_file_name)
+            raise
+        return temp_out_file_name, shrink_suffix
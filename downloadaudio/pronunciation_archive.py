@@ -0,0 +1,267 @@
+# -*- mode: python ; coding: utf-8 -*-
+#
+# Copyright © 2017 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+u"""
+Keep a local archive of the pronunciations we have used.
+
+Every file that is added to a note or kept is also stored here, once,
+under the SHA-256 of its content. An SQLite index maps the word,
+language, source and speaker to the file. The archive downloader
+looks here first, so we don’t download the same file again for
+another deck or profile. The archive can be exported to and imported
+from a zip file, to share it between computers.
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import unicodedata
+import zipfile
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from aqt import mw
+from aqt.utils import getFile, getSaveFile, tooltip
+from anki.hooks import addHook
+
+from download_entry import Action
+
+
+use_archive = True
+# Set this to False to neither store files in the archive nor look for
+# them there.
+
+archive_dir = os.path.join(mw.pm.addonFolder(), 'downloadaudio', 'archive')
+files_dir = os.path.join(archive_dir, 'files')
+index_path = os.path.join(archive_dir, 'index.db')
+export_index_name = 'index.json'
+
+schema = u"""
+create table if not exists pronunciations (
+    word text not null,
+    language text not null,
+    source text not null,
+    speaker text not null,
+    hash text not null,
+    extension text not null,
+    base_name text not null,
+    display_word text not null,
+    extras text not null,
+    added integer not null,
+    unique (word, language, source, speaker, hash));
+create index if not exists ix_pronunciations_word
+    on pronunciations (word, language, source, speaker);
+"""
+
+columns = ['word', 'language', 'source', 'speaker', 'hash', 'extension',
+           'base_name', 'display_word', 'extras', 'added']
+
+insert_sql = u'insert or ignore into pronunciations ({0}) values ({1})'.format(
+    u', '.join(columns), u', '.join(u'?' * len(columns)))
+
+archive_extras_key = 'Archived'
+# Marks entries that came from the archive.
+
+archived_name_re = re.compile(r'^[0-9a-f]{64}\.[a-zA-Z0-9]{1,5}$')
+
+archive_connection = None
+connection_lock = threading.RLock()
+# The connection is opened once and shared by the GUI and the
+# background thread. Hold the lock while using it.
+
+
+def normalize_word(word):
+    u"""Return the form of the word we use as key."""
+    return unicodedata.normalize('NFC', u' '.join(word.split())).lower()
+
+
+def connect():
+    u"""
+    Return the connection to the index, creating it when necessary.
+
+    Call this with the connection_lock held.
+    """
+    global archive_connection
+    if archive_connection is None:
+        if not os.path.isdir(files_dir):
+            os.makedirs(files_dir)
+        archive_connection = sqlite3.connect(
+            index_path, check_same_thread=False)
+        archive_connection.executescript(schema)
+    return archive_connection
+
+
+def close_connection():
+    u"""Close the connection to the index, if it is open."""
+    global archive_connection
+    with connection_lock:
+        if archive_connection is not None:
+            archive_connection.close()
+            archive_connection = None
+
+
+def archived_file_path(file_hash, extension):
+    u"""Return the path of an archived file."""
+    return os.path.join(files_dir, file_hash + extension)
+
+
+def file_hash(file_path):
+    u"""Return the SHA-256 hex digest of the file."""
+    with open(file_path, 'rb') as hash_file:
+        return hashlib.sha256(hash_file.read()).hexdigest()
+
+
+def store_entries(entries, language):
+    u"""Store the files of the entries we add or keep."""
+    if not use_archive:
+        return
+    rows = []
+    for entry in entries:
+        if entry.action != Action.Add and entry.action != Action.Keep:
+            continue
+        if archive_extras_key in entry.extras:
+            # Already there.
+            continue
+        try:
+            entry_hash = file_hash(entry.file_path)
+            target = archived_file_path(entry_hash, entry.file_extension)
+            if not os.path.exists(target):
+                if not os.path.isdir(files_dir):
+                    os.makedirs(files_dir)
+                shutil.copyfile(entry.file_path, target)
+        except (IOError, OSError):
+            continue
+        extras = dict((key, value) for key, value in entry.extras.items()
+                      if key != archive_extras_key)
+        rows.append((
+            normalize_word(entry.word), language,
+            extras.get('Source', u''), extras.get('User', u''),
+            entry_hash, entry.file_extension, entry.base_name,
+            entry.display_word, json.dumps(extras), int(time.time())))
+    if not rows:
+        return
+    with connection_lock:
+        connection = connect()
+        with connection:
+            connection.executemany(insert_sql, rows)
+
+
+def find_entries(word, language):
+    u"""
+    Return what we have archived for word and language.
+
+    Return a list of (file path, extension, base name, display word,
+    extras dict) tuples, for files that are actually there.
+    """
+    if not use_archive:
+        return []
+    if archive_connection is None and not os.path.exists(index_path):
+        # Nothing archived yet. Don’t make an empty index.
+        return []
+    with connection_lock:
+        rows = connect().execute(
+            u'select hash, extension, base_name, display_word, extras '
+            u'from pronunciations where word = ? and language = ? '
+            u'order by added',
+            (normalize_word(word), language)).fetchall()
+    found = []
+    for entry_hash, extension, base_name, display_word, extras in rows:
+        path = archived_file_path(entry_hash, extension)
+        if os.path.exists(path):
+            found.append(
+                (path, extension, base_name, display_word, json.loads(extras)))
+    return found
+
+
+def export_archive(zip_path):
+    u"""Write the whole archive to a zip file. Return the file count."""
+    with connection_lock:
+        rows = [dict(zip(columns, row)) for row in connect().execute(
+            u'select {0} from pronunciations'.format(u', '.join(columns)))]
+    written = set()
+    with zipfile.ZipFile(zip_path, 'w') as archive_zip:
+        archive_zip.writestr(export_index_name, json.dumps(rows, indent=1))
+        for row in rows:
+            name = row['hash'] + row['extension']
+            if name in written:
+                continue
+            path = os.path.join(files_dir, name)
+            if os.path.exists(path):
+                archive_zip.write(path, 'files/' + name)
+                written.add(name)
+    return len(written)
+
+
+def import_archive(zip_path):
+    u"""Add the content of an exported archive. Return the row count."""
+    with connection_lock:
+        # Make sure the files directory is there.
+        connect()
+    rows = []
+    with zipfile.ZipFile(zip_path, 'r') as archive_zip:
+        names = set(archive_zip.namelist())
+        for row in json.loads(
+                archive_zip.read(export_index_name).decode('utf-8')):
+            name = row['hash'] + row['extension']
+            if not archived_name_re.match(name):
+                # Don’t let anybody write outside our directory.
+                continue
+            zip_name = 'files/' + name
+            target = archived_file_path(row['hash'], row['extension'])
+            if not os.path.exists(target):
+                if zip_name not in names:
+                    continue
+                data = archive_zip.read(zip_name)
+                if hashlib.sha256(data).hexdigest() != row['hash']:
+                    # Damaged or doctored. Don’t use it.
+                    continue
+                with open(target, 'wb') as target_file:
+                    target_file.write(data)
+            rows.append(tuple(row[column] for column in columns))
+    with connection_lock:
+        connection = connect()
+        with connection:
+            before = connection.total_changes
+            connection.executemany(insert_sql, rows)
+            added = connection.total_changes - before
+    return added
+
+
+def export_archive_dialog():
+    u"""Ask for a file name and export the archive."""
+    zip_path = getSaveFile(
+        mw, u'Export pronunciation archive', 'downloadaudio_archive',
+        u'Zip file', '.zip', 'pronunciations.zip')
+    if not zip_path:
+        return
+    count = export_archive(zip_path)
+    tooltip(u'Exported {0} files.'.format(count))
+
+
+def import_archive_dialog():
+    u"""Ask for a file and import it into the archive."""
+    zip_path = getFile(
+        mw, u'Import pronunciation archive', None, u'Zip file (*.zip)',
+        key='downloadaudio_archive')
+    if not zip_path:
+        return
+    try:
+        count = import_archive(zip_path)
+    except (KeyError, ValueError, zipfile.BadZipfile):
+        tooltip(u'This is not a pronunciation archive.')
+        return
+    tooltip(u'Imported {0} pronunciations.'.format(count))
+
+
+addHook("unloadProfile", close_connection)
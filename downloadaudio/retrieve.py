@@ -0,0 +1,128 @@
+# -*- mode: python ; coding: utf-8 -*-
+#
+# Copyright © 2012–17 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+u"""
+Get the audio for one text field from all the sites.
+"""
+
+import threading
+
+from blacklist import is_black_fingerprint
+from downloaders import downloaders
+from fingerprint import FingerprintIndex, fingerprinting
+from temp_files import remove_temp_files, tracked_temp_files
+
+
+downloaders_lock = threading.RLock()
+# The downloaders keep their state (language, downloads_list, ...) in
+# the objects in the downloaders list. Hold this lock while using
+# them.
+background_downloaders = None
+background_lock = threading.RLock()
+# Background downloads use their own downloader objects, with their
+# own lock, so that a download the user asked for never has to wait
+# for one in the background.
+
+drop_sound_alikes = True
+# When NumPy and pydub are there, drop files that sound like a
+# blacklisted file or like a file from a site earlier in the list.
+# This decodes every file, so it is only done when the caller asks for
+# it: when nobody looks at the files before they go on the note, or
+# in the background, where nobody waits for it.
+
+
+def get_background_downloaders():
+    u"""Return the downloaders for the background thread."""
+    global background_downloaders
+    with background_lock:
+        if background_downloaders is None:
+            # The same sites in the same order, as new objects.
+            background_downloaders = [
+                type(dloader)() for dloader in downloaders]
+        return background_downloaders
+
+
+def retrieve_entries(field_data, language, process_entries=True,
+                     background=False, check_sound_alikes=False):
+    u"""
+    Download and process the files for one field.
+
+    Go through the list of sites and download the text of the field
+    data from each. Return a list of DownloadEntries. These are
+    processed unless process_entries is False. That is for when we
+    pick the files automatically and process only the one we keep.
+    Set background to True when running in the background thread.
+    Set check_sound_alikes to True to drop files that sound like
+    others.
+    """
+    if background:
+        dloaders = get_background_downloaders()
+        lock = background_lock
+    else:
+        dloaders = downloaders
+        lock = downloaders_lock
+    retrieved_entries = []
+    with tracked_temp_files() as created_files:
+        try:
+            with lock:
+                for dloader in dloaders:
+                    if dloader.fallback_only and retrieved_entries:
+                        continue
+                    # Use a public variable to set the language.
+                    dloader.language = language
+                    try:
+                        # Make it easer inside the downloader. If
+                        # anything goes wrong, don't catch, or raise
+                        # whatever you want.
+                        dloader.download_files(field_data)
+                    except Exception:
+                        #  # Uncomment this raise while testing a new
+                        #  # downloaders.  Also use the “For testing”
+                        #  # downloaders list with your downloader in
+                        #  # downloaders.__init__
+                        # raise
+                        continue
+                    retrieved_entries += dloader.downloads_list
+                    if dloader.downloads_list and dloader.skip_rest_on_hit:
+                        break
+            if check_sound_alikes and drop_sound_alikes \
+                    and fingerprinting:
+                retrieved_entries = without_sound_alikes(retrieved_entries)
+            if process_entries:
+                for entry in retrieved_entries:
+                    # Do the processing before the reviewing now.
+                    if not entry.processed:
+                        entry.process()
+        except Exception:
+            remove_temp_files(created_files)
+            raise
+    # Remove what the downloaders left behind when they gave up, and
+    # what the processor didn’t clean up.
+    remove_temp_files(created_files.difference(
+        entry.file_path for entry in retrieved_entries))
+    return retrieved_entries
+
+
+def without_sound_alikes(entries):
+    u"""
+    Return the entries that sound new.
+
+    Leave out the entries that sound like a blacklisted file or like
+    an entry earlier in the list. Their files are removed with the
+    other unused temp files.
+    """
+    seen = FingerprintIndex()
+    kept_entries = []
+    for entry in entries:
+        fingerprint = entry.fingerprint
+        if fingerprint is not None:
+            if is_black_fingerprint(fingerprint) \
+                    or seen.find(fingerprint) is not None:
+                continue
+            seen.add(fingerprint)
+        kept_entries.append(entry)
+    return kept_entries
@@ -30,28 +30,22 @@ from anki.lang import _
 from anki.sound import play, playFromText
 
 from download_entry import Action
+from fingerprint import fingerprinting
+from scoring import select_entries
 
 icons_dir = os.path.join(mw.pm.addonFolder(), 'downloadaudio', 'icons')
-FORVO_STR = 'forvo.com'
 
 
 def auto_select_entry(note, retrieved_data):
-    sorted_entries = []
-    cur_idx = 0
-    for entry in retrieved_data:
-        # First check for Forvo
-        if 'Source' in entry.extras.keys() and \
-           entry.extras['Source'].lower() == FORVO_STR:
-            sorted_entries.insert(cur_idx, entry)
-            cur_idx += 1
-        else:
-            sorted_entries.append(entry)
+    u"""Pick the best entry for each field, see scoring.py."""
+    return select_entries(retrieved_data)
 
-    for entry in sorted_entries:
-        entry.action = Action.Add if sorted_entries.index(entry) == 0 \
-            else Action.Delete
 
-    return sorted_entries
+def audio_info_text(info):
+    u"""Return a short description of the audio file."""
+    return u'{0:.1f} s, {1} kbit/s, {2} Hz, {3}'.format(
+        info.duration, int(round(info.bitrate / 1000.0)), info.sample_rate,
+        u'mono' if info.channels == 1 else u'stereo')
 
 
 def review_entries(note, retrieved_data, hide_text, no_manual_review=False):
@@ -92,7 +86,7 @@ class ReviewFiles(QDialog):
         self.keep_column = 5
         self.delete_column = 6
         self.blacklist_column = 7
-        self.show_skull_and_bones = any(
+        self.show_skull_and_bones = fingerprinting or any(
             entry.entry_hash for entry in self.entries_list)
         if not self.show_skull_and_bones:
             self.num_columns -= 1
@@ -135,8 +129,9 @@ may be deleted during the unused media check.</p>""")
 <p>This is the normal thing to do with a file you don’t like.</p>""")
         self.delete_help_text_short = _(u"Delete this file")
         self.blacklist_help_text_long = _(u"""<h4>Blacklist the file.</h4>
-Add an idetifier for this file to a blacklist. When this file is
-downloaded again, it will be silently dropped. This behaviour is
+Add an idetifier for this file to a blacklist. When this file, or one
+that sounds the same, is downloaded again (without review, for the
+latter), it will be silently dropped. This behaviour is
 useful for Japanesepod downloads. When your downloaded file tells you
 that they are sorry, will add this soon &c., click on this.""")
         self.blacklist_help_text_short = _(u"Blacklist this file")
@@ -218,7 +213,12 @@ that they are sorry, will add this soon &c., click on this.""")
             if entry.icon:
                 ico_label.setPixmap(QPixmap.fromImage(entry.icon))
             layout.addWidget(ico_label, num, 0)
-            tt_label = QLabel(entry.display_word, sarea)
+            info = entry.audio_info
+            if info:
+                tt_label = QLabel(u'{0} <small>({1:.1f} s)</small>'.format(
+                    entry.display_word, info.duration), sarea)
+            else:
+                tt_label = QLabel(entry.display_word, sarea)
             tt_label.setToolTip(tt_text)
             layout.addWidget(tt_label, num, 1)
             if self.hide_text:
@@ -276,7 +276,7 @@ that they are sorry, will add this soon &c., click on this.""")
             t_blacklist_button.setToolTip(self.blacklist_help_text_short)
             t_blacklist_button.setIcon(
                 QIcon(os.path.join(icons_dir, 'blacklist.png')))
-            if entry.entry_hash:
+            if entry.entry_hash or fingerprinting:
                 layout.addWidget(
                     t_blacklist_button, num, self.blacklist_column)
             else:
@@ -306,4 +306,7 @@ that they are sorry, will add this soon &c., click on this.""")
         ret_text += u'<br>Audio field: {0}'.format(entry.audio_field_name)
         for key, value in entry.extras.items():
             ret_text += u'<br>{0}: {1}'.format(key, value)
+        if entry.audio_info:
+            ret_text += u'<br>Audio: {0}'.format(
+                audio_info_text(entry.audio_info))
         return ret_text
@@ -0,0 +1,169 @@
+# -*- mode: python ; coding: utf-8 -*-
+#
+# Copyright © 2017 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+u"""
+Pick the best downloaded file without asking the user.
+
+Each entry gets a score from its source, its Forvo rating and its
+length. The best few are then listened to: clips that are too quiet
+or clipped lose points. Files we got twice are dropped. For each audio
+field the entry with the highest score is added, the others are
+deleted. Only the winners are processed, so that no ffmpeg work is
+wasted on files we throw away anyway.
+"""
+
+from collections import OrderedDict
+import hashlib
+import heapq
+
+from download_entry import Action
+from processors import processor
+
+if processor:
+    from audio_processor import load_segment
+
+
+source_scores = {
+    'forvo.com': 20,
+    'googletts': -20,
+    'espeak ng': -40}
+# Points by lower case source name. Sources not in this dict get
+# default_source_score. Real people beat robot voices.
+default_source_score = 10
+
+rating_score = 3
+max_rating_score = 15
+# Points per Forvo rating point, and the most we give for a rating.
+
+max_auto_duration = 10.0
+min_good_duration = 0.3
+max_good_duration = 4.0
+# Clips that are empty or longer than max_auto_duration seconds are
+# never picked. Those are usually some kind of “not found” message
+# rather than a pronunciation. Clips outside the “good” range lose a
+# few points.
+duration_score = 5
+
+analysis_count = 3
+# Listen to this many of the best candidates of each field. That means
+# decoding them, so keep this low.
+quiet_dbfs = -35.0
+clipped_fraction = 0.001
+level_score = 10
+# Clips quieter than quiet_dbfs, or with more than clipped_fraction of
+# the samples at full scale lose level_score points.
+
+
+def usable_length(entry):
+    u"""Return whether the length of the clip looks reasonable."""
+    info = entry.audio_info
+    if info is None:
+        # Couldn’t read the headers. Give it the benefit of the doubt.
+        return True
+    return 0 < info.duration <= max_auto_duration
+
+
+def base_score(entry):
+    u"""Return the score we can get without decoding the file."""
+    source = entry.extras.get('Source', u'').lower()
+    score = source_scores.get(source, default_source_score)
+    try:
+        rating = int(entry.extras.get('Rating', 0))
+    except ValueError:
+        rating = 0
+    score += max(-max_rating_score, min(max_rating_score,
+                                        rating * rating_score))
+    info = entry.audio_info
+    if info and not min_good_duration <= info.duration <= max_good_duration:
+        score -= duration_score
+    return score
+
+
+def level_penalty(entry):
+    u"""Return the points lost for a too quiet or clipped clip."""
+    try:
+        segment = load_segment(entry.file_path, entry.file_extension)
+    except Exception:
+        # Something is wrong with this file.
+        return level_score
+    penalty = 0
+    if segment.dBFS < quiet_dbfs:
+        penalty += level_score
+    samples = segment.get_array_of_samples()
+    if samples:
+        full_scale = segment.max_possible_amplitude - 1
+        clipped = sum(1 for sample in samples if abs(sample) >= full_scale)
+        if clipped > clipped_fraction * len(samples):
+            penalty += level_score
+    return penalty
+
+
+def file_hash(entry):
+    u"""Return the SHA-256 hash of the file."""
+    sha = hashlib.sha256()
+    with open(entry.file_path, 'rb') as audio_file:
+        for block in iter(lambda: audio_file.read(65536), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def field_candidates(entries):
+    u"""
+    Return the candidates for one audio field, with their scores.
+
+    Entries that are duplicates or that have an unusable length are
+    set to Delete and not returned.
+    """
+    seen_hashes = set()
+    candidates = []
+    for idx, entry in enumerate(entries):
+        entry.action = Action.Delete
+        try:
+            entry_hash = file_hash(entry)
+        except (IOError, OSError):
+            continue
+        if entry_hash in seen_hashes or not usable_length(entry):
+            continue
+        seen_hashes.add(entry_hash)
+        # The negative index as second element makes max() prefer the
+        # earlier entry when the scores are equal.
+        candidates.append([base_score(entry), -idx, entry])
+    if processor:
+        for candidate in heapq.nlargest(
+                analysis_count, candidates, key=lambda c: c[:2]):
+            candidate[0] -= level_penalty(candidate[2])
+    return candidates
+
+
+def select_field_entry(entries):
+    u"""Set the best entry of one field to Add and process it."""
+    candidates = field_candidates(entries)
+    while candidates:
+        best = max(candidates, key=lambda c: c[:2])
+        entry = best[2]
+        entry.action = Action.Add
+        if not entry.processed:
+            entry.process()
+        if entry.action == Action.Add:
+            return
+        # The processor couldn’t decode it. Try the next one.
+        candidates.remove(best)
+
+
+def select_entries(entries):
+    u"""
+    Pick the best entry for each audio field.
+
+    Set the action of the best entry for each audio field to Add, and
+    that of the others to Delete. Return the entries.
+    """
+    fields = OrderedDict()
+    for entry in entries:
+        fields.setdefault(entry.audio_field_name, []).append(entry)
+    for field_entries in fields.values():
+        select_field_entry(field_entries)
+    return entries
@@ -0,0 +1,41 @@
+# -*- mode: python ; coding: utf-8 -*-
+#
+# Copyright © 2017 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+u"""
+Shrink one audio file, in a worker process of the media optimizer.
+
+Decoding with pydub and looking for the silence is Python work, which
+threads can’t spread over the cores. So this runs in a process
+pool. This module must not import aqt: the workers may import it
+afresh, without a running Anki.
+"""
+
+import os
+
+from processors import processor
+
+
+def shrink_file(media_dir, name, minimum_saving):
+    u"""
+    Make a small version of one media file.
+
+    Return a tuple of the name, the temp file path, its extension, the
+    old and the new size. Return None when the file couldn’t be
+    converted or when it didn’t get at least minimum_saving smaller.
+    """
+    path = os.path.join(media_dir, name)
+    try:
+        old_size = os.path.getsize(path)
+        temp_path, extension = processor.shrink(
+            path, os.path.splitext(name)[1])
+    except Exception:
+        return None
+    new_size = os.path.getsize(temp_path)
+    if new_size > old_size * (1 - minimum_saving):
+        os.unlink(temp_path)
+        return None
+    return name, temp_path, extension, old_size, new_size
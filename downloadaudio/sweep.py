@@ -0,0 +1,131 @@
+# -*- mode: python ; coding: utf-8 -*-
+#
+# Copyright © 2017 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+u"""
+Clean up files the add-on left behind.
+
+* Old anki_audio_ temp files, from runs that crashed or were killed,
+  are removed when a profile is loaded.
+* The names of the files we put into the media folder are noted. Files
+  from that list that no note uses any more, like the ones the user
+  just wanted to keep, can be removed from the Media menu.
+"""
+
+import os
+import re
+import tempfile
+import time
+
+from aqt import mw
+from aqt.utils import askUser, tooltip
+from anki.hooks import addHook
+
+from temp_files import temp_prefix
+
+
+stale_age = 24 * 60 * 60
+# Temp files older than this (in seconds) are considered left over.
+
+record_file_name = 'downloadaudio_media.txt'
+# Where we note the names of the files we moved to the media folder,
+# in the profile folder. Not in the media folder, where it would be
+# synced.
+
+sound_re = re.compile(r'\[sound:(.+?)\]')
+
+
+def record_path():
+    u"""Return the path of the list of downloaded media files."""
+    return os.path.join(mw.pm.profileFolder(), record_file_name)
+
+
+def record_media_files(file_names):
+    u"""Note that we have put these files into the media folder."""
+    lines = u''.join(file_name + u'\n' for file_name in file_names)
+    if not lines:
+        return
+    with open(record_path(), 'a', encoding='utf-8') as record_file:
+        record_file.write(lines)
+
+
+def recorded_media_files():
+    u"""Return the set of media files we have downloaded."""
+    try:
+        with open(record_path(), 'r', encoding='utf-8') as record_file:
+            return set(line.rstrip(u'\n') for line in record_file if line)
+    except IOError:
+        return set()
+
+
+def write_recorded_media_files(file_names):
+    u"""Replace the list of downloaded media files."""
+    with open(record_path(), 'w', encoding='utf-8') as record_file:
+        for file_name in sorted(file_names):
+            record_file.write(file_name + u'\n')
+
+
+def remove_stale_temp_files():
+    u"""Remove our temp files that are older than stale_age."""
+    temp_dir = tempfile.gettempdir()
+    too_old = time.time() - stale_age
+    for file_name in os.listdir(temp_dir):
+        if not file_name.startswith(temp_prefix):
+            continue
+        path = os.path.join(temp_dir, file_name)
+        try:
+            if os.path.getmtime(path) < too_old:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def unreferenced_downloads():
+    u"""
+    Return the downloaded media files no note uses.
+
+    Go through the fields of all notes once and collect the sound file
+    names. Return a sorted list of the names of downloaded files that
+    are still in the media folder but are not among them.
+    """
+    downloaded = recorded_media_files()
+    if not downloaded:
+        return []
+    referenced = set()
+    for fields in mw.col.db.list("select flds from notes"):
+        if '[sound:' in fields:
+            referenced.update(sound_re.findall(fields))
+    media_dir = mw.col.media.dir()
+    return sorted(
+        file_name for file_name in downloaded.difference(referenced)
+        if os.path.exists(os.path.join(media_dir, file_name)))
+
+
+def remove_unused_downloads():
+    u"""Ask the user, then remove downloaded files no note uses."""
+    unused = unreferenced_downloads()
+    if not unused:
+        tooltip(u'No unused downloaded audio files.')
+        return
+    if not askUser(
+            u'Delete {0} downloaded audio files that are not used on any '
+            u'note?'.format(len(unused))):
+        return
+    media_dir = mw.col.media.dir()
+    removed = 0
+    for file_name in unused:
+        try:
+            os.remove(os.path.join(media_dir, file_name))
+        except OSError:
+            continue
+        removed += 1
+    write_recorded_media_files(
+        file_name for file_name in recorded_media_files()
+        if os.path.exists(os.path.join(media_dir, file_name)))
+    tooltip(u'Deleted {0} files.'.format(removed))
+
+
+addHook("profileLoaded", remove_stale_temp_files)
@@ -0,0 +1,67 @@
+# -*- mode: python ; coding: utf-8 -*-
+#
+# Copyright © 2017 Roland Sieker <ospalh@gmail.com>
+#
+# License: GNU AGPL, version 3 or later;
+# http://www.gnu.org/copyleft/agpl.html
+
+u"""
+Create temp files and make sure they are removed again.
+
+All the temp files of the add-on are made by temp_file_name(). Inside
+a tracked_temp_files() block, the names of the files made in this
+thread are collected, so that the block can remove the ones nobody
+took over, even when something went wrong.
+"""
+
+from contextlib import contextmanager
+import os
+import tempfile
+import threading
+
+
+temp_prefix = u'anki_audio_'
+
+tracking = threading.local()
+
+
+def temp_file_name(suffix):
+    u"""Make a new, empty temp file and return its name."""
+    tfile = tempfile.NamedTemporaryFile(
+        delete=False, prefix=temp_prefix, suffix=suffix)
+    tfile.close()
+    for registry in getattr(tracking, 'registries', []):
+        registry.add(tfile.name)
+    return tfile.name
+
+
+@contextmanager
+def tracked_temp_files():
+    u"""Collect the names of the temp files made inside this block."""
+    try:
+        registries = tracking.registries
+    except AttributeError:
+        registries = tracking.registries = []
+    created = set()
+    registries.append(created)
+    try:
+        yield created
+    finally:
+        registries.remove(created)
+
+
+def is_temp_file(path):
+    u"""Return whether path looks like one of our temp files."""
+    return os.path.dirname(path) == tempfile.gettempdir() \
+        and os.path.basename(path).startswith(temp_prefix)
+
+
+def remove_temp_files(paths):
+    u"""Remove those of the files that are still our temp files."""
+    for path in paths:
+        if not is_temp_file(path):
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -19,52 +19,22 @@ display as base text and what as ruby.
 Also add a few other templates.
 """
 
-import re
 from anki import hooks
 
+from .ruby import render
 
-__version__ = "3.0.0"
-
-
-# Get rid off the Python 2.6 vs. 2.7 check. This is Python 3 and knows
-# Unicode.
-# Then new split pattern
-split_pat = r' ?(?P<kanji>\w+?)\[(?P<kana>.+?)\]'
-# The pattern to produce the furigana. What is called ruby in the old
-# code, but using named groups and adding a class.
-furigana_pat = r'<ruby class="furigana"><rb>\g<kanji></rb>' + \
-               r'<rt>\g<kana></rt></ruby>'
-# Pattern to produce the furikanji.  This is pretty much the reason
-# for this add-on.
-furikanji_pat = \
-    r'<ruby class="furikanji"><rb>\g<kana></rb><rt>\g<kanji></rt></ruby>'
 
-
-def no_sound(repl):
-    """Do re replacement only when the text is not a media file."""
-    def func(match):
-        """Do re replacement only when the text is not a media file."""
-        if match.group('kana').startswith("sound:"):
-            # return without modification
-            return match.group(0)
-        else:
-            return re.sub(split_pat, repl, match.group(0), flags=re.UNICODE)
-
-    return func
+__version__ = "3.0.0"
 
 
 def kanji_word_re(txt, *dummy_args):
     """Strip kana and wrap base text in class kanji."""
-    return re.sub(
-        split_pat, no_sound(r'<span class="kanji">\g<kanji></span>'),
-        txt, flags=re.UNICODE)
+    return render(txt, 'kanji')
 
 
 def kana_word_re(txt, *dummy_args):
     """Strip base text and wrap kana in class kana."""
-    return re.sub(
-        split_pat, no_sound(r'<span class="kana">\g<kana></span>'), txt,
-        flags=re.UNICODE)
+    return render(txt, 'kana')
 
 
 def furigana_word_re(txt, *dummy_args):
@@ -75,7 +45,7 @@ def furigana_word_re(txt, *dummy_args):
     the brackets as the base, the text in the brackets as <rt>, that
     is, the ruby. Add class furigana to the ruby tag.
     """
-    return re.sub(split_pat, no_sound(furigana_pat), txt, flags=re.UNICODE)
+    return render(txt, 'furigana')
 
 
 def furikanji(txt, *dummy_args):
@@ -88,7 +58,7 @@ def furikanji(txt, *dummy_args):
     from the standard way and typically shows small kanji above their
     reading.
     """
-    return re.sub(split_pat, no_sound(furikanji_pat), txt, flags=re.UNICODE)
+    return render(txt, 'furikanji')
 
 
 hooks.addHook('fmod_furikanji', furikanji)
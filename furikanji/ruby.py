@@ -0,0 +1,152 @@
+# -*- mode: python ; coding: utf-8 -*-
+#
+# Copyright © 2012–18 Roland Sieker <ospalh@gmail.com>
+#
+# License:
+# GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+"""
+Split text with readings into tokens and render them.
+
+Text like “日本語[にほんご]を 勉強[べんきょう]する” is split once into
+plain text, ruby (kanji, kana) and [sound:] tokens. All the output
+styles are made from these tokens. Both the tokens and the rendered
+text are cached by field text, as the same fields are shown again and
+again during a review.
+
+This module doesn’t use Anki. Run it to time it with a corpus of
+fields, one per line:
+
+    $ python ruby.py fields.txt
+"""
+
+from functools import lru_cache
+import re
+
+
+# The split pattern. Base text is a run of word characters, the
+# reading the text in the square brackets.
+split_re = re.compile(r' ?(?P<kanji>\w+?)\[(?P<kana>.+?)\]')
+
+PLAIN, RUBY, SOUND = 'plain', 'ruby', 'sound'
+# The token kinds. A token is a tuple (kind, text, kanji, kana), where
+# text is the original text of the token. kanji and kana are only set
+# for ruby tokens.
+
+styles = {
+    'kanji': '<span class="kanji">{kanji}</span>',
+    'kana': '<span class="kana">{kana}</span>',
+    'furigana': '<ruby class="furigana"><rb>{kanji}</rb>'
+    '<rt>{kana}</rt></ruby>',
+    # Kanji above the kana.  This is pretty much the reason for this
+    # add-on.
+    'furikanji': '<ruby class="furikanji"><rb>{kana}</rb>'
+    '<rt>{kanji}</rt></ruby>',
+}
+# How to render a ruby token in the different styles.
+
+cache_size = 4096
+# Remember the tokens and renderings of this many fields.
+
+
+@lru_cache(maxsize=cache_size)
+def tokenize(txt):
+    """Return the tokens of the text, as a tuple."""
+    tokens = []
+    pos = 0
+    for match in split_re.finditer(txt):
+        if match.start() > pos:
+            tokens.append((PLAIN, txt[pos:match.start()], None, None))
+        if match.group('kana').startswith('sound:'):
+            # Media file. Leave it alone.
+            tokens.append((SOUND, match.group(0), None, None))
+        else:
+            tokens.append(
+                (RUBY, match.group(0), match.group('kanji'),
+                 match.group('kana')))
+        pos = match.end()
+    if pos < len(txt):
+        tokens.append((PLAIN, txt[pos:], None, None))
+    return tuple(tokens)
+
+
+@lru_cache(maxsize=cache_size)
+def render(txt, style):
+    """Return the text with the readings rendered in the style."""
+    if '[' not in txt:
+        return txt
+    template = styles[style]
+    return ''.join([
+        template.format(kanji=kanji, kana=kana) if kind == RUBY else text
+        for kind, text, kanji, kana in tokenize(txt)])
+
+
+def clear_cache():
+    """Forget the cached tokens and renderings."""
+    tokenize.cache_clear()
+    render.cache_clear()
+
+
+def _reference_render(txt, style):
+    # The old way, a re.sub in a re.sub, to compare with.
+    template = styles[style].replace('{kanji}', r'\g<kanji>').replace(
+        '{kana}', r'\g<kana>')
+    pattern = split_re.pattern
+
+    def no_sound(match):
+        if match.group('kana').startswith("sound:"):
+            return match.group(0)
+        return re.sub(pattern, template, match.group(0), flags=re.UNICODE)
+    return re.sub(pattern, no_sound, txt, flags=re.UNICODE)
+
+
+_sample_fields = [
+    '日本語[にほんご]を 勉強[べんきょう]する',
+    '今日[きょう]は いい 天気[てんき]ですね。',
+    '食[た]べる[sound:taberu_forvo.mp3]',
+    '<div>お 茶[ちゃ]を 飲[の]みませんか</div>',
+    '電車[でんしゃ]で 会社[かいしゃ]に 行[い]きます',
+    '東京[とうきょう]',
+    'ありがとう',
+    '[sound:ohayou.ogg]',
+    '毎朝[まいあさ] 七時[しちじ]に 起[お]きる<br>',
+    '雨[あめ]が 降[ふ]りそうだから、傘[かさ]を 持[も]って 行[い]こう。',
+]
+
+
+def _benchmark(fields, rounds=20):
+    import timeit
+    mismatches = 0
+    for txt in fields:
+        for style in styles:
+            if render(txt, style) != _reference_render(txt, style):
+                mismatches += 1
+                print('Mismatch: {!r} {}'.format(txt, style))
+    print('{} fields, {} mismatches'.format(len(fields), mismatches))
+
+    def run(function):
+        for txt in fields:
+            for style in styles:
+                function(txt, style)
+
+    def uncached(txt, style):
+        clear_cache()
+        render(txt, style)
+
+    for name, function in [
+            ('re.sub in re.sub', _reference_render),
+            ('tokens, no cache', uncached),
+            ('tokens, cached', render)]:
+        seconds = timeit.timeit(lambda: run(function), number=rounds)
+        print('{}: {:.1f} µs per field and style'.format(
+            name, seconds * 1e6 / (rounds * len(fields) * len(styles))))
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], encoding='utf-8') as fields_file:
+            corpus = [line.rstrip('\n') for line in fields_file]
+    else:
+        corpus = _sample_fields
+    _benchmark(corpus)
@@ -14,29 +14,15 @@ Add-on for Anki2 to show colored stroke order diagrams for kanji. The
 diagrams have to be provided as svg is the right directories.
 """
 
-
-# Usually Python comes with 'batteries included', that is, with the
-# Python standard library. Unfortunately, this is not the case for a
-# typical Anki install. So bring along some files that are
-# missing. Make sure we find them.
-from aqt import mw  # We need this early to get to the path
-
-# These *are* available with standard Anki
+from collections import OrderedDict
+import json
 import os
-import re
 import sys
+import time
 
-# The rest of the anki componets.
+from aqt import mw
 from anki import hooks
 
-# Add the path, but only once. (Other add-ons by YT contain
-# similar code.)
-if not [pe for pe in sys.path if 'batteries' in pe]:
-    sys.path.append(os.path.join(mw.pm.addonFolder(), "batteries"))
-
-# Now this should work. Include module to search for file names.
-import glob
-
 __version__ = '2.1.0'
 kanji_size = 200
 """The size the svg is scaled to"""
@@ -51,12 +37,128 @@ Where the kanji svgs are stored in the add-ons folder, before they are
 copied to the media folder.
 """
 
+index_name = 'stroke-order-kanji-index.json'
+"""File in the add-ons folder where we keep the list of svgs."""
+
+recheck_interval = 60
+"""Seconds until we look at the modification time of the directory again."""
+
+output_cache_size = 1000
+"""How many rendered fields we remember."""
+
+fragment_cache_size = 3000
+"""How many rendered characters we remember."""
+
 variant_display_names = {
     '': 'title="Standard"', 'Jinmei': 'title="Jinmei"',
     'Kaisho': 'title="Kaisho"'}
 """Mapping file name variants to display variants."""
 
 
+def read_directory(directory):
+    u"""Return a dict base name: list of variants of the svg files."""
+    names = {}
+    for file_name in sorted(os.listdir(directory)):
+        if not file_name.endswith(u'.svg'):
+            continue
+        base, dummy_dash, variant = file_name[:-len(u'.svg')].partition(u'-')
+        names.setdefault(base, []).append(variant)
+    return names
+
+
+class KanjiVGIndex(object):
+    u"""
+    An index of the svg files in a directory.
+
+    The same code, read_directory() and this class, is used in the
+    kanjitips and the kanji_stroke_color add-ons. Keep the two copies
+    the same.
+    """
+
+    def __init__(self, directory, index_path):
+        if isinstance(directory, bytes):
+            # Python 2: list the directory with unicode names.
+            directory = directory.decode(sys.getfilesystemencoding())
+        self.directory = directory
+        self.index_path = index_path
+        self.names = None
+        self.mtime = None
+        self.checked = 0
+        self.generation = 0
+        # Goes up each time we read the directory again.
+
+    def directory_mtime(self):
+        try:
+            return os.stat(self.directory).st_mtime
+        except OSError:
+            return None
+
+    def load(self):
+        u"""Make sure the index is up to date."""
+        now = time.time()
+        if self.names is not None \
+                and now - self.checked < recheck_interval:
+            return
+        self.checked = now
+        mtime = self.directory_mtime()
+        if self.names is not None and mtime == self.mtime:
+            return
+        self.generation += 1
+        self.mtime = mtime
+        if mtime is None:
+            self.names = {}
+            return
+        try:
+            with open(self.index_path) as index_file:
+                saved = json.load(index_file)
+            if saved['mtime'] == mtime:
+                self.names = saved['names']
+                return
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            pass
+        self.names = read_directory(self.directory)
+        try:
+            with open(self.index_path, 'w') as index_file:
+                json.dump({'mtime': mtime, 'names': self.names}, index_file)
+        except (IOError, OSError):
+            pass
+
+    def path(self, base, variant=u''):
+        u"""Return the path of the svg, or None when we don’t have it."""
+        self.load()
+        if variant in self.names.get(base, ()):
+            return self.file_path(base, variant)
+        return None
+
+    def variants(self, base):
+        u"""Return the variants (not the standard) we have for base."""
+        self.load()
+        return [v for v in self.names.get(base, ()) if v]
+
+    def file_path(self, base, variant=u''):
+        u"""Return the path of the svg file for base and variant."""
+        if variant:
+            return os.path.join(
+                self.directory, u'{0}-{1}.svg'.format(base, variant))
+        return os.path.join(self.directory, base + u'.svg')
+
+
+svg_index = KanjiVGIndex(
+    os.path.join(mw.addonManager.addonsFolder(), kanji_directory),
+    os.path.join(mw.addonManager.addonsFolder(), index_name))
+
+fragment_cache = OrderedDict()
+"""The html for one character, by (character, variant, show_rest).
+
+The most recently used last."""
+output_cache = OrderedDict()
+"""The html for a field, by (text, variant, show_rest, size).
+
+The most recently used last."""
+cache_generation = None
+"""The generation of the svg index the caches were made with."""
+
+
 def ascii_basename(c, var=''):
     u"""
     An SVG filename in ASCII using the same format KanjiVG uses.
@@ -144,38 +246,68 @@ def kanji_svg_var(txt, variant='', show_rest=False):
     For each character in txt, check if there is an svg to
     display and replace txt with this svg image.
     """
-    rtxt = u''
+    global cache_generation
     size = kanji_size
     if show_rest:
         size = rest_size
-    for c in txt:
-        # Try to get the variant
-        fn_title_list = get_file_names_titles(c, variant, show_rest)
-        for fname, title_attr in fn_title_list:
-            rtxt += u'''<embed width="{size}" height="{size}" \
-{title} src="{fname}" />''' .format(
-                fname=fname, size=size, title=title_attr)
-            # (The title_attr brings along the title="', the others
-            # parameters don't)
-        if not fn_title_list and not show_rest:
-            rtxt += c
-    if show_rest and rtxt:
-        rtxt = u'<div class="strokevariants">' + rtxt + u'</div>'
+    svg_index.load()
+    if svg_index.generation != cache_generation:
+        # The svg files changed.
+        fragment_cache.clear()
+        output_cache.clear()
+        cache_generation = svg_index.generation
+    key = (txt, variant, show_rest, size)
+    try:
+        rtxt = output_cache.pop(key)
+    except KeyError:
+        rtxt = u''.join(
+            [character_svg(c, variant, show_rest, size) for c in txt])
+        if show_rest and rtxt:
+            rtxt = u'<div class="strokevariants">' + rtxt + u'</div>'
+    output_cache[key] = rtxt
+    if len(output_cache) > output_cache_size:
+        output_cache.popitem(last=False)
     return rtxt
 
 
+def character_svg(c, variant, show_rest, size):
+    """Return the html for one character, from the cache if we can."""
+    # The size follows from show_rest.
+    key = (c, variant, show_rest)
+    try:
+        fragment = fragment_cache.pop(key)
+    except KeyError:
+        pass
+    else:
+        fragment_cache[key] = fragment
+        return fragment
+    # Try to get the variant
+    fn_title_list = get_file_names_titles(c, variant, show_rest)
+    # (The title_attr brings along the title="', the others
+    # parameters don't)
+    fragment = u''.join([u'''<embed width="{size}" height="{size}" \
+{title} src="{fname}" />'''.format(fname=fname, size=size, title=title_attr)
+                         for fname, title_attr in fn_title_list])
+    if not fn_title_list and not show_rest:
+        fragment = c
+    fragment_cache[key] = fragment
+    if len(fragment_cache) > fragment_cache_size:
+        fragment_cache.popitem(last=False)
+    return fragment
+
+
 def get_file_names_titles(c, variant, show_rest):
     """ Return the file names of the svgs we should show. """
     name_title_list = []
+    base = character_basename(c)[:-len(u'.svg')]
     if not show_rest:
-        fname = os.path.join(mw.addonManager.addonsFolder(),
-                             kanji_directory, character_basename(c, variant))
-        if variant and not os.path.exists(fname):
+        fname = None
+        if variant:
+            fname = svg_index.path(base, variant)
+        if not fname:
             # Maybe we can save this by using the standard version.
-            fname = os.path.join(mw.addonManager.addonsFolder(),
-                                 kanji_directory, character_basename(c))
-
-        if os.path.exists(fname):
+            fname = svg_index.path(base)
+        if fname:
             try:
                 title = variant_display_names[variant]
             except KeyError:
@@ -183,20 +315,8 @@ def get_file_names_titles(c, variant, show_rest):
             name_title_list.append((fname, title))
     else:
         # The true show-all style, show stroke order variants.
-        # (We cheat a bit, this can't work for upper-case romaji
-        # letters and for non-alphanumeric characters. There aren't
-        # any variants for those, so no harm, no foul.)
-        for fname in glob.glob(os.path.join(
-                mw.addonManager.addonsFolder(),
-                kanji_directory, c + u'-*.svg')):
-            try:
-                title = re.search(
-                    u'/{0}-([^/]+).svg$'.format(re.escape(c)), fname).group(1)
-            except AttributeError:
-                # Shouldn't happen. We just got the names that match
-                # this pattern.
-                title = ''
-            name_title_list.append((fname, title))
+        for var in svg_index.variants(base):
+            name_title_list.append((svg_index.path(base, var), var))
     return name_title_list
 
 
@@ -0,0 +1,151 @@
+# -*- mode: Python ; coding: utf-8 -*-
+# Copyright © 2012–2013 Roland Sieker <ospalh@gmail.com>
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/copyleft/agpl.html
+
+u"""
+Time the single pass tip walk against the old one.
+
+The old show_tip_filter ran the selectors for every selected element,
+deduplicated with list scans and walked each text once for every
+matching ancestor. It is kept here, with the same maybe_make_tip, so
+that only the walks are compared. This needs the Anki modules, so run
+it from the debug console (Ctrl+Shift+;):
+
+    from kanjitips import benchmark_tips
+    benchmark_tips.run()
+
+Pass a list of answer html strings to run() to time your own cards.
+"""
+
+import re
+import timeit
+
+from lxml import html
+
+from . import tips
+
+
+sample_sentence = (
+    u'<div>今日[きょう]は <b>天気</b>がいいので、'
+    u'公園[こうえん]へ散歩に行きました。[sound:sanpo.mp3]</div>\n')
+
+sample_answers = [
+    u'<html><head></head><body><div class="front">日本語</div>'
+    u'<hr id="answer"><div>にほんご – Japanese language</div>'
+    u'</body></html>',
+    u'<html><head></head><body>{0}</body></html>'.format(
+        sample_sentence * 60),
+]
+
+
+def uniqify_list(seq):
+    """Return a copy of the list with every element appearing only once."""
+    no_dupes = []
+    [no_dupes.append(i) for i in seq if not no_dupes.count(i)]
+    return no_dupes
+
+
+def media_characters(s):
+    u"""Return positions of characters inside  media file."""
+    mc = []
+    for m in re.finditer(tips.skip_re, s):
+        b, l = m.span()
+        mc += range(b, l)
+    return mc
+
+
+def old_split(text, bad_chars, insert):
+    u"""Split text around tips, the old way. Return the new text."""
+    new_element = None
+    tip_text = u''
+    new_text = None
+    for i, g in enumerate(text):
+        if i in bad_chars:
+            tip_text += g
+            continue
+        ge = tips.maybe_make_tip(g)
+        if ge is not None:
+            if new_element is None:
+                new_text = tip_text
+            else:
+                new_element.tail = tip_text
+            insert(ge)
+            new_element = ge
+            tip_text = u''
+        else:
+            tip_text += g
+    if new_element is None:
+        return text
+    new_element.tail = tip_text
+    return new_text
+
+
+def old_add_tips(doc):
+    u"""Add the tips to the document the way the old filter did."""
+    elements = []
+    for ts in tips.tip_selectors:
+        elements += doc.cssselect(ts)
+    elements = uniqify_list(elements)
+    for el in elements:
+        skip_elements = []
+        for skip_sel in tips.skip_selectors:
+            skip_elements += el.cssselect(skip_sel)
+        skip_elements = uniqify_list(skip_elements)
+        for sub_el in el.iter():
+            if sub_el in skip_elements or callable(sub_el.tag):
+                continue
+            if sub_el.text is not None:
+                positions = [0]
+
+                def insert_child(ge):
+                    sub_el.insert(positions[0], ge)
+                    positions[0] += 1
+                sub_el.text = old_split(
+                    sub_el.text, media_characters(sub_el.text),
+                    insert_child)
+            if sub_el is not el and sub_el.tail is not None:
+                parent = sub_el.getparent()
+                positions = [parent.index(sub_el) + 1]
+
+                def insert_sibling(ge):
+                    parent.insert(positions[0], ge)
+                    positions[0] += 1
+                sub_el.tail = old_split(
+                    sub_el.tail, media_characters(sub_el.tail),
+                    insert_sibling)
+
+
+def new_add_tips(doc):
+    u"""Add the tips to the document with the single pass walk."""
+    selected = set()
+    for ts in tips.tip_selectors:
+        selected.update(doc.cssselect(ts))
+    skipped = set()
+    for skip_sel in tips.skip_selectors:
+        skipped.update(doc.cssselect(skip_sel))
+    tips.add_tips(doc, False, selected, skipped, tips.lowest_tip_character())
+
+
+def tipped_glyphs(doc):
+    u"""Return the set of characters that got a tip."""
+    # The old walk nested a span in a span for each matching ancestor.
+    return set(el.text_content() for el in doc.find_class('kanjitip'))
+
+
+def run(answers=None, rounds=20):
+    u"""Check that both walks agree, then time them."""
+    for answer in answers or sample_answers:
+        old_doc = html.fromstring(answer)
+        new_doc = html.fromstring(answer)
+        old_add_tips(old_doc)
+        new_add_tips(new_doc)
+        same = old_doc.text_content() == new_doc.text_content() \
+            and tipped_glyphs(old_doc) == tipped_glyphs(new_doc)
+        times = []
+        for add in (old_add_tips, new_add_tips):
+            seconds = timeit.timeit(
+                lambda: add(html.fromstring(answer)), number=rounds)
+            times.append(seconds * 1000.0 / rounds)
+        print(u'{0} characters: old {1:.1f} ms, new {2:.1f} ms, {3}'.format(
+            len(answer), times[0], times[1],
+            u'same tips' if same else u'DIFFERENT tips'))
@@ -0,0 +1,136 @@
+# -*- mode: Python ; coding: utf-8 -*-
+# Copyright © 2012–2013 Roland Sieker <ospalh@gmail.com>
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/copyleft/agpl.html
+
+u"""
+Look up kanjidic2 entries in an SQLite store.
+
+The first time we need it, kanjidic2.xml.gz is converted, one
+<character> at a time, into an SQLite file next to it. Only the
+meanings and readings are kept. Later lookups just query that file.
+When the xml file changes, the store is built again.
+"""
+
+import gzip
+import os
+import sqlite3
+
+try:
+    from xml.etree import cElementTree as ElementTree
+except ImportError:
+    from xml.etree import ElementTree
+
+
+kanjidic_path = os.path.join(os.path.dirname(__file__), 'kanjidic2.xml.gz')
+store_path = os.path.join(os.path.dirname(__file__), 'kanjidic2.sqlite')
+
+store_format = 1
+# Change this when the schema changes, to rebuild existing stores.
+
+schema = u"""
+create table if not exists meta (
+    key text primary key,
+    value text not null);
+create table if not exists meanings (
+    literal text not null,
+    lang text not null,
+    meaning text not null);
+create index if not exists ix_meanings_literal on meanings (literal, lang);
+create table if not exists readings (
+    literal text not null,
+    r_type text not null,
+    reading text not null);
+create index if not exists ix_readings_literal on readings (literal, r_type);
+"""
+
+_connection = None
+
+
+def source_stamp():
+    u"""Return a string that changes when the kanjidic file changes."""
+    stat = os.stat(kanjidic_path)
+    return u'{0} {1} {2}'.format(store_format, stat.st_mtime, stat.st_size)
+
+
+def is_current(connection, stamp):
+    u"""Return whether the store was built from the current source."""
+    row = connection.execute(
+        u"select value from meta where key = 'source'").fetchone()
+    return row is not None and row[0] == stamp
+
+
+def character_rows():
+    u"""
+    Yield (literal, meanings, readings) for each kanjidic character.
+
+    The meanings are (lang, meaning) pairs, with lang u'' for English,
+    which has no m_lang. The readings are (r_type, reading) pairs.
+    """
+    with gzip.open(kanjidic_path, 'rb') as kjdf:
+        for dummy_event, element in ElementTree.iterparse(kjdf):
+            if element.tag != 'character':
+                continue
+            meanings = [(m.get('m_lang', u''), m.text)
+                        for m in element.iter('meaning') if m.text]
+            readings = [(r.get('r_type'), r.text)
+                        for r in element.iter('reading') if r.text]
+            yield element.findtext('literal'), meanings, readings
+            # Don’t keep the parsed characters around.
+            element.clear()
+
+
+def build_store(connection, stamp):
+    u"""Fill the store from the kanjidic file."""
+    with connection:
+        connection.execute(u'delete from meanings')
+        connection.execute(u'delete from readings')
+        for literal, meanings, readings in character_rows():
+            connection.executemany(
+                u'insert into meanings values (?, ?, ?)',
+                [(literal, lang, meaning) for lang, meaning in meanings])
+            connection.executemany(
+                u'insert into readings values (?, ?, ?)',
+                [(literal, r_type, reading) for r_type, reading in readings])
+        connection.execute(
+            u"insert or replace into meta values ('source', ?)", (stamp,))
+
+
+def connection():
+    u"""
+    Return the connection to the store.
+
+    Connect on first use and (re)build the store when it is missing or
+    out of date. When the store can’t be written, build it in memory.
+    """
+    global _connection
+    if _connection is not None:
+        return _connection
+    stamp = source_stamp()
+    try:
+        _connection = sqlite3.connect(store_path)
+        _connection.executescript(schema)
+        if not is_current(_connection, stamp):
+            build_store(_connection, stamp)
+    except sqlite3.Error:
+        _connection = sqlite3.connect(':memory:')
+        _connection.executescript(schema)
+        build_store(_connection, stamp)
+    return _connection
+
+
+def meanings(literal, lang=None):
+    u"""
+    Return the meanings of the character in a language.
+
+    lang is an m_lang code like u'fr', None for English.
+    """
+    return [row[0] for row in connection().execute(
+        u'select meaning from meanings where literal = ? and lang = ? '
+        u'order by rowid', (literal, lang or u''))]
+
+
+def readings(literal, r_type):
+    u"""Return the readings of a type, like u'ja_on', of the character."""
+    return [row[0] for row in connection().execute(
+        u'select reading from readings where literal = ? and r_type = ? '
+        u'order by rowid', (literal, r_type))]
@@ -0,0 +1,110 @@
+# -*- mode: Python ; coding: utf-8 -*-
+# Copyright © 2012–2013 Roland Sieker <ospalh@gmail.com>
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/copyleft/agpl.html
+
+u"""
+Know which KanjiVG files we have, without asking the file system.
+
+The svg directory is listed once and the names are kept by base name,
+like u'日' or u'065e5', with their variants. The index is saved
+together with the modification time of the directory, so that we
+don’t even have to list it at the next start.
+"""
+
+import json
+import os
+import sys
+import time
+
+
+recheck_interval = 60
+# Look at the modification time of the directory again after this
+# many seconds. Adding or removing files changes it.
+
+
+def read_directory(directory):
+    u"""Return a dict base name: list of variants of the svg files."""
+    names = {}
+    for file_name in sorted(os.listdir(directory)):
+        if not file_name.endswith(u'.svg'):
+            continue
+        base, dummy_dash, variant = file_name[:-len(u'.svg')].partition(u'-')
+        names.setdefault(base, []).append(variant)
+    return names
+
+
+class KanjiVGIndex(object):
+    u"""
+    An index of the svg files in a directory.
+
+    The same code, read_directory() and this class, is used in the
+    kanjitips and the kanji_stroke_color add-ons. Keep the two copies
+    the same.
+    """
+
+    def __init__(self, directory, index_path):
+        if isinstance(directory, bytes):
+            # Python 2: list the directory with unicode names.
+            directory = directory.decode(sys.getfilesystemencoding())
+        self.directory = directory
+        self.index_path = index_path
+        self.names = None
+        self.mtime = None
+        self.checked = 0
+        self.generation = 0
+        # Goes up each time we read the directory again.
+
+    def directory_mtime(self):
+        try:
+            return os.stat(self.directory).st_mtime
+        except OSError:
+            return None
+
+    def load(self):
+        u"""Make sure the index is up to date."""
+        now = time.time()
+        if self.names is not None \
+                and now - self.checked < recheck_interval:
+            return
+        self.checked = now
+        mtime = self.directory_mtime()
+        if self.names is not None and mtime == self.mtime:
+            return
+        self.generation += 1
+        self.mtime = mtime
+        if mtime is None:
+            self.names = {}
+            return
+        try:
+            with open(self.index_path) as index_file:
+                saved = json.load(index_file)
+            if saved['mtime'] == mtime:
+                self.names = saved['names']
+                return
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            pass
+        self.names = read_directory(self.directory)
+        try:
+            with open(self.index_path, 'w') as index_file:
+                json.dump({'mtime': mtime, 'names': self.names}, index_file)
+        except (IOError, OSError):
+            pass
+
+    def path(self, base, variant=u''):
+        u"""Return the path of the svg, or None when we don’t have it."""
+        self.load()
+        if variant in self.names.get(base, ()):
+            return self.file_path(base, variant)
+        return None
+
+    def variants(self, base):
+        u"""Return the variants (not the standard) we have for base."""
+        self.load()
+        return [v for v in self.names.get(base, ()) if v]
+
+    def file_path(self, base, variant=u''):
+        u"""Return the path of the svg file for base and variant."""
+        if variant:
+            return os.path.join(
+                self.directory, u'{0}-{1}.svg'.format(base, variant))
+        return os.path.join(self.directory, base + u'.svg')
@@ -7,17 +7,36 @@ var shared = {
     }
 }
 
-function kanji_object(k, size) {
+// Tip contents we already got, by hex code, and the tooltips waiting
+// for one.
+var kanjitipContents = {};
+var kanjitipResponses = {};
 
-    var kanji = '<object width="' + size + ' " height="' + size +
-        '" type="image/svg+xml" data="file://' + k + '">' +
-        k + '</object>';
-    return '<figure class="kanjivg standard">\n' + kanji + '\n</figure>';
+function kanjitipAnswer(code, content) {
+    // Called from Python with the content we asked for.
+    kanjitipContents[code] = content;
+    var response = kanjitipResponses[code];
+    delete kanjitipResponses[code];
+    if (!content) {
+        // Nothing to show for this character. Don't ask again.
+        $('.hex_' + code).removeClass('kanjitip');
+    }
+    if (response) {
+        response(content);
+    }
 }
 
-function kanji_variant_object(k, size) {
-
-    return '<object width="' + size + ' " height="' + size +
-        '" type="image/svg+xml" data="file://' + k + '">' +
-        k + '</object>';
-}
+$(function() {
+    // One tooltip for all characters, on this and on later cards.
+    $(document).tooltip($.extend({}, shared, {
+        items: '.kanjitip',
+        content: function(response) {
+            var code = $(this).attr('data-kanjitip');
+            if (code in kanjitipContents) {
+                return kanjitipContents[code];
+            }
+            kanjitipResponses[code] = response;
+            py.link('kanjitip:' + code);
+        }
+    }));
+});
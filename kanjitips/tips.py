@@ -4,17 +4,22 @@
 
 """Add-on for Anki 2 to show information on kanji."""
 
-from lxml import html, etree
+from lxml import html
+from collections import OrderedDict
+import bisect
 import codecs
-import glob
-import gzip
+import json
 import os
 import re
 import unicodedata
 import urllib
 
 from aqt import mw
-from anki.hooks import addHook
+from aqt.reviewer import Reviewer
+from anki.hooks import addHook, wrap
+
+from . import kanjidic
+from .kanjivg_index import KanjiVGIndex
 
 # Tips are only shown for elements that match any of these selectors, that is
 # have this class. So, in your template use something like <span
@@ -54,69 +59,99 @@ jqui_theme_style_path = u'file://' + os.path.join(
 tips_style_path = u'file://' + os.path.join(
     os.path.dirname(__file__), 'show_tips.css')
 
-kanjidic_path = os.path.join(os.path.dirname(__file__), 'kanjidic2.xml.gz')
-jdic2_twigs = {}
-
 character_data_path = os.path.join(
     os.path.dirname(__file__), u'kanji_info.txt')
 character_data_dict = {}
 
 kanjivg_path = os.path.join(os.path.dirname(__file__), 'kanji_vg')
+kanjivg_index = KanjiVGIndex(
+    kanjivg_path,
+    os.path.join(os.path.dirname(__file__), 'kanji_vg_index.json'))
 
 bad_unicode_categories = 'C'  # Don’t even ask for the name of control
                               # characters.
-kanji_code = 'IDEOGRAPH'
-katakana_code = 'KATAKANA'
-hiragana_code = 'HIRAGANA'
+
+# The characters that have IDEOGRAPH, and KATAKANA or HIRAGANA in their
+# Unicode (14.0) names, as (first, last) code point ranges. Looking the
+# code point up here is much faster than asking for the name of every
+# character.
+kanji_ranges = [
+    (0x2ff0, 0x2ffb), (0x3000, 0x3002), (0x3005, 0x3007), (0x302a, 0x302d),
+    (0x3037, 0x3037), (0x303b, 0x303b), (0x303e, 0x303f), (0x3190, 0x319f),
+    (0x3220, 0x3247), (0x3280, 0x32b0), (0x32c0, 0x32cb), (0x3358, 0x3370),
+    (0x33e0, 0x33fe), (0x3400, 0x4dbf), (0x4e00, 0x9fff), (0xf900, 0xfa6d),
+    (0xfa70, 0xfad9), (0xfe11, 0xfe12), (0xfe51, 0xfe51), (0xff61, 0xff61),
+    (0xff64, 0xff64), (0x1d372, 0x1d376), (0x1f210, 0x1f212),
+    (0x1f214, 0x1f23b), (0x1f240, 0x1f248), (0x1f250, 0x1f251),
+    (0x20000, 0x2a6df), (0x2a700, 0x2b738), (0x2b740, 0x2b81d),
+    (0x2b820, 0x2cea1), (0x2ceb0, 0x2ebe0), (0x2f800, 0x2fa1d),
+    (0x30000, 0x3134a)]
+kana_ranges = [
+    (0x3041, 0x3096), (0x3099, 0x30ff), (0x31f0, 0x31ff), (0x32d0, 0x32fe),
+    (0xff65, 0xff9f), (0x1aff0, 0x1aff3), (0x1aff5, 0x1affb),
+    (0x1affd, 0x1affe), (0x1b000, 0x1b001), (0x1b11f, 0x1b122),
+    (0x1b150, 0x1b152), (0x1b164, 0x1b167), (0x1f200, 0x1f202),
+    (0x1f213, 0x1f213)]
 
 jquery_script = u''
 jquery_ui_script = u''
 show_tips_script = u''
-
-character_script_template = u'''
-$(function() {{
-    $( '.{hex_code}' ).tooltip( $.extend({{}}, shared, {{
-        content: function() {{
-          var content = "";
-          {content}
-          return content;
+library_script = u''
+libraries_loaded = False
+# Whether the reviewer page has the libraries. Reset when the reviewer
+# loads its page again.
+
+library_script_template = u'''
+if (!window.kanjitipsLoaded) {{
+{jquery}
+{jquery_ui}
+{show_tips}
+    (function() {{
+        var head = document.getElementsByTagName('head')[0];
+        var paths = {style_paths};
+        for (var i = 0; i < paths.length; i++) {{
+            var link = document.createElement('link');
+            link.type = 'text/css';
+            link.rel = 'stylesheet';
+            link.href = paths[i];
+            head.appendChild(link);
         }}
-    }}));
-}});
-
+    }})();
+    window.kanjitipsLoaded = true;
+}}
 '''
 
-plain_kanji_template = u'''
-            content += kanji_object("{fn}", {size});
-'''
+tip_link_prefix = u'kanjitip:'
+# The script asks for the content of a tip with a link like
+# kanjitip:04e00, when the mouse first moves over the character.
+
+tip_cache_size = 500
+tip_cache = OrderedDict()
+# Character: content, the most recently used last.
+tip_cache_generation = None
+# The generation of the KanjiVG index the cached content was made with.
 
-variant_kanji_wrapper_template = u'''
-            content += "<figure class=\\"kanjivg variants\\">";\
-{vrs}\
-            content += "<figcaption>{fc}</figcaption>\\n";
-            content += "</figure>\\n";
+plain_kanji_template = u'''<figure class="kanjivg standard">
+<object width="{size}" height="{size}" type="image/svg+xml" \
+data="file://{fn}">{fn}</object>
+</figure>
+'''
 
+variant_kanji_wrapper_template = u'''<figure class="kanjivg variants">\
+{vrs}<figcaption>{fc}</figcaption>
+</figure>
 '''
 
-single_variant_kanji_template = u'''
-            content += kanji_variant_object("{fn}", {size});
+single_variant_kanji_template = u'''<object width="{size}" height="{size}" \
+type="image/svg+xml" data="file://{fn}">{fn}</object>
 '''
 
 do_show = False
-current_script = u''
 
 # debug: rememeber:
 #pp(mw.reviewer.web.page().mainFrame().toHtml())
 
-skip_re = r"\[(:?sound|type):(:?.*?)\]"
-
-
-def uniqify_list(seq):
-    """Return a copy of the list with every element appearing only once."""
-    # From http://www.peterbe.com/plog/uniqifiers-benchmark
-    no_dupes = []
-    [no_dupes.append(i) for i in seq if not no_dupes.count(i)]
-    return no_dupes
+skip_re = re.compile(r"\[(:?sound|type):(:?.*?)\]")
 
 
 def read_scripts():
@@ -124,27 +159,25 @@ def read_scripts():
     global jquery_script
     global jquery_ui_script
     global show_tips_script
+    global library_script
     with open(jq_path) as jqf:
         jquery_script = jqf.read()
     with open(jqui_path) as jqf:
         jquery_ui_script = jqf.read()
     with open(tips_script_path) as tf:
         show_tips_script = tf.read()
+    # Put everything we need only once per page in one script.
+    library_script = library_script_template.format(
+        jquery=jquery_script, jquery_ui=jquery_ui_script,
+        show_tips=show_tips_script, style_paths=json.dumps(
+            [jqui_style_path, jqui_theme_style_path, tips_style_path]))
 
 
 def read_character_data():
     u"""Read data files containing information on characters."""
     global character_data_dict
-    global jdic2_twigs
-    utf8_parser = etree.XMLParser(encoding='utf-8')
-    with gzip.open(kanjidic_path, 'rb') as kjdf:
-        kjd_string = kjdf.read()
-    jdic2_tree = etree.fromstring(kjd_string, parser=utf8_parser)
-    for el in jdic2_tree.findall('character'):
-        jdic2_twigs[el.find('literal').text] = el
-        # We turn the tree not into a loose-leaf collection, but a
-        # collcetion of the character-'twigs', (small sub-trees)
-
+    # The kanjidic data is looked up in the kanjidic module when we
+    # need it.
     try:
         with codecs.open(character_data_path, 'r', encoding='utf-8') \
                 as kanji_data:
@@ -168,22 +201,50 @@ def base_name(c):
     return c
 
 
+def range_table(ranges):
+    """Return the lists of first and last code points of the ranges."""
+    return [r[0] for r in ranges], [r[1] for r in ranges]
+
+
+kanji_table = range_table(kanji_ranges)
+kana_table = range_table(kana_ranges)
+
+
+def in_table(point, table):
+    """Return whether the code point is in one of the ranges."""
+    firsts, lasts = table
+    i = bisect.bisect_right(firsts, point) - 1
+    return i >= 0 and point <= lasts[i]
+
+
+def lowest_tip_character():
+    """Return the first character that may get a tip."""
+    if show_all_stroke_order:
+        return u'\x00'
+    firsts = []
+    if show_kana_stroke_order:
+        firsts.append(kana_ranges[0][0])
+    if show_kanji_stroke_order:
+        firsts.append(kanji_ranges[0][0])
+    if not firsts:
+        # Nothing will ever get a tip.
+        return None
+    return unichr(min(firsts))
+
+
 def do_this(c, all_non_control):
     """Return whether we should do something for this character."""
     try:
         c = unicode(c, 'utf-8')
     except TypeError:
         pass  # already unicode
-    if unicodedata.category(c)[0] in bad_unicode_categories:
-        # Never show for control characters.
-        return False
     if all_non_control:
+        # Never show for control characters.
+        return unicodedata.category(c)[0] not in bad_unicode_categories
+    point = ord(c)
+    if show_kana_stroke_order and in_table(point, kana_table):
         return True
-    c_name = unicodedata.name(c)
-    if show_kana_stroke_order:
-        if katakana_code in c_name or hiragana_code in c_name:
-            return True
-    if show_kanji_stroke_order and kanji_code in c_name:
+    if show_kanji_stroke_order and in_table(point, kanji_table):
         return True
     return False
 
@@ -197,8 +258,8 @@ def stroke_order_tip(c):
     """
     if not do_this(c, all_non_control=False):
         return u''
-    fname = os.path.join(kanjivg_path, base_name(c) + '.svg')
-    if os.path.exists(fname):
+    fname = kanjivg_index.path(base_name(c))
+    if fname:
         return plain_kanji_template.format(
             fn=fname, size=kanji_diagram_size)
     return u''
@@ -208,22 +269,15 @@ def stroke_order_variant_tip(c):
     u"""Return bits of a tooltip with stroke order diagrams."""
     if not do_this(c, all_non_control=show_all_stroke_order):
         return u''
-    var_scriptext = u''
+    variants_html = u''
     captions = []
-    for fname in glob.glob(os.path.join(
-            kanjivg_path, base_name(c) + u'-*.svg')):
-        try:
-            variant = re.search(
-                u'/{0}-([^/]+).svg$'.format(re.escape(c)), fname).group(1)
-        except (AttributeError, KeyError):
-            # Shouldn't happen. We just got the names that match this
-            # pattern.
-            variant = u'Unknown'
-        var_scriptext += single_variant_kanji_template.format(
-            fn=fname, size=kanji_variant_diagram_size)
+    for variant in kanjivg_index.variants(base_name(c)):
+        variants_html += single_variant_kanji_template.format(
+            fn=kanjivg_index.file_path(base_name(c), variant),
+            size=kanji_variant_diagram_size)
         captions.append(variant)
 
-    if var_scriptext:
+    if variants_html:
         caption = u''
         if len(captions) > 1:
             for i, v in enumerate(captions):
@@ -233,81 +287,169 @@ def stroke_order_variant_tip(c):
             caption = captions[0]
         caption = caption.rstrip(', ')
         return variant_kanji_wrapper_template.format(
-            vrs=var_scriptext, fc=caption)
+            vrs=variants_html, fc=caption)
     return u''
 
 
 def characterdata_tip(c):
     """Add the string from the character data file or throw a KeyError."""
-    return u'            content += "<h3>{cd}</h3>";\n'.format(
-        cd=character_data_dict[c])
+    return u'<h3>{cd}</h3>\n'.format(cd=character_data_dict[c])
 
 
 def kanjidic_tip(c):
     u"""Return bits of a tooltip containing kanjidic information."""
-    kd_element = jdic2_twigs[c]
-    # This may throw. we catch one level higher
-    meanings = u''
-    for meaning_element in kd_element.findall('.//meaning'):
-        try:
-            if meaning_element.get('m_lang') == lang_code:
-                meanings += "{}, ".format(meaning_element.text)
-        except TypeError:
-            # Deal with the case that exactly one of the two sides in
-            # the if is None. (Above, we may compare None == None
-            # instead of None is None, which is not recommendet, but
-            # works (at least in Python 2.7 and 3.3) EAFP
-            pass
-    meanings = meanings.rstrip(', ')
+    meanings = u', '.join(kanjidic.meanings(c, lang_code))
     if meanings:
-        return u'            content += "<div>{mgs}</div>";\n'.format(
-            mgs=meanings)
+        return u'<div>{mgs}</div>\n'.format(mgs=meanings)
     return u''
 
 
+def tip_content(c):
+    u"""Return the html shown in the tip for the character."""
+    ct = u''
+    try:
+        ct += characterdata_tip(c)
+    except KeyError:
+        pass
+    ct += kanjidic_tip(c)
+    if show_kanji_stroke_order:
+        ct += stroke_order_tip(c)
+    if show_variant_stroke_order:
+        ct += stroke_order_variant_tip(c)
+    return ct
+
+
+def cached_tip_content(c):
+    u"""Return the tip content, from the cache when we have it."""
+    global tip_cache_generation
+    kanjivg_index.load()
+    if kanjivg_index.generation != tip_cache_generation:
+        # The svg files changed.
+        tip_cache.clear()
+        tip_cache_generation = kanjivg_index.generation
+    try:
+        content = tip_cache.pop(c)
+    except KeyError:
+        content = tip_content(c)
+    tip_cache[c] = content
+    if len(tip_cache) > tip_cache_size:
+        tip_cache.popitem(last=False)
+    return content
+
+
+def answer_tip_link(hex_code):
+    u"""Send the content of the tip the script asked for."""
+    try:
+        c = unichr(int(hex_code, 16))
+    except ValueError:
+        return
+    mw.reviewer.web.eval(u'kanjitipAnswer({hc}, {ct});'.format(
+        hc=json.dumps(hex_code), ct=json.dumps(cached_tip_content(c))))
+
+
+def link_handler(reviewer, url, _old):
+    u"""Answer our tip links, pass on the others."""
+    if url.startswith(tip_link_prefix):
+        answer_tip_link(url[len(tip_link_prefix):])
+        return
+    return _old(reviewer, url)
+
+
 def maybe_make_tip(glyph):
-    u"""Make a script to show tooltips, when we find suitable characters."""
-    global current_script
+    u"""
+    Return an element to show a tooltip, for suitable characters.
+
+    The element just marks the character. The content of the tip is
+    only made when the mouse moves over it.
+    """
     if not do_this(glyph, all_non_control=show_all_stroke_order):
         return None
+    hex_code = '{h:05x}'.format(h=ord(glyph))
     glyph_element = html.Element('span')
-    glyph_element.set('title', glyph)
-    hex_code = 'hex_{h:05x}'.format(h=ord(glyph))
     glyph_element.set(
-        'class', format(u'kanjitip {g} {h}'.format(g=glyph, h=hex_code)))
+        'class', u'kanjitip {g} hex_{h}'.format(g=glyph, h=hex_code))
+    glyph_element.set('data-kanjitip', hex_code)
     glyph_element.text = glyph
-    ct = u''
-    if not hex_code in current_script:
-        try:
-            ct += characterdata_tip(glyph)
-        except KeyError:
-            pass
-        try:
-            ct += kanjidic_tip(glyph)
-        except KeyError:
-            pass
-        if show_kanji_stroke_order:
-            ct += stroke_order_tip(glyph)
-        if show_variant_stroke_order:
-            ct += stroke_order_variant_tip(glyph)
-    else:
-        # We already have a tip, so just return the decorated element.
-        return glyph_element
-    if ct:
-        # We have nothing to put in the tip, so don't return anything.
-        current_script += character_script_template.format(
-            content=ct, hex_code=hex_code)
-        return glyph_element
-    # Fall out at the bottom: return None.
-
-
-def media_characters(s):
-    u"""Return positions of characters inside  media file."""
-    mc = []
-    for m in re.finditer(skip_re, s):
-        b, l = m.span()
-        mc += range(b, l)
-    return mc
+    return glyph_element
+
+
+def media_spans(s):
+    u"""Return the (start, end) positions of media files in the text."""
+    return [m.span() for m in skip_re.finditer(s)]
+
+
+def tip_text(s, lowest):
+    u"""
+    Return the text split up around the tip elements, or None.
+
+    Return the text before the first tip, and a list of the tip
+    elements, each with the following text set as its tail. Return
+    None when no character of the text gets a tip.
+    """
+    if lowest is None or max(s) < lowest:
+        # The usual case for markup and Latin text.
+        return None
+    lead = None
+    tips = []
+    plain = []
+    pos = 0
+    for start, end in media_spans(s) + [(len(s), len(s))]:
+        for g in s[pos:start]:
+            ge = None
+            if g >= lowest:
+                ge = maybe_make_tip(g)
+            if ge is None:
+                plain.append(g)
+                continue
+            if tips:
+                tips[-1].tail = u''.join(plain)
+            else:
+                lead = u''.join(plain)
+            tips.append(ge)
+            plain = []
+        plain.append(s[start:end])
+        pos = end
+    if not tips:
+        return None
+    tips[-1].tail = u''.join(plain)
+    return lead, tips
+
+
+def add_tips(element, in_tip, selected, skipped, lowest):
+    u"""
+    Add the tip elements to the element and its children.
+
+    Tips are added to the text of the selected elements, and of
+    everything inside them. Skipped elements are left alone, with
+    everything inside them. This walks the tree once, and looks at
+    each bit of text once.
+    """
+    global do_show
+    if element in skipped:
+        return
+    if callable(element.tag):
+        # Comment or processing instruction. Only the tail is text.
+        return
+    in_tip = in_tip or element in selected
+    # Copy the list of children before we insert tip elements.
+    children = list(element)
+    if in_tip and element.text:
+        split_text = tip_text(element.text, lowest)
+        if split_text:
+            do_show = True
+            element.text = split_text[0]
+            for i, ge in enumerate(split_text[1]):
+                element.insert(i, ge)
+    for child in children:
+        add_tips(child, in_tip, selected, skipped, lowest)
+        if in_tip and child.tail:
+            split_text = tip_text(child.tail, lowest)
+            if split_text:
+                do_show = True
+                child.tail = split_text[0]
+                index = element.index(child) + 1
+                for i, ge in enumerate(split_text[1]):
+                    element.insert(index + i, ge)
 
 
 def show_tip_filter(qa_html, qa, dummy_fields, dummy_model, dummy_data,
@@ -318,113 +460,40 @@ def show_tip_filter(qa_html, qa, dummy_fields, dummy_model, dummy_data,
     if not question_tips and not qa == 'a':
         return qa_html
     global do_show
-    global current_script
     do_show = False
-    current_script = show_tips_script
     try:
         doc = html.fromstring(qa_html)
     except:
         return qa_html
-    elements = []
+    selected = set()
     for ts in tip_selectors:
-        elements += doc.cssselect(ts)
-    elements = uniqify_list(elements)
-    for el in elements:
-        skip_elements = []
-        for skip_sel in skip_selectors:
-            skip_elements += el.cssselect(skip_sel)
-        skip_elements = uniqify_list(skip_elements)
-        for sub_el in el.iter():
-            if sub_el in skip_elements:
-                continue
-            if sub_el.text is not None:
-                bad_chars = media_characters(sub_el.text)
-                new_index = 0
-                new_element = None
-                tip_text = u''
-                sub_e_t = sub_el.text
-                for i, g in enumerate(sub_e_t):
-                    if i in bad_chars:
-                        tip_text += g
-                        continue
-                    ge = maybe_make_tip(g)
-                    if ge is not None:
-                        do_show = True
-                        if new_element is None:
-                            sub_el.text = tip_text
-                        else:
-                            # new_element is the old new element...
-                            new_element.tail = tip_text
-                        sub_el.insert(new_index, ge)
-                        new_index += 1
-                        new_element = ge
-                        tip_text = u''
-                    else:
-                        tip_text += g
-                if new_element is not None:
-                    new_element.tail = tip_text
-            if sub_el is not el and sub_el.tail is not None:
-                # We have to skip the tail of the element that
-                # trigered the selector. That is *not* in the
-                # selector.
-                bad_chars = media_characters(sub_el.tail)
-                parent = sub_el.getparent()
-                new_index = parent.index(sub_el) + 1
-                new_element = None
-                tip_tail = u''
-                sub_e_t = sub_el.tail
-                for i, g in enumerate(sub_e_t):
-                    if i in bad_chars:
-                        tip_tail += g
-                        continue
-                    ge = maybe_make_tip(g)
-                    if ge is not None:
-                        do_show = True
-                        if new_element is None:
-                            sub_el.tail = tip_tail
-                        else:
-                            new_element.tail = tip_tail
-                        # We have to inser this into the parent, not
-                        # into this sub_el.
-                        parent.insert(new_index, ge)
-                        new_index += 1
-                        new_element = ge
-                        tip_tail = u''
-                    else:
-                        tip_tail += g
-                if new_element is not None:
-                    new_element.tail = tip_tail
-    if do_show:
-        head = doc[1]
-        jqui_style = html.Element('link')
-        jqui_style.set('type', 'text/css')
-        jqui_style.set('rel', 'stylesheet')
-        jqui_style.set('href', jqui_style_path)
-        jqui_style.tail = '\n'
-        head.append(jqui_style)
-        jqui_theme_style = html.Element('link')
-        jqui_theme_style.set('type', 'text/css')
-        jqui_theme_style.set('rel', 'stylesheet')
-        jqui_theme_style.set('href', jqui_theme_style_path)
-        jqui_theme_style.tail = '\n'
-        head.append(jqui_theme_style)
-        tt_style = html.Element('link')
-        tt_style.set('type', 'text/css')
-        tt_style.set('rel', 'stylesheet')
-        tt_style.set('href', tips_style_path)
-        tt_style.tail = '\n'
-        head.append(tt_style)
+        selected.update(doc.cssselect(ts))
+    skipped = set()
+    for skip_sel in skip_selectors:
+        skipped.update(doc.cssselect(skip_sel))
+    add_tips(doc, False, selected, skipped, lowest_tip_character())
     return unicode(
         urllib.unquote(html.tostring(doc, encoding='utf-8')), 'utf-8')
 
 
 def do_scripts():
-    u"""When we have something to show, eval the scripts that do so."""
-    if not do_show:
+    u"""
+    When we have something to show, eval the scripts that do so.
+
+    Load jQuery, jQuery UI, our script and styles only the first time
+    on a page. The script handles the tips of all later cards.
+    """
+    global libraries_loaded
+    if not do_show or libraries_loaded:
         return
-    mw.reviewer.web.eval(jquery_script)
-    mw.reviewer.web.eval(jquery_ui_script)
-    mw.reviewer.web.eval(current_script)
+    mw.reviewer.web.eval(library_script)
+    libraries_loaded = True
+
+
+def reset_libraries_loaded(*args):
+    u"""Remember that the reviewer loads a new page, without libraries."""
+    global libraries_loaded
+    libraries_loaded = False
 
 
 def setup_tips():
@@ -441,3 +510,7 @@ def setup_tips():
     if question_tips:
         addHook("showQuestion", do_scripts)
     addHook("showAnswer", do_scripts)
+    Reviewer._initWeb = wrap(
+        Reviewer._initWeb, reset_libraries_loaded, "before")
+    Reviewer._linkHandler = wrap(
+        Reviewer._linkHandler, link_handler, "around")